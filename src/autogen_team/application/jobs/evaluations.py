@@ -46,7 +46,7 @@ class EvaluationsJob(base.Job):
     model_type: str = "question-answering"
     alias_or_version: T.Union[str, int] = "Champion"
     # Metrics
-    metrics: List[metrics_.AutogenMetric] = [
+    metrics: metrics_.MetricsKind = [
         metrics_.AutogenMetric(
             name="AutogenMetric", metric_type="exact_match", greater_is_better=True
         )
@@ -32,6 +32,7 @@ class TrainingJob(base.Job):
         saver (registries.SaverKind): model saver.
         signer (signers.SignerKind): model signer.
         registry (registries.RegisterKind): model register.
+        example_size (int): number of input rows for the model signature and input example.
     """
 
     KIND: T.Literal["TrainingJob"] = "TrainingJob"
@@ -60,6 +61,8 @@ class TrainingJob(base.Job):
     # Registrer
     # - avoid shadowing pydantic `register` pydantic function
     registry: registries.RegisterKind = pdt.Field(registries.MlflowRegister(), discriminator="KIND")
+    # Example
+    example_size: int = pdt.Field(default=5, gt=0)
 
     def run(self) -> base.Locals:
         # services
@@ -100,13 +103,13 @@ class TrainingJob(base.Job):
             # - index
             train_index, test_index = next(self.splitter.split(inputs=inputs, targets=targets))
             # - inputs
-            inputs_train = T.cast(schemas.Inputs, inputs.iloc[train_index])
-            inputs_test = T.cast(schemas.Inputs, inputs.iloc[test_index])
+            inputs_train = splitters.take(inputs, train_index)  # view if contiguous
+            inputs_test = splitters.take(inputs, test_index)
             logger.debug("- Inputs train shape: {}", inputs_train.shape)
             logger.debug("- Inputs test shape: {}", inputs_test.shape)
             # - targets
-            targets_train = T.cast(schemas.Targets, targets.iloc[train_index])
-            targets_test = T.cast(schemas.Targets, targets.iloc[test_index])
+            targets_train = splitters.take(targets, train_index)
+            targets_test = splitters.take(targets, test_index)
             logger.debug("- Targets train shape: {}", targets_train.shape)
             logger.debug("- Targets test shape: {}", targets_test.shape)
             # model
@@ -122,15 +125,41 @@ class TrainingJob(base.Job):
                 logger.info("{}. Compute metric: {}", i, metric)
                 score = metric.score(targets=targets_test, outputs=outputs_test)
                 client.log_metric(run_id=run.info.run_id, key=metric.name, value=score)
+                if isinstance(metric, metrics_.BootstrapMetric) and metric.bootstrap_samples:
+                    for key, value in zip(
+                        ("ci_lower", "ci_upper"),
+                        metric.interval(targets=targets_test, outputs=outputs_test),
+                    ):
+                        client.log_metric(
+                            run_id=run.info.run_id, key=f"{metric.name}/{key}", value=value
+                        )
+                if isinstance(metric, metrics_.RowMetric) and isinstance(
+                    self.splitter, splitters.StratifiedSubsampleSplitter
+                ):  # full set estimate of the score from the stratified test subsample
+                    estimate = self.splitter.estimate(
+                        inputs=inputs,
+                        targets=targets,
+                        test_index=test_index,
+                        scores=metric.scores(targets=targets_test, outputs=outputs_test),
+                    )
+                    for key, value in zip(("estimate", "variance"), estimate):
+                        client.log_metric(
+                            run_id=run.info.run_id, key=f"{metric.name}/{key}", value=value
+                        )
                 logger.debug("- Metric score: {}", score)
             # signer
             logger.info("Sign model: {}", self.signer)
-            model_signature = self.signer.sign(inputs=inputs, outputs=outputs_test)
+            model_signature = self.signer.sign(
+                inputs=T.cast(schemas.Inputs, inputs.head(self.example_size)),
+                outputs=T.cast(schemas.Outputs, outputs_test.head(self.example_size)),
+            )
             logger.debug("- Model signature: {}", model_signature.to_dict())
             # saver
             logger.info("Save model: {}", self.saver)
             model_info = self.saver.save(
-                model=self.model, signature=model_signature, input_example=inputs
+                model=self.model,
+                signature=model_signature,
+                input_example=T.cast(schemas.Inputs, inputs.head(self.example_size)),
             )
             logger.debug("- Model URI: {}", model_info.model_uri)
             # register
@@ -110,6 +110,14 @@ class TuningJob(base.Job):
             logger.debug("- Results: {}", results.shape)
             logger.debug("- Best Score: {}", best_score)
             logger.debug("- Best Params: {}", best_params)
+            logger.debug("- Results Attrs: {}", results.attrs)
+            mlflow.log_metrics({f"searcher/{k}": v for k, v in results.attrs.items()})
+            mlflow.log_table(data=results.drop(columns="params"), artifact_file="tuning.json")
+            # trials
+            if self.searcher.store is not None:
+                logger.info("Stream trials: {}", self.searcher.store)
+                exported = self.searcher.store.stream()
+                logger.debug("- Trials exported: {}", exported)
             # notify
             self.alerts_service.notify(
                 title="Tuning Job Finished", message=f"Best score: {best_score}"
@@ -3,17 +3,27 @@
 from .entities import MetricResult
 from .metrics import (
     AutogenMetric,
+    BleuMetric,
+    BootstrapMetric,
+    ChrFMetric,
     Metric,
     MetricKind,
     MetricsKind,
     MlflowModelValidationFailedException,
+    RougeLMetric,
+    RowMetric,
     Threshold,
 )
 
 __all__ = [
     "MetricResult",
     "Metric",
+    "BootstrapMetric",
+    "RowMetric",
     "AutogenMetric",
+    "BleuMetric",
+    "RougeLMetric",
+    "ChrFMetric",
     "MetricKind",
     "MetricsKind",
     "Threshold",
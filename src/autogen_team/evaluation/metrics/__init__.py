@@ -3,17 +3,27 @@
 from .metrics import (
     AutogenConversationMetric,
     AutogenMetric,
+    BleuMetric,
+    BootstrapMetric,
+    ChrFMetric,
     Metric,
     MetricKind,
     MetricsKind,
     MlflowModelValidationFailedException,
+    RougeLMetric,
+    RowMetric,
     Threshold,
 )
 
 __all__ = [
     "Metric",
+    "BootstrapMetric",
+    "RowMetric",
     "AutogenMetric",
     "AutogenConversationMetric",
+    "BleuMetric",
+    "RougeLMetric",
+    "ChrFMetric",
     "MetricKind",
     "MetricsKind",
     "Threshold",
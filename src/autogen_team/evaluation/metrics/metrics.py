@@ -12,6 +12,8 @@ from difflib import SequenceMatcher
 from typing import Optional, cast
 
 import mlflow
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 import pydantic as pdt
 from mlflow.metrics import MetricValue
@@ -25,6 +27,212 @@ MlflowThreshold: T.TypeAlias = mlflow.models.MetricThreshold
 MlflowModelValidationFailedException: T.TypeAlias = (
     mlflow.models.evaluation.validation.ModelValidationFailedException
 )
+# Flat sequences of hashed symbols: (symbol hashes, row positions)
+Sequences: T.TypeAlias = tuple[npt.NDArray[np.uint64], npt.NDArray[np.int64]]
+
+# %% HELPERS
+
+_HASH_PRIME = np.uint64(1099511628211)  # FNV-1a 64 bits prime
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)  # golden ratio 64 bits
+_HASH_BITS = np.uint64(39)  # 24 bits for rows, 39 bits for hashes, 1 bit for sides
+_ROW_SHIFT = _HASH_BITS + np.uint64(1)
+_BOOTSTRAP_CELLS = 2**22  # maximum size of a chunk of the bootstrap index matrix
+_WHITESPACES = np.array([c for c in range(0x3001) if chr(c).isspace()], dtype=np.uint64)
+
+
+def _words(texts: pd.Series[str], lowercase: bool) -> Sequences:
+    """Flatten the whitespace tokens of texts into hashed sequences.
+
+    Args:
+        texts (pd.Series[str]): texts to tokenize.
+        lowercase (bool): lowercase the texts before tokenization.
+
+    Returns:
+        Sequences: token hashes and row positions, ordered by row.
+    """
+    texts = texts.reset_index(drop=True).fillna("").astype(str)
+    if lowercase:
+        texts = texts.str.lower()
+    tokens = texts.str.split().explode().dropna()
+    hashes = pd.util.hash_array(tokens.to_numpy(dtype=object))
+    return hashes.astype(np.uint64), tokens.index.to_numpy(dtype=np.int64)
+
+
+def _chars(texts: pd.Series[str], lowercase: bool) -> Sequences:
+    """Flatten the non-whitespace characters of texts into sequences.
+
+    Args:
+        texts (pd.Series[str]): texts to split in characters.
+        lowercase (bool): lowercase the texts before splitting.
+
+    Returns:
+        Sequences: character code points and row positions, ordered by row.
+    """
+    texts = texts.reset_index(drop=True).fillna("").astype(str)
+    if lowercase:
+        texts = texts.str.lower()
+    lengths = texts.str.len().to_numpy(dtype=np.int64)
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    keep = ~np.isin(codes, _WHITESPACES)
+    return codes[keep], rows[keep]
+
+
+def _ngrams(sequences: Sequences, max_order: int) -> T.Iterator[Sequences]:
+    """Hash the n-grams of increasing orders that don't cross row boundaries.
+
+    Args:
+        sequences (Sequences): flat symbol hashes and row positions.
+        max_order (int): maximum length of the n-grams.
+
+    Yields:
+        Sequences: n-gram hashes and row positions, for orders 1 to max_order.
+    """
+    symbols, rows = sequences
+    keys = symbols
+    for order in range(1, max_order + 1):
+        size = max(len(symbols) - order + 1, 0)
+        if order > 1:  # extend the hashes of the previous order
+            keys = (keys[:size] * _HASH_PRIME) ^ symbols[order - 1 :]
+        valid = rows[:size] == rows[order - 1 :]
+        yield keys[valid], rows[:size][valid]
+
+
+def _ngram_matches(
+    y_true: Sequences, y_pred: Sequences, n_rows: int
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """Count the clipped n-gram matches between predictions and targets by row.
+
+    Both sides are sorted together with a single key per n-gram occurrence:
+    row position (high bits), mixed n-gram hash (middle bits), side (low bit).
+
+    Args:
+        y_true (Sequences): target n-gram hashes and row positions.
+        y_pred (Sequences): prediction n-gram hashes and row positions.
+        n_rows (int): number of rows in the evaluation set.
+
+    Returns:
+        tuple: clipped matches, prediction n-grams, and target n-grams by row.
+    """
+    keys = np.empty(len(y_true[0]) + len(y_pred[0]), dtype=np.uint64)
+    sides = [keys[: len(y_true[0])], keys[len(y_true[0]) :]]
+    for side, (key, (hashes, rows)) in enumerate(zip(sides, [y_true, y_pred])):
+        np.multiply(hashes, _HASH_MIX, out=key)
+        key >>= np.uint64(64) - _HASH_BITS
+        key <<= np.uint64(1)
+        key |= np.uint64(side)
+        key |= rows.astype(np.uint64) << _ROW_SHIFT
+    uniques, counts = np.unique(keys, return_counts=True)
+    # a target key is directly followed by the prediction key of the same n-gram
+    pairs = (uniques[1:] >> np.uint64(1)) == (uniques[:-1] >> np.uint64(1))
+    clipped = np.minimum(counts[:-1][pairs], counts[1:][pairs])
+    rows = (uniques[:-1][pairs] >> _ROW_SHIFT).astype(np.int64)
+    matches = np.bincount(rows, weights=clipped, minlength=n_rows).astype(np.float64)
+    pred_totals = np.bincount(y_pred[1], minlength=n_rows).astype(np.float64)
+    true_totals = np.bincount(y_true[1], minlength=n_rows).astype(np.float64)
+    return matches, pred_totals, true_totals
+
+
+def _padded(
+    sequences: Sequences, starts: npt.NDArray[np.int64], lengths: npt.NDArray[np.int64]
+) -> tuple[npt.NDArray[np.uint64], npt.NDArray[np.bool_]]:
+    """Gather a subset of flat sequences into a padded matrix.
+
+    Args:
+        sequences (Sequences): flat symbol hashes and row positions.
+        starts (npt.NDArray[np.int64]): flat start position of each row.
+        lengths (npt.NDArray[np.int64]): length of each row.
+
+    Returns:
+        tuple: padded symbols matrix and its validity mask.
+    """
+    symbols, _ = sequences
+    columns = np.arange(lengths.max(initial=0), dtype=np.int64)
+    mask = columns[None, :] < lengths[:, None]
+    matrix = np.zeros(mask.shape, dtype=np.uint64)
+    matrix[mask] = symbols[(starts[:, None] + columns[None, :])[mask]]
+    return matrix, mask
+
+
+def _lcs_lengths(
+    y_true: Sequences, y_pred: Sequences, n_rows: int, batch_size: int
+) -> npt.NDArray[np.float64]:
+    """Compute the longest common subsequence lengths by row in batches.
+
+    Rows are sorted by length and processed in batches of padded matrices.
+    The dynamic programming table is updated one prediction token at a time
+    for the whole batch, using a cumulative maximum along the target axis.
+
+    Args:
+        y_true (Sequences): flat target sequences.
+        y_pred (Sequences): flat prediction sequences.
+        n_rows (int): number of rows in the evaluation set.
+        batch_size (int): number of rows per batch.
+
+    Returns:
+        npt.NDArray[np.float64]: LCS length of each row.
+    """
+    true_lengths = np.bincount(y_true[1], minlength=n_rows)
+    pred_lengths = np.bincount(y_pred[1], minlength=n_rows)
+    true_starts = np.cumsum(true_lengths) - true_lengths
+    pred_starts = np.cumsum(pred_lengths) - pred_lengths
+    lcs = np.zeros(n_rows, dtype=np.float64)
+    order = np.argsort(true_lengths + pred_lengths, kind="stable")
+    for batch in np.array_split(order, max(1, -(-n_rows // batch_size))):
+        trues, true_mask = _padded(y_true, true_starts[batch], true_lengths[batch])
+        preds, pred_mask = _padded(y_pred, pred_starts[batch], pred_lengths[batch])
+        if trues.shape[1] == 0 or preds.shape[1] == 0:
+            continue
+        table = np.zeros((len(batch), trues.shape[1] + 1), dtype=np.int64)
+        for i in range(preds.shape[1]):
+            match = (preds[:, i : i + 1] == trues) & true_mask & pred_mask[:, i : i + 1]
+            steps = np.where(match, table[:, :-1] + 1, table[:, 1:])
+            table[:, 1:] = np.maximum.accumulate(steps, axis=1)
+        lcs[batch] = table[:, -1]
+    return lcs
+
+
+def _fbeta(
+    precision: npt.NDArray[np.float64], recall: npt.NDArray[np.float64], beta: float
+) -> npt.NDArray[np.float64]:
+    """Combine precisions and recalls into F-beta scores (0 when undefined)."""
+    beta2 = beta**2
+    denominator = beta2 * precision + recall
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fbeta = (1 + beta2) * precision * recall / denominator
+    return np.where(denominator > 0, fbeta, 0.0)
+
+
+def _bootstrap(
+    statistics: npt.NDArray[np.float64], samples: int, random_state: int
+) -> npt.NDArray[np.float64]:
+    """Sum per-row statistics over bootstrap resamples of the rows.
+
+    Draws a (samples x rows) index matrix, in chunks to bound memory, and turns
+    each chunk into row counts that are multiplied with the statistics.
+
+    Args:
+        statistics (npt.NDArray[np.float64]): statistics of each row (rows x stats).
+        samples (int): number of bootstrap resamples.
+        random_state (int): seed of the random generator.
+
+    Returns:
+        npt.NDArray[np.float64]: summed statistics of each resample (samples x stats).
+            NaN when there is no row to resample.
+    """
+    rng = np.random.default_rng(random_state)
+    n_rows = len(statistics)
+    if n_rows == 0:
+        return np.full((samples, statistics.shape[1]), np.nan)
+    sums = np.empty((samples, statistics.shape[1]), dtype=np.float64)
+    step = max(1, _BOOTSTRAP_CELLS // max(n_rows, 1))
+    for start in range(0, samples, step):
+        size = min(step, samples - start)
+        index = rng.integers(0, n_rows, size=(size, n_rows))
+        index += np.arange(size)[:, None] * n_rows  # offset each resample
+        counts = np.bincount(index.ravel(), minlength=size * n_rows).reshape(size, n_rows)
+        sums[start : start + size] = counts @ statistics
+    return sums
 
 
 # %% METRICS
@@ -39,12 +247,26 @@ class Metric(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
     Parameters:
         name (str): name of the metric for the reporting.
         greater_is_better (bool): maximize or minimize result.
+        bootstrap_samples (int): number of bootstrap resamples (0 to disable).
+            Only for the metrics with a confidence interval (see BootstrapMetric).
+        confidence_level (float): confidence level of the bootstrap interval.
+        random_state (int): random state of the bootstrap resampling.
     """
 
     KIND: str
 
     name: str
     greater_is_better: bool
+    bootstrap_samples: int = pdt.Field(default=0, ge=0)
+    confidence_level: float = pdt.Field(default=0.95, gt=0.0, lt=1.0)
+    random_state: int = 42
+
+    @pdt.model_validator(mode="after")
+    def _check_bootstrap(self) -> T.Self:
+        """Reject bootstrap resamples for the metrics without a confidence interval."""
+        if self.bootstrap_samples and not isinstance(self, BootstrapMetric):
+            raise ValueError(f"{self.KIND} has no confidence interval: use bootstrap_samples=0")
+        return self
 
     @abc.abstractmethod
     def score(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> float:
@@ -58,18 +280,28 @@ class Metric(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
             float: single result from the metric computation.
         """
 
-    def scorer(self, model: models.Model, inputs: schemas.Inputs, targets: pd.DataFrame) -> float:
+    def scorer(
+        self,
+        model: models.Model,
+        inputs: schemas.Inputs,
+        targets: pd.DataFrame,
+        cache: models.PredictionCache | None = None,
+    ) -> float:
         """Score model outputs against targets.
 
         Args:
             model (models.Model): model to evaluate.
             inputs (schemas.Inputs): model inputs values.
             targets (schemas.Targets): model expected values.
+            cache (models.PredictionCache, optional): memo of the model predictions.
 
         Returns:
             float: single result from the metric computation.
         """
-        outputs = model.predict(inputs=inputs)
+        if cache is not None:
+            outputs = cache.predict(model=model, inputs=inputs)
+        else:
+            outputs = model.predict(inputs=inputs)
         score = self.score(targets=targets, outputs=outputs)
         return score
 
@@ -99,7 +331,12 @@ class Metric(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
 
             sign = 1 if self.greater_is_better else -1  # reverse the effect
             score = self.score(targets=score_targets, outputs=score_outputs)
-            return MlflowMetric(aggregate_results={self.name: score * sign})
+            results = {self.name: score * sign}
+            if self.bootstrap_samples and isinstance(self, BootstrapMetric):
+                bounds = self.interval(targets=score_targets, outputs=score_outputs)
+                lower, upper = sorted(bound * sign for bound in bounds)
+                results.update(ci_lower=lower, ci_upper=upper)
+            return MlflowMetric(aggregate_results=results)
 
         return cast(
             MlflowMetric,
@@ -109,7 +346,50 @@ class Metric(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
         )
 
 
-class AutogenMetric(Metric):
+class BootstrapMetric(Metric):
+    """Base class for a metric with a bootstrap confidence interval of its score."""
+
+    @abc.abstractmethod
+    def interval(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> tuple[float, float]:
+        """Estimate a bootstrap confidence interval of the score.
+
+        Args:
+            targets (pd.DataFrame): expected values.
+            outputs (pd.DataFrame): predicted values.
+
+        Returns:
+            tuple[float, float]: lower and upper bounds of the score.
+        """
+
+    def _bounds(self, estimates: npt.NDArray[np.float64]) -> tuple[float, float]:
+        """Compute the percentile bounds of bootstrap estimates."""
+        alpha = (1.0 - self.confidence_level) / 2.0
+        lower, upper = np.quantile(estimates, [alpha, 1.0 - alpha])
+        return float(lower), float(upper)
+
+
+class RowMetric(BootstrapMetric):
+    """Base class for a metric whose score is the mean of its row scores."""
+
+    @abc.abstractmethod
+    def scores(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> npt.NDArray[np.float64]:
+        """Score the outputs against the targets row by row.
+
+        Args:
+            targets (pd.DataFrame): expected values.
+            outputs (pd.DataFrame): predicted values.
+
+        Returns:
+            npt.NDArray[np.float64]: score of each row.
+        """
+
+    def interval(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> tuple[float, float]:
+        scores = self.scores(targets=targets, outputs=outputs)
+        sums = _bootstrap(scores[:, None], self.bootstrap_samples, self.random_state)
+        return self._bounds(sums[:, 0] / max(len(scores), 1))
+
+
+class AutogenMetric(RowMetric):
     """Evaluate text-based Autogen responses using conversation metrics.
 
     Parameters:
@@ -122,36 +402,36 @@ class AutogenMetric(Metric):
     similarity_threshold: Optional[float] = 0.7
 
     def score(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> float:
-        # Extract text responses from targets and outputs
-        y_true: pd.Series[str] = targets.response
-        y_pred: pd.Series[str] = outputs.response
+        return float(self.scores(targets=targets, outputs=outputs).mean())
+
+    def scores(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> npt.NDArray[np.float64]:
+        # Extract text responses from targets and outputs (aligned by position)
+        y_true: pd.Series[str] = targets.response.reset_index(drop=True)
+        y_pred: pd.Series[str] = outputs.response.reset_index(drop=True)
 
         if self.metric_type == "exact_match":
-            return self._exact_match_score(y_true, y_pred)
+            scores = self._exact_match_scores(y_true, y_pred)
         elif self.metric_type == "similarity":
-            return self._similarity_score(y_true, y_pred)
+            scores = self._similarity_scores(y_true, y_pred)
         elif self.metric_type == "length_ratio":
-            return self._length_ratio(y_true, y_pred)
+            scores = self._length_ratios(y_true, y_pred)
         else:
             raise ValueError(f"Unknown metric type: {self.metric_type}")
+        return np.asarray(scores, dtype=np.float64)
 
-    def _exact_match_score(self, y_true: pd.Series[str], y_pred: pd.Series[str]) -> float:
-        # Reset index to align the series
-        y_true = y_true.reset_index(drop=True)
-        y_pred = y_pred.reset_index(drop=True)
-        return (y_true == y_pred).mean()
+    def _exact_match_scores(self, y_true: pd.Series[str], y_pred: pd.Series[str]) -> pd.Series:
+        return y_true == y_pred
 
-    def _similarity_score(self, y_true: pd.Series[str], y_pred: pd.Series[str]) -> float:
+    def _similarity_scores(self, y_true: pd.Series[str], y_pred: pd.Series[str]) -> pd.Series:
         def calculate_similarity(true_text: str, pred_text: str) -> float:
             return SequenceMatcher(None, true_text, pred_text).ratio()
 
         ##TBD
         similarities = y_true.combine(y_pred, calculate_similarity)
-        return (similarities >= self.similarity_threshold).mean()
+        return similarities >= self.similarity_threshold
 
-    def _length_ratio(self, y_true: pd.Series[str], y_pred: pd.Series[str]) -> float:
-        length_ratios = y_pred.str.len() / y_true.str.len().replace(0, 1)
-        return length_ratios.mean()
+    def _length_ratios(self, y_true: pd.Series[str], y_pred: pd.Series[str]) -> pd.Series:
+        return y_pred.str.len() / y_true.str.len().replace(0, 1)
 
 
 class AutogenConversationMetric(Metric):
@@ -183,7 +463,178 @@ class AutogenConversationMetric(Metric):
         return float(score)
 
 
-MetricKind = AutogenMetric | AutogenConversationMetric
+class BleuMetric(BootstrapMetric):
+    """Compute the corpus BLEU score of text responses with hashed n-grams.
+
+    https://aclanthology.org/P02-1040/
+
+    Parameters:
+        max_order (int): maximum n-gram order of the precisions.
+        smooth (bool): apply add-one smoothing to the precisions.
+        lowercase (bool): lowercase the texts before tokenization.
+    """
+
+    KIND: T.Literal["BleuMetric"] = "BleuMetric"
+
+    max_order: int = 4
+    smooth: bool = False
+    lowercase: bool = False
+
+    def score(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> float:
+        statistics = self.statistics(targets=targets, outputs=outputs)
+        return float(self.bleu(statistics.sum(axis=0)))
+
+    def statistics(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> npt.NDArray[np.float64]:
+        """Compute the BLEU sufficient statistics of each row.
+
+        Args:
+            targets (pd.DataFrame): expected values.
+            outputs (pd.DataFrame): predicted values.
+
+        Returns:
+            npt.NDArray[np.float64]: matches, totals, prediction and target lengths by row.
+        """
+        y_true = _words(targets.response, lowercase=self.lowercase)
+        y_pred = _words(outputs.response, lowercase=self.lowercase)
+        n_rows = len(targets)
+        matches, totals = [], []
+        ngrams = zip(_ngrams(y_true, self.max_order), _ngrams(y_pred, self.max_order))
+        for true_ngrams, pred_ngrams in ngrams:
+            matches_, totals_, _ = _ngram_matches(true_ngrams, pred_ngrams, n_rows=n_rows)
+            matches.append(matches_)
+            totals.append(totals_)
+        lengths = [
+            np.bincount(y_pred[1], minlength=n_rows).astype(np.float64),
+            np.bincount(y_true[1], minlength=n_rows).astype(np.float64),
+        ]
+        return np.stack(matches + totals + lengths, axis=-1)
+
+    def interval(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> tuple[float, float]:
+        # resample the sufficient statistics, as the corpus BLEU is not a mean
+        statistics = self.statistics(targets=targets, outputs=outputs)
+        if len(statistics) == 0:  # the BLEU of the NaN sums would be 0
+            return np.nan, np.nan
+        sums = _bootstrap(statistics, self.bootstrap_samples, self.random_state)
+        return self._bounds(self.bleu(sums))
+
+    def bleu(self, statistics: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """Compute BLEU scores from aggregated sufficient statistics.
+
+        Args:
+            statistics (npt.NDArray[np.float64]): summed statistics (last axis).
+
+        Returns:
+            npt.NDArray[np.float64]: BLEU scores for the leading axes.
+        """
+        matches = statistics[..., : self.max_order]
+        totals = statistics[..., self.max_order : 2 * self.max_order]
+        pred_length, true_length = statistics[..., -2], statistics[..., -1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.smooth:
+                precisions = (matches + 1.0) / (totals + 1.0)
+            else:
+                precisions = np.where(totals > 0, matches / totals, 0.0)
+            geometric_mean = np.exp(np.log(precisions).mean(axis=-1))
+            ratio = pred_length / true_length
+            brevity_penalty = np.where(ratio >= 1.0, 1.0, np.exp(1.0 - 1.0 / ratio))
+        return np.where(pred_length > 0, geometric_mean * brevity_penalty, 0.0)
+
+
+class RougeLMetric(RowMetric):
+    """Compute the mean ROUGE-L F-measure of text responses with batched LCS.
+
+    https://aclanthology.org/W04-1013/
+
+    Parameters:
+        beta (float): weight of the recall in the F-measure.
+        lowercase (bool): lowercase the texts before tokenization.
+        batch_size (int): number of rows per LCS batch.
+    """
+
+    KIND: T.Literal["RougeLMetric"] = "RougeLMetric"
+
+    beta: float = 1.0
+    lowercase: bool = True
+    batch_size: int = 4096
+
+    def score(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> float:
+        scores = self.scores(targets=targets, outputs=outputs)
+        return float(scores.mean()) if len(scores) else 0.0
+
+    def scores(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> npt.NDArray[np.float64]:
+        """Compute the ROUGE-L F-measure of each row.
+
+        Args:
+            targets (pd.DataFrame): expected values.
+            outputs (pd.DataFrame): predicted values.
+
+        Returns:
+            npt.NDArray[np.float64]: ROUGE-L F-measure by row.
+        """
+        y_true = _words(targets.response, lowercase=self.lowercase)
+        y_pred = _words(outputs.response, lowercase=self.lowercase)
+        n_rows = len(targets)
+        lcs = _lcs_lengths(y_true, y_pred, n_rows=n_rows, batch_size=self.batch_size)
+        true_lengths = np.bincount(y_true[1], minlength=n_rows)
+        pred_lengths = np.bincount(y_pred[1], minlength=n_rows)
+        precision = lcs / np.maximum(pred_lengths, 1)
+        recall = lcs / np.maximum(true_lengths, 1)
+        return _fbeta(precision, recall, beta=self.beta)
+
+
+class ChrFMetric(RowMetric):
+    """Compute the mean chrF score of text responses with hashed character n-grams.
+
+    https://aclanthology.org/W15-3049/
+
+    Parameters:
+        max_order (int): maximum character n-gram order.
+        beta (float): weight of the recall in the F-score.
+        lowercase (bool): lowercase the texts before splitting.
+    """
+
+    KIND: T.Literal["ChrFMetric"] = "ChrFMetric"
+
+    max_order: int = 6
+    beta: float = 2.0
+    lowercase: bool = False
+
+    def score(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> float:
+        scores = self.scores(targets=targets, outputs=outputs)
+        return float(scores.mean()) if len(scores) else 0.0
+
+    def scores(self, targets: pd.DataFrame, outputs: pd.DataFrame) -> npt.NDArray[np.float64]:
+        """Compute the chrF score of each row.
+
+        Precisions and recalls are averaged over the orders with n-grams.
+
+        Args:
+            targets (pd.DataFrame): expected values.
+            outputs (pd.DataFrame): predicted values.
+
+        Returns:
+            npt.NDArray[np.float64]: chrF score by row.
+        """
+        y_true = _chars(targets.response, lowercase=self.lowercase)
+        y_pred = _chars(outputs.response, lowercase=self.lowercase)
+        n_rows = len(targets)
+        precisions, recalls = np.zeros(n_rows), np.zeros(n_rows)
+        pred_orders, true_orders = np.zeros(n_rows), np.zeros(n_rows)
+        ngrams = zip(_ngrams(y_true, self.max_order), _ngrams(y_pred, self.max_order))
+        for true_ngrams, pred_ngrams in ngrams:
+            matches, pred_totals, true_totals = _ngram_matches(
+                true_ngrams, pred_ngrams, n_rows=n_rows
+            )
+            precisions += matches / np.maximum(pred_totals, 1)
+            recalls += matches / np.maximum(true_totals, 1)
+            pred_orders += pred_totals > 0
+            true_orders += true_totals > 0
+        precision = precisions / np.maximum(pred_orders, 1)
+        recall = recalls / np.maximum(true_orders, 1)
+        return _fbeta(precision, recall, beta=self.beta)
+
+
+MetricKind = AutogenMetric | AutogenConversationMetric | BleuMetric | RougeLMetric | ChrFMetric
 MetricsKind: T.TypeAlias = list[T.Annotated[MetricKind, pdt.Field(discriminator="KIND")]]
 
 
@@ -1,5 +1,45 @@
 """Infrastructure Messaging - Kafka and event handling."""
 
+from .batching import DynamicBatcher
+from .codecs import ArrowCodec, Codec, DecodeError, JsonCodec, MsgpackCodec, get_codec
+from .config import KafkaServiceConfig
+from .consumers import AsyncConsumer, BatchConsumer, ConcurrentConsumer, FlowControl
+from .idempotency import IdempotencyCache
 from .kafka_app import FastAPIKafkaService, KafkaController
+from .lanes import PriorityLanes
+from .metrics import ServiceMetrics
+from .model_watcher import ModelWatcher
+from .offsets import OffsetTracker
+from .predictions import PredictionRequest, PredictionResponse
+from .prefork import PreforkSupervisor
+from .routing import RetryRouter
+from .transports import InMemoryBroker, KafkaTransport, Transport
 
-__all__ = ["FastAPIKafkaService", "KafkaController"]
+__all__ = [
+    "ArrowCodec",
+    "AsyncConsumer",
+    "BatchConsumer",
+    "Codec",
+    "ConcurrentConsumer",
+    "DecodeError",
+    "DynamicBatcher",
+    "FastAPIKafkaService",
+    "FlowControl",
+    "IdempotencyCache",
+    "InMemoryBroker",
+    "JsonCodec",
+    "KafkaController",
+    "KafkaServiceConfig",
+    "KafkaTransport",
+    "ModelWatcher",
+    "MsgpackCodec",
+    "OffsetTracker",
+    "PredictionRequest",
+    "PredictionResponse",
+    "PriorityLanes",
+    "PreforkSupervisor",
+    "RetryRouter",
+    "ServiceMetrics",
+    "Transport",
+    "get_codec",
+]
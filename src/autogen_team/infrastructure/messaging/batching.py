@@ -0,0 +1,115 @@
+"""Dynamic micro-batching of the concurrent prediction requests."""
+
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Any, List, Optional
+
+from autogen_team.infrastructure.messaging.metrics import ServiceMetrics
+from autogen_team.infrastructure.messaging.predictions import (
+    BatchPredictionCallback,
+    PredictionRequest,
+    PredictionResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_HTTP_BATCH_SIZE = int(os.getenv("DEFAULT_HTTP_BATCH_SIZE", 32))
+DEFAULT_BATCH_WAIT_MS = float(os.getenv("DEFAULT_BATCH_WAIT_MS", 10))
+DEFAULT_MAX_CONCURRENT_BATCHES = int(os.getenv("DEFAULT_MAX_CONCURRENT_BATCHES", 4))
+
+
+class DynamicBatcher:
+    """Group concurrent prediction requests into batches predicted with one call.
+
+    A batch is closed when it has max_batch_size requests, or max_wait seconds after its
+    first request. At most max_concurrent_batches batches are predicted at once: when
+    they are all running, the waiting requests accumulate into the next batch.
+    """
+
+    def __init__(
+        self,
+        batch_prediction_callback: BatchPredictionCallback,
+        max_batch_size: int = DEFAULT_HTTP_BATCH_SIZE,
+        max_wait: float = DEFAULT_BATCH_WAIT_MS / 1000,
+        max_concurrent_batches: int = DEFAULT_MAX_CONCURRENT_BATCHES,
+        metrics: Optional[ServiceMetrics] = None,
+    ):
+        self.batch_prediction_callback = batch_prediction_callback
+        self.metrics = metrics or ServiceMetrics()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrent_batches = max_concurrent_batches
+        self._queue: asyncio.Queue[tuple[PredictionRequest, asyncio.Future[Any]]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def submit(self, request: PredictionRequest) -> PredictionResponse:
+        """Submit a request to the next batch, and wait for its response."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queue = asyncio.Queue()  # start in the running loop
+            self._task = loop.create_task(self._run(self._queue))
+        future: asyncio.Future[PredictionResponse] = loop.create_future()
+        await self._queue.put((request, future))
+        return await future
+
+    async def stop(self) -> None:
+        """Stop collecting batches (the running batches are cancelled)."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(
+        self, queue: asyncio.Queue[tuple[PredictionRequest, asyncio.Future[Any]]]
+    ) -> None:
+        """Collect the queued requests into batches, and predict them concurrently."""
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+        tasks: set[asyncio.Task[None]] = set()
+
+        def done(task: asyncio.Task[None]) -> None:
+            tasks.discard(task)
+            slots.release()
+
+        try:
+            while True:
+                await slots.acquire()
+                items = [await queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(items) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                task = asyncio.create_task(self._predict(items))
+                tasks.add(task)
+                task.add_done_callback(done)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _predict(self, items: List[tuple[PredictionRequest, asyncio.Future[Any]]]) -> None:
+        """Predict a batch in a worker thread, and resolve the futures of its requests."""
+        requests = [request for request, _ in items]
+        self.metrics.observe_batch(len(requests), source="http")
+        try:
+            with self.metrics.predicting(), self.metrics.time("predict_batch"):
+                responses = await asyncio.to_thread(self.batch_prediction_callback, requests)
+            if len(responses) != len(requests):
+                raise ValueError(f"{len(responses)} responses for {len(requests)} requests")
+        except Exception as e:
+            logger.exception(f"Error during batch prediction processing: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), response in zip(items, responses):
+            if not future.done():  # the caller may be gone
+                future.set_result(response)
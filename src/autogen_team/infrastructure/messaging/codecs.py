@@ -0,0 +1,239 @@
+"""Payload codecs for the Kafka messages, selected by their content-type header."""
+
+import abc
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Constants
+CONTENT_TYPE_HEADER = "content-type"
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+CONTENT_TYPES = (JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE, ARROW_CONTENT_TYPE)
+
+Model = TypeVar("Model", bound=BaseModel)
+Headers = Optional[List[Tuple[str, Any]]]
+
+
+class DecodeError(ValueError):
+    """Raised when a payload cannot be decoded by its codec.
+
+    The message is safe to return to the producer: it never contains the payload.
+    """
+
+
+class Codec(abc.ABC):
+    """Base class for a payload codec.
+
+    Messages are dictionaries (e.g., {"input_data": {"input": [...]}}) of JSON types.
+    """
+
+    content_type: str
+
+    @abc.abstractmethod
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        """Decode a payload into a message.
+
+        Args:
+            payload (bytes): encoded message.
+
+        Raises:
+            DecodeError: if the payload is invalid.
+
+        Returns:
+            Dict[str, Any]: decoded message.
+        """
+
+    @abc.abstractmethod
+    def dumps(self, message: Dict[str, Any]) -> bytes:
+        """Encode a message into a payload.
+
+        Args:
+            message (Dict[str, Any]): message to encode.
+
+        Returns:
+            bytes: encoded message.
+        """
+
+    def validate(self, payload: bytes, model: Type[Model]) -> Model:
+        """Decode and validate a payload into a pydantic model.
+
+        Args:
+            payload (bytes): encoded message.
+            model (Type[Model]): pydantic model of the message.
+
+        Raises:
+            DecodeError: if the payload is invalid.
+            ValidationError: if the message does not match the model.
+
+        Returns:
+            Model: validated message.
+        """
+        return model.model_validate(self.loads(payload))
+
+
+class JsonCodec(Codec):
+    """Encode the messages as JSON, with orjson if it is installed.
+
+    Validation parses the payload bytes directly with pydantic (no intermediate objects).
+    """
+
+    content_type = JSON_CONTENT_TYPE
+
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        try:
+            message = orjson.loads(payload) if ORJSON_AVAILABLE else json.loads(payload)
+        except ValueError as error:
+            raise DecodeError("Invalid JSON format") from error
+        if not isinstance(message, dict):
+            raise DecodeError("Invalid JSON message")
+        return message
+
+    def dumps(self, message: Dict[str, Any]) -> bytes:
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY, default=str)
+        return json.dumps(message, default=str).encode("utf-8")
+
+    def validate(self, payload: bytes, model: Type[Model]) -> Model:
+        try:
+            return model.model_validate_json(payload)
+        except ValidationError as error:
+            if any(detail["type"] == "json_invalid" for detail in error.errors()):
+                raise DecodeError("Invalid JSON format") from None  # the error has the input
+            raise
+
+
+class MsgpackCodec(Codec):
+    """Encode the messages as MessagePack (requires msgpack)."""
+
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def __init__(self) -> None:
+        if not MSGPACK_AVAILABLE:
+            raise ImportError("msgpack is required for the MessagePack codec")
+
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        try:
+            message = msgpack.unpackb(payload, raw=False)
+        except (ValueError, msgpack.UnpackException) as error:
+            raise DecodeError("Invalid MessagePack format") from error
+        if not isinstance(message, dict):
+            raise DecodeError("Invalid MessagePack message")
+        return message
+
+    def dumps(self, message: Dict[str, Any]) -> bytes:
+        payload: bytes = msgpack.packb(message, default=str)
+        return payload
+
+
+class ArrowCodec(Codec):
+    """Encode the messages as Arrow IPC streams of records (requires pyarrow).
+
+    A decoded record batch becomes the columns of the message field (e.g., the input
+    rows of a prediction request), and an encoded message is a single record. Values
+    that Arrow cannot type (e.g., mixed lists) are encoded as JSON strings.
+
+    Parameters:
+        field (str): message field of the decoded records.
+    """
+
+    content_type = ARROW_CONTENT_TYPE
+
+    def __init__(self, field: str = "input_data") -> None:
+        if not ARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for the Arrow codec")
+        self.field = field
+
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        try:
+            table = pa.ipc.open_stream(payload).read_all()
+        except (pa.ArrowInvalid, OSError) as error:
+            raise DecodeError("Invalid Arrow format") from error
+        return {self.field: table.to_pydict()}
+
+    def dumps(self, message: Dict[str, Any]) -> bytes:
+        columns = {}
+        for key, value in message.items():
+            try:
+                columns[key] = pa.array([value])
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                columns[key] = pa.array([json.dumps(value, default=str)])
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        payload: bytes = sink.getvalue().to_pybytes()
+        return payload
+
+
+def codecs() -> Dict[str, Codec]:
+    """Create the available codecs by content type."""
+    available: Dict[str, Codec] = {JSON_CONTENT_TYPE: JsonCodec()}
+    if MSGPACK_AVAILABLE:
+        available[MSGPACK_CONTENT_TYPE] = MsgpackCodec()
+    if ARROW_AVAILABLE:
+        available[ARROW_CONTENT_TYPE] = ArrowCodec()
+    return available
+
+
+CODECS = codecs()
+
+
+def content_type(headers: Headers, header: str = CONTENT_TYPE_HEADER) -> Optional[str]:
+    """Get the content type of a message from its headers.
+
+    Args:
+        headers (Headers): message headers, as (key, value) pairs.
+        header (str): key of the content type header.
+
+    Returns:
+        Optional[str]: content type, without its parameters (e.g., charset).
+    """
+    for key, value in headers or []:
+        if isinstance(key, str) and key.lower() == header:
+            value = value.decode("utf-8") if isinstance(value, bytes) else str(value)
+            return value.split(";")[0].strip().lower()
+    return None
+
+
+def get_codec(content_type: Optional[str]) -> Codec:
+    """Get the codec of a content type (JSON if it is missing).
+
+    Args:
+        content_type (Optional[str]): content type of the message.
+
+    Raises:
+        DecodeError: if the content type is unknown, or its codec is not installed.
+
+    Returns:
+        Codec: codec of the content type.
+    """
+    codec = CODECS.get(content_type or JSON_CONTENT_TYPE)
+    if codec is not None:
+        return codec
+    if content_type in CONTENT_TYPES:
+        raise DecodeError(f"Unavailable content type: {content_type}")
+    raise DecodeError(f"Unsupported content type: {content_type}")
@@ -0,0 +1,66 @@
+"""Tuning knobs of the Kafka prediction service."""
+
+import os
+
+import pydantic as pdt
+
+from autogen_team.infrastructure.messaging.consumers import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_TIMEOUT,
+    DEFAULT_DEADLINE_HEADER,
+    DEFAULT_LATENCY_SLO,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_MAX_QUEUED,
+)
+from autogen_team.infrastructure.messaging.lanes import DEFAULT_LANE_IDLE
+from autogen_team.infrastructure.messaging.routing import DEFAULT_DELIVERY_ATTEMPTS
+
+# Constants
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("DEFAULT_FLUSH_INTERVAL", 1.0))
+DEFAULT_FLUSH_SIZE = int(os.getenv("DEFAULT_FLUSH_SIZE", 10_000))
+DEFAULT_REQUEST_ID_HEADER = "request-id"
+DEFAULT_LAG_INTERVAL = float(os.getenv("DEFAULT_LAG_INTERVAL", 5.0))
+DEFAULT_DRAIN_TIMEOUT = float(os.getenv("DEFAULT_DRAIN_TIMEOUT", 25.0))  # below the grace period
+
+
+class KafkaServiceConfig(pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
+    """Tuning knobs of the Kafka service, its consumer modes, retries and lanes.
+
+    The defaults are read from the environment, except for the opt-in retry topics,
+    dead letter topic, and input topics.
+
+    Parameters:
+        batch_size (int): messages predicted by batch (1: no batch mode, see BatchConsumer).
+        batch_timeout (float): seconds to wait for a batch, or for a free prediction slot.
+        flush_interval (float): seconds between the flushes of the producer.
+        flush_size (int): queued messages that trigger a flush of the producer.
+        max_in_flight (int): messages predicted concurrently (see FlowControl).
+        max_queued (int): messages waiting for a prediction slot.
+        latency_slo (float, optional): seconds a message can wait before it is shed.
+        deadline_header (str): header of the message deadlines (epoch seconds).
+        request_id_header (str): header of the request IDs (keys of the results).
+        retry_topics (list[tuple[str, float]]): retry topics and delays (see RetryRouter).
+        dead_letter_topic (str, optional): topic of the messages that cannot be retried.
+        delivery_attempts (int): produce attempts of each message.
+        lag_interval (float): seconds between the records of the consumer lag.
+        input_topics (dict[str, int], optional): priority of each input topic (lane).
+        lane_idle (float): seconds without message after which a lane has no more backlog.
+        drain_timeout (float): seconds to drain the in-flight predictions on shutdown.
+    """
+
+    batch_size: int = pdt.Field(default=DEFAULT_BATCH_SIZE, ge=1)
+    batch_timeout: float = pdt.Field(default=DEFAULT_BATCH_TIMEOUT, ge=0.0)
+    flush_interval: float = pdt.Field(default=DEFAULT_FLUSH_INTERVAL, ge=0.0)
+    flush_size: int = pdt.Field(default=DEFAULT_FLUSH_SIZE, ge=1)
+    max_in_flight: int = pdt.Field(default=DEFAULT_MAX_IN_FLIGHT, ge=1)
+    max_queued: int = pdt.Field(default=DEFAULT_MAX_QUEUED, ge=0)
+    latency_slo: float | None = DEFAULT_LATENCY_SLO
+    deadline_header: str = DEFAULT_DEADLINE_HEADER
+    request_id_header: str = DEFAULT_REQUEST_ID_HEADER
+    retry_topics: list[tuple[str, float]] = []
+    dead_letter_topic: str | None = None
+    delivery_attempts: int = pdt.Field(default=DEFAULT_DELIVERY_ATTEMPTS, ge=1)
+    lag_interval: float = pdt.Field(default=DEFAULT_LAG_INTERVAL, ge=0.0)
+    input_topics: dict[str, int] | None = None
+    lane_idle: float = pdt.Field(default=DEFAULT_LANE_IDLE, ge=0.0)
+    drain_timeout: float = pdt.Field(default=DEFAULT_DRAIN_TIMEOUT, ge=0.0)
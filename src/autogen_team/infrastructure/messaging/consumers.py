@@ -0,0 +1,520 @@
+"""Consumer modes of the Kafka service: batched, concurrent, and asyncio consumption."""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, cast
+
+from confluent_kafka import Consumer, TopicPartition
+
+from autogen_team.infrastructure.messaging.lanes import PriorityLanes
+from autogen_team.infrastructure.messaging.metrics import ServiceMetrics
+from autogen_team.infrastructure.messaging.predictions import PredictionRequest
+from autogen_team.infrastructure.messaging.routing import RetryRouter
+
+if TYPE_CHECKING:  # the service creates its consumer modes
+    from autogen_team.infrastructure.messaging.kafka_app import FastAPIKafkaService
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_BATCH_SIZE = int(os.getenv("DEFAULT_BATCH_SIZE", 1))  # 1: no Kafka batch mode
+DEFAULT_BATCH_TIMEOUT = float(os.getenv("DEFAULT_BATCH_TIMEOUT", 0.5))
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("DEFAULT_MAX_IN_FLIGHT", 1))
+DEFAULT_MAX_QUEUED = int(os.getenv("DEFAULT_MAX_QUEUED", 16))
+DEFAULT_LATENCY_SLO = float(os.getenv("DEFAULT_LATENCY_SLO", 0)) or None  # 0: no SLO
+DEFAULT_DEADLINE_HEADER = os.getenv("DEFAULT_DEADLINE_HEADER", "deadline")
+RETRY_LATER_ERROR = "Retry later"
+
+
+# Flow Control
+class FlowControl:
+    """Pause and resume the assigned partitions of a consumer, and shed the stale messages.
+
+    Backpressure: at most max_queued messages wait for one of the max_in_flight prediction
+    slots. The assigned partitions are paused above this limit, and resumed once the queue
+    is half drained. Optionally, messages that waited longer than latency_slo seconds, or
+    past their deadline header (epoch seconds), are answered with a "Retry later" error
+    instead of being predicted (load shedding).
+
+    Deferrals: a retry message not due yet (see RetryRouter), or a message of a held lane
+    (see PriorityLanes), pauses its partition and seeks back to it, until the message is due
+    or its lane is resumed. The deferred partitions stay paused under the backpressure.
+
+    Parameters:
+        lanes (PriorityLanes): lanes of the input topics.
+        router (RetryRouter): router of the failed messages, with their retry topics.
+        max_in_flight (int): number of messages predicted concurrently.
+        max_queued (int): number of messages waiting for a prediction slot.
+        latency_slo (float, optional): seconds a message can wait before it is shed.
+        deadline_header (str): header of the message deadlines (epoch seconds).
+        metrics (ServiceMetrics, optional): metrics recording the outstanding messages.
+    """
+
+    def __init__(
+        self,
+        lanes: PriorityLanes,
+        router: RetryRouter,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        latency_slo: Optional[float] = DEFAULT_LATENCY_SLO,
+        deadline_header: str = DEFAULT_DEADLINE_HEADER,
+        metrics: Optional[ServiceMetrics] = None,
+    ):
+        self.lanes = lanes
+        self.router = router
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.latency_slo = latency_slo
+        self.deadline_header = deadline_header
+        self.metrics = metrics or ServiceMetrics()
+        self.outstanding = 0  # messages admitted and not processed yet
+        self.paused = False
+        self.backpressured: List[TopicPartition] = []  # partitions paused by the backpressure
+        self.shed_count = 0
+        self.drained = threading.Event()  # set when the outstanding messages are drained
+        self.deferred: Dict[tuple[str, int], tuple[float, int]] = {}  # partition -> due, offset
+        self._lock = threading.Lock()
+
+    def admit(self) -> None:
+        """Count a message admitted for processing in the outstanding messages."""
+        with self._lock:
+            self.outstanding += 1
+            self.drained.clear()
+
+    def release(self, _: Any) -> None:
+        """Release a processed message from the outstanding messages."""
+        with self._lock:
+            self.outstanding -= 1
+            if self.outstanding <= self.max_in_flight + self.max_queued // 2:
+                self.drained.set()
+
+    def apply_backpressure(self, consumer: Optional[Consumer]) -> bool:
+        """Pause or resume the assigned partitions on the outstanding messages watermarks.
+
+        Only the partitions paused by the backpressure are resumed: the deferred partitions
+        (retries not due yet, held lanes) stay paused until they are resumed by resume_due.
+
+        Returns:
+            bool: True if the partitions are paused.
+        """
+        high = self.max_in_flight + self.max_queued
+        low = self.max_in_flight + self.max_queued // 2
+        with self._lock:
+            outstanding = self.outstanding
+        self.metrics.set_outstanding(outstanding)
+        if consumer and not self.paused and outstanding >= high:
+            self.backpressured = [
+                tp for tp in consumer.assignment() if (tp.topic, tp.partition) not in self.deferred
+            ]
+            consumer.pause(self.backpressured)
+            self.paused = True
+            logger.warning(f"Kafka consumer paused: {outstanding} outstanding messages")
+        elif consumer and self.paused and outstanding <= low:
+            assigned = {(tp.topic, tp.partition) for tp in consumer.assignment()}
+            consumer.resume(
+                [
+                    tp
+                    for tp in self.backpressured
+                    if (tp.topic, tp.partition) in assigned
+                    and (tp.topic, tp.partition) not in self.deferred
+                ]
+            )
+            self.backpressured = []
+            self.paused = False
+            logger.info(f"Kafka consumer resumed: {outstanding} outstanding messages")
+        return self.paused
+
+    def shed(self, msg: Any, admitted: float) -> bool:
+        """Check (and count) if a message waited past the latency SLO or its deadline header."""
+        if self._expired(msg, admitted):
+            with self._lock:
+                self.shed_count += 1
+            return True
+        return False
+
+    def _expired(self, msg: Any, admitted: float) -> bool:
+        """Check if a message waited past the latency SLO or its deadline header."""
+        if self.latency_slo is not None and time.monotonic() - admitted > self.latency_slo:
+            return True
+        for key, value in msg.headers() or []:
+            if key == self.deadline_header:
+                try:
+                    return time.time() > float(value.decode("utf-8"))
+                except (AttributeError, ValueError):
+                    logger.warning(f"Invalid deadline header: {value!r}")
+        return False
+
+    @property
+    def deferrable(self) -> bool:
+        """Check if messages can be deferred: with retry topics or priority lanes."""
+        return bool(self.router.retry_topics) or len(self.lanes.priorities) > 1
+
+    def defer_message(self, consumer: Optional[Consumer], msg: Any) -> bool:
+        """Defer a retry message not due yet, or a message of a held lane.
+
+        Returns:
+            bool: True if the message is deferred (it will be consumed again later).
+        """
+        return self.defer_retry(consumer, msg) or (
+            len(self.lanes.priorities) > 1 and self.hold_lane(consumer, msg)
+        )
+
+    def defer_retry(self, consumer: Optional[Consumer], msg: Any) -> bool:
+        """Defer a retry message until it is due."""
+        if msg.topic() not in self.router.topics:
+            return False
+        if self._fetched_before_pause(msg):
+            return True
+        due = self.router.due(msg)
+        return due > time.time() and self._defer(consumer, msg, due)
+
+    def hold_lane(self, consumer: Optional[Consumer], msg: Any) -> bool:
+        """Defer a message of an input topic while its lane is held (see PriorityLanes)."""
+        if msg.topic() not in self.lanes.priorities:
+            return False
+        if self._fetched_before_pause(msg):
+            return True
+        self.lanes.seen(msg.topic())
+        return self.lanes.held(msg.topic()) and self._defer(consumer, msg, math.inf)
+
+    def _fetched_before_pause(self, msg: Any) -> bool:
+        """Check if a message follows the deferred message of its partition.
+
+        It was fetched before the pause, and will be consumed again after the deferred one.
+        """
+        key = (msg.topic(), msg.partition())
+        if key in self.deferred and msg.offset() > self.deferred[key][1]:
+            return True
+        self.deferred.pop(key, None)  # redelivered: the deferral is over
+        return False
+
+    def _defer(self, consumer: Optional[Consumer], msg: Any, due: float) -> bool:
+        """Pause the partition of a message until due (epoch seconds), and seek back to it."""
+        if consumer is None:
+            return False
+        position = TopicPartition(msg.topic(), msg.partition(), msg.offset())
+        try:
+            consumer.pause([position])
+            consumer.seek(position)
+        except Exception:
+            logger.exception("Error during Kafka seek: processing the message now")
+            return False
+        self.deferred[(msg.topic(), msg.partition())] = (due, msg.offset())
+        return True
+
+    def resume_due(self, consumer: Optional[Consumer]) -> None:
+        """Resume the deferred partitions whose message is due, or whose lane is not held."""
+        now = time.time()
+        due = [
+            key
+            for key, (time_, _) in self.deferred.items()
+            if time_ <= now or (time_ == math.inf and not self.lanes.held(key[0]))
+        ]
+        for key in due:
+            del self.deferred[key]
+        partitions = [TopicPartition(topic, partition) for topic, partition in due]
+        if self.paused:  # resumed with the other partitions, once the backpressure is off
+            self.backpressured.extend(partitions)
+        elif partitions and consumer:
+            try:
+                consumer.resume(partitions)
+            except Exception:  # e.g., revoked partitions
+                logger.exception("Error during Kafka resume:")
+
+    def forget(self, partitions: List[TopicPartition]) -> None:
+        """Forget the deferrals of the partitions lost or revoked in a rebalance."""
+        for tp in partitions:
+            self.deferred.pop((tp.topic, tp.partition), None)
+
+
+# Consumer Modes
+class BatchConsumer:
+    """Consume batches of messages, and predict each batch with one callback call.
+
+    The consumer reads up to batch_size messages (waiting at most batch_timeout seconds)
+    and predicts them with the batch prediction callback, then produces one result per
+    source message. Batch mode replaces the concurrent predictions, so its messages are
+    neither bounded by max_in_flight and max_queued nor shed.
+
+    Parameters:
+        service (FastAPIKafkaService): service owning the Kafka clients and the callbacks.
+    """
+
+    def __init__(self, service: "FastAPIKafkaService"):
+        self.service = service
+
+    def run(self) -> None:
+        """Consume batches of messages from Kafka topic and produce their predictions."""
+        service = self.service
+        while not service.stop_event.is_set():
+            service._serve_deliveries()  # complete the delivered offsets
+            service._commit_completed()
+            msgs = []
+            for msg in self.poll():
+                if msg.error():
+                    if not service._handle_message_error(msg):
+                        service.stop_event.set()
+                        break
+                    continue
+                msgs.append(msg)
+            if msgs:
+                self.process(msgs)
+        service._close_consumer()
+
+    def poll(self) -> List[Any]:
+        """Poll a batch of messages from Kafka consumer (without the retries not due yet)."""
+        service = self.service
+        if not service.consumer:
+            logger.error("Kafka consumer is not initialized.")
+            return []
+        service._record_lag()
+        batch_size, timeout = service.config.batch_size, service.config.batch_timeout
+        if not service.flow.deferrable:
+            return service.consumer.consume(num_messages=batch_size, timeout=timeout)
+        service.flow.resume_due(service.consumer)
+        msgs = service.consumer.consume(num_messages=batch_size, timeout=timeout)
+        return [
+            msg
+            for msg in msgs
+            if msg.error() or not service.flow.defer_message(service.consumer, msg)
+        ]
+
+    def process(self, msgs: List[Any]) -> None:
+        """Predict a batch of valid Kafka messages with one callback call.
+
+        The offset of each message is completed once its result is delivered.
+        """
+        service = self.service
+        for msg in msgs:
+            service.offset_tracker.track(msg.topic(), msg.partition(), msg.offset())
+        results: List[Optional[Dict[str, Any]]] = [None] * len(msgs)
+        idempotency_keys = [service._idempotency_key(msg) for msg in msgs]
+        requests: Dict[int, PredictionRequest] = {}  # message position -> request
+        firsts: Dict[str, int] = {}  # request ID -> position of its first valid message
+        duplicates: Dict[int, int] = {}  # message position -> position of the same request
+        for position, (msg, request_id) in enumerate(zip(msgs, idempotency_keys)):
+            cached = service._cached_result(request_id)
+            if cached is not None:
+                results[position] = cached
+                continue
+            if request_id is not None and request_id in firsts:
+                duplicates[position] = firsts[request_id]
+                continue
+            try:
+                requests[position] = service._validate_message(msg)
+                if request_id is not None:
+                    firsts[request_id] = position
+            except Exception as e:
+                results[position] = service._failed_result(e)
+        logger.info(f"kafka Received input batch: {len(requests)}/{len(msgs)} valid messages")
+        predictions = self.predict(list(requests.values()))
+        for position, prediction in zip(requests, predictions):
+            results[position] = prediction
+            service._cache_result(idempotency_keys[position], prediction)
+        for position, first in duplicates.items():
+            results[position] = results[first]
+        if not service.producer:
+            logger.error("Kafka producer is not initialized.")
+            return
+        for msg, result in zip(msgs, results):
+            service._produce_message_result(
+                msg,
+                cast(Dict[str, Any], result),
+                callback=service._complete_on_delivery(msg),
+                poll=False,
+            )
+        service.producer.poll(0)  # serve the delivery callbacks
+
+    def predict(self, requests: List[PredictionRequest]) -> List[Dict[str, Any]]:
+        """Predict the requests of a batch, one request at a time if the batch fails."""
+        service = self.service
+        if not requests or service.batch_prediction_callback is None:
+            return []
+        service.metrics.observe_batch(len(requests))
+        try:
+            with service.metrics.predicting(), service.metrics.time("predict_batch"):
+                responses = service.batch_prediction_callback(requests)
+            if len(responses) == len(requests):
+                return [response.result for response in responses]
+            logger.error(f"Batch returned {len(responses)} results for {len(requests)} requests")
+        except Exception as e:
+            logger.exception(f"Error during batch prediction processing: {e}")
+        results = []
+        for request in requests:  # isolate the failing requests
+            try:
+                results.append(service.prediction_callback(request).result)
+            except Exception as e:
+                results.append(service._failed_result(e))
+        return results
+
+
+class ConcurrentConsumer:
+    """Consume messages with up to max_in_flight predictions running in a worker pool.
+
+    The admitted messages are bounded and shed by the flow control of the service (see
+    FlowControl). On shutdown, the queued messages are dropped (the next owner of their
+    partitions consumes them again), and the running ones have drain_timeout seconds.
+
+    Parameters:
+        service (FastAPIKafkaService): service owning the Kafka clients and the callbacks.
+    """
+
+    def __init__(self, service: "FastAPIKafkaService"):
+        self.service = service
+
+    def run(self) -> None:
+        """Consume messages with up to max_in_flight predictions running concurrently."""
+        service, flow = self.service, self.service.flow
+        pool = ThreadPoolExecutor(flow.max_in_flight, thread_name_prefix="kafka-worker")
+        futures: set[Future[None]] = set()
+        try:
+            while not service.stop_event.is_set():
+                service._serve_deliveries()  # complete the delivered offsets
+                service._commit_completed()
+                if flow.apply_backpressure(service.consumer):
+                    flow.drained.wait(service.config.batch_timeout)
+                    msg = service._poll_message(0)  # keep the consumer in its group
+                else:
+                    msg = service._poll_message()
+                if msg is None:
+                    continue
+                if msg.error():
+                    if not service._handle_message_error(msg):
+                        break
+                    continue
+                service.offset_tracker.track(msg.topic(), msg.partition(), msg.offset())
+                flow.admit()
+                flow.lanes.start(msg.topic())
+                future = pool.submit(self.process, msg, time.monotonic())
+                futures.add(future)
+                future.add_done_callback(futures.discard)
+                future.add_done_callback(flow.release)
+                future.add_done_callback(lambda _, topic=msg.topic(): flow.lanes.finish(topic))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)  # drop the queued messages
+            _, running = wait(list(futures), timeout=service.config.drain_timeout)
+            if running:
+                logger.warning(f"Drain timeout: {len(running)} predictions still running")
+            service._close_consumer()
+
+    def process(self, msg: Any, admitted: float) -> None:
+        """Process a valid Kafka message in a worker, completing its offset on delivery."""
+        service = self.service
+        if service.flow.shed(msg, admitted):
+            prediction_result = service._error_result(RETRY_LATER_ERROR)
+        else:
+            with service.metrics.time("process"):
+                prediction_result = service._predict_message(msg)
+        service._produce_message_result(
+            msg, prediction_result, callback=service._complete_on_delivery(msg), poll=False
+        )
+
+
+class AsyncConsumer:
+    """Consume messages in the running event loop, with up to max_in_flight predictions.
+
+    All the consumer calls run in a dedicated thread (the consumer is not thread safe),
+    while the predictions and the delivery callbacks run in the event loop. As in the
+    concurrent mode, the admitted messages are bounded and shed by the flow control.
+
+    Parameters:
+        service (FastAPIKafkaService): service owning the Kafka clients and the callbacks.
+    """
+
+    def __init__(self, service: "FastAPIKafkaService"):
+        self.service = service
+
+    async def run(self) -> None:
+        """Consume messages and await their predictions until the service stops."""
+        service, flow = self.service, self.service.flow
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(flow.max_in_flight)
+        tasks: set[asyncio.Task[None]] = set()
+
+        with ThreadPoolExecutor(1, thread_name_prefix="kafka-consumer") as consumer_thread:
+            try:
+                while not service.stop_event.is_set():
+                    if service.producer:
+                        service.producer.poll(0)  # serve the delivery callbacks
+                    await loop.run_in_executor(consumer_thread, service._commit_completed)
+                    if await loop.run_in_executor(
+                        consumer_thread, flow.apply_backpressure, service.consumer
+                    ):
+                        if tasks:
+                            await asyncio.wait(
+                                tasks,
+                                timeout=service.config.batch_timeout,
+                                return_when=asyncio.FIRST_COMPLETED,
+                            )
+                        # keep the consumer in its group
+                        msg = await loop.run_in_executor(consumer_thread, service._poll_message, 0)
+                    else:
+                        msg = await loop.run_in_executor(consumer_thread, service._poll_message)
+                    if msg is None:
+                        continue
+                    if msg.error():
+                        if not service._handle_message_error(msg):
+                            break
+                        continue
+                    service.offset_tracker.track(msg.topic(), msg.partition(), msg.offset())
+                    flow.admit()
+                    flow.lanes.start(msg.topic())
+                    task = asyncio.create_task(
+                        self.process(msg, admitted=time.monotonic(), slots=slots)
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    task.add_done_callback(flow.release)
+                    task.add_done_callback(lambda _, topic=msg.topic(): flow.lanes.finish(topic))
+            finally:
+                if tasks:
+                    _, running = await asyncio.wait(tasks, timeout=service.config.drain_timeout)
+                    if running:
+                        logger.warning(f"Drain timeout: {len(running)} predictions cancelled")
+                    for task in running:
+                        task.cancel()
+                    await asyncio.gather(*running, return_exceptions=True)
+                await loop.run_in_executor(consumer_thread, service._close_consumer)
+
+    async def process(self, msg: Any, admitted: float, slots: asyncio.Semaphore) -> None:
+        """Process a valid Kafka message in the event loop, completing its offset on delivery.
+
+        The message waits for a prediction slot, and is shed if it waited too long. It is
+        dropped if the consumer stops meanwhile: the next owner of its partition consumes it.
+        """
+        service = self.service
+        async with slots:
+            if service.stop_event.is_set():
+                return
+            if service.flow.shed(msg, admitted):
+                prediction_result = service._error_result(RETRY_LATER_ERROR)
+            else:
+                with service.metrics.time("process"):
+                    prediction_result = await self.predict(msg)
+            service._produce_message_result(
+                msg, prediction_result, callback=service._complete_on_delivery(msg), poll=False
+            )
+
+    async def predict(self, msg: Any) -> Dict[str, Any]:
+        """Predict the result of a valid Kafka message with the async callback."""
+        service = self.service
+        request_id = service._idempotency_key(msg)
+        cached = service._cached_result(request_id)
+        if cached is not None:
+            return cached
+        try:
+            input_obj = service._decode_message(msg)
+            if service.async_prediction_callback is None:
+                raise RuntimeError("Async prediction callback is not set.")
+            with service.metrics.predicting(), service.metrics.time("predict"):
+                response = await service.async_prediction_callback(input_obj)
+            prediction_result: Dict[str, Any] = response.result
+            service._cache_result(request_id, prediction_result)
+        except Exception as e:
+            prediction_result = service._failed_result(e)
+        return prediction_result
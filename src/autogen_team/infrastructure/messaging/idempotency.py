@@ -0,0 +1,104 @@
+"""Idempotency cache of the results of recently completed requests."""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Entry = Tuple[float, Dict[str, Any]]  # (expiration time, result)
+
+
+class IdempotencyCache:
+    """Bounded LRU cache of request ID -> result, whose entries expire after ttl seconds.
+
+    Redelivered messages (e.g., after a consumer rebalance) are answered from the cache
+    instead of predicting them again. With a path, the cache is loaded from this local
+    JSON file on creation, and saved to it (atomically) with save(): the expiration
+    times are wall-clock times, so they remain valid across restarts.
+
+    Parameters:
+        max_size (int): maximum number of cached results (the least recently used are evicted).
+        ttl (float): time to live of the cached results, in seconds.
+        path (str, optional): local file persisting the cache.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.entries: OrderedDict[str, Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.entries)
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Get the cached result of a request, if it has not expired.
+
+        Args:
+            request_id (str): ID of the request.
+
+        Returns:
+            Optional[Dict[str, Any]]: cached result, or None.
+        """
+        with self._lock:
+            entry = self.entries.get(request_id)
+            if entry is None:
+                return None
+            expires, result = entry
+            if expires <= time.time():
+                del self.entries[request_id]
+                return None
+            self.entries.move_to_end(request_id)
+            return result
+
+    def put(self, request_id: str, result: Dict[str, Any]) -> None:
+        """Cache the result of a completed request.
+
+        Args:
+            request_id (str): ID of the request.
+            result (Dict[str, Any]): result of the request.
+        """
+        with self._lock:
+            self.entries[request_id] = (time.time() + self.ttl, result)
+            self.entries.move_to_end(request_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def save(self) -> None:
+        """Save the unexpired results to the cache path (if any)."""
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = {key: entry for key, entry in self.entries.items() if entry[0] > now}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as file:
+            json.dump(entries, file, default=str)
+        os.replace(file.name, self.path)  # readers never see a partial file
+        logger.info(f"Idempotency cache saved: {len(entries)} results")
+
+    def _load(self, path: str) -> None:
+        """Load the unexpired results of a cache file (ignoring an invalid file)."""
+        now = time.time()
+        try:
+            with open(path) as file:
+                for key, (expires, result) in json.load(file).items():
+                    if expires > now:
+                        self.entries[key] = (expires, result)
+        except (OSError, ValueError, TypeError, AttributeError) as error:
+            logger.warning(f"Invalid idempotency cache file {path}: {error}")
+            self.entries.clear()
+            return
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        logger.info(f"Idempotency cache loaded: {len(self.entries)} results")
@@ -1,24 +1,69 @@
 """FastAPI and Kafka Service for Predictions with Logging."""
 
-import json
+import asyncio
+import contextlib
 import logging
 import os
 import signal
 import sys
 import threading
 import time
-from typing import Any, Callable, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 import pandas as pd
 import uvicorn
-from confluent_kafka import Consumer, KafkaError, Producer
-from fastapi import FastAPI
+from confluent_kafka import Consumer, KafkaError, Producer, TopicPartition
+from fastapi import FastAPI, HTTPException, Response
+from pandera.errors import SchemaError, SchemaErrors
 from pandera.typing.common import DataFrameBase
-from pydantic import BaseModel
+from pydantic import ValidationError
 
 import autogen_team.infrastructure.io
 from autogen_team.core.schemas import InputsSchema, Outputs
 from autogen_team.infrastructure import services
+from autogen_team.infrastructure.messaging import codecs
+from autogen_team.infrastructure.messaging.batching import (
+    DEFAULT_BATCH_WAIT_MS,
+    DEFAULT_HTTP_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENT_BATCHES,
+    DynamicBatcher,
+)
+from autogen_team.infrastructure.messaging.config import KafkaServiceConfig
+from autogen_team.infrastructure.messaging.consumers import (
+    RETRY_LATER_ERROR,
+    AsyncConsumer,
+    BatchConsumer,
+    ConcurrentConsumer,
+    FlowControl,
+)
+from autogen_team.infrastructure.messaging.idempotency import IdempotencyCache
+from autogen_team.infrastructure.messaging.lanes import PriorityLanes
+from autogen_team.infrastructure.messaging.metrics import (
+    MULTIPROCESS_DIR_ENV,
+    ServiceMetrics,
+    multiprocess_dir,
+)
+from autogen_team.infrastructure.messaging.model_watcher import ModelWatcher
+from autogen_team.infrastructure.messaging.offsets import OffsetTracker
+from autogen_team.infrastructure.messaging.predictions import (
+    AsyncPredictionCallback,
+    BatchPredictionCallback,
+    InvalidRequestError,
+    MessageRequest,
+    PredictionCallback,
+    PredictionRequest,
+    PredictionResponse,
+)
+from autogen_team.infrastructure.messaging.prefork import PreforkSupervisor
+from autogen_team.infrastructure.messaging.routing import (
+    DEFAULT_DEAD_LETTER_TOPIC,
+    DEFAULT_RETRY_DELAYS,
+    PERMANENT_ERROR_FIELD,
+    DeliveryCallback,
+    RetryRouter,
+    header,
+)
+from autogen_team.infrastructure.messaging.transports import Transport
 from autogen_team.registry.adapters.mlflow_adapter import CustomLoader
 
 sys.modules["autogen_team.io"] = autogen_team.infrastructure.io
@@ -46,6 +91,28 @@ DEFAULT_INPUT_TOPIC = os.getenv("DEFAULT_INPUT_TOPIC", "llm_input_topic")
 DEFAULT_OUTPUT_TOPIC = os.getenv("DEFAULT_OUTPUT_TOPIC", "llm_output_topic")
 DEFAULT_FASTAPI_HOST = os.getenv("DEFAULT_FASTAPI_HOST", "127.0.0.1")
 DEFAULT_FASTAPI_PORT = int(os.getenv("DEFAULT_FASTAPI_PORT", 8100))
+DEFAULT_LINGER_MS = int(os.getenv("DEFAULT_LINGER_MS", 5))
+DEFAULT_BATCH_NUM_MESSAGES = int(os.getenv("DEFAULT_BATCH_NUM_MESSAGES", 1_000))
+INVALID_INPUT_ERROR = "Invalid input schema"
+DEFAULT_ASYNCIO_CONSUMER = os.getenv("DEFAULT_ASYNCIO_CONSUMER", "false").lower() == "true"
+DEFAULT_WORKERS = int(os.getenv("DEFAULT_WORKERS", 1))
+DEFAULT_COMPRESSION_TYPE = os.getenv("DEFAULT_COMPRESSION_TYPE", "lz4")
+DEFAULT_IDEMPOTENCY_SIZE = int(os.getenv("DEFAULT_IDEMPOTENCY_SIZE", 10000))
+DEFAULT_IDEMPOTENCY_TTL = float(os.getenv("DEFAULT_IDEMPOTENCY_TTL", 3600))  # 0: no cache
+DEFAULT_IDEMPOTENCY_PATH = os.getenv("DEFAULT_IDEMPOTENCY_PATH")  # None: in memory
+DEFAULT_RETRY_TOPICS = [  # the topics must exist: the consumer subscribes to them
+    (f"{DEFAULT_INPUT_TOPIC}_retry_{index}", delay)
+    for index, delay in enumerate(DEFAULT_RETRY_DELAYS)
+]
+DEFAULT_MODEL_WATCH_INTERVAL = float(os.getenv("DEFAULT_MODEL_WATCH_INTERVAL", 60))  # 0: off
+DEFAULT_MODEL_WATCH_MAX_BACKOFF = float(os.getenv("DEFAULT_MODEL_WATCH_MAX_BACKOFF", 600))
+DEFAULT_INPUT_TOPICS = {  # "topic:priority,...": lanes of input topics (e.g., interactive:10)
+    topic: int(priority or 1)
+    for topic, _, priority in (
+        lane.partition(":") for lane in os.getenv("DEFAULT_INPUT_TOPICS", "").split(",") if lane
+    )
+} or {DEFAULT_INPUT_TOPIC: 1}
+DEFAULT_ASSIGNMENT_STRATEGY = os.getenv("DEFAULT_ASSIGNMENT_STRATEGY", "cooperative-sticky")
 LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
 
@@ -57,42 +124,99 @@ logger = logging.getLogger(__name__)
 # Suppress annoying warnings
 logging.getLogger("mlflow.utils.requirements_utils").setLevel(logging.ERROR)
 
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run the asyncio Kafka consumer (if any) in the event loop of the FastAPI application."""
+    service = fastapi_kafka_service
+    task: Optional[asyncio.Task[None]] = None
+    if service is not None and service.async_prediction_callback is not None:
+        task = asyncio.create_task(service.consume_async())
+        logger.info("Kafka consumer task started.")
+    try:
+        yield
+    finally:
+        if service is not None and task is not None:
+            service.stop_event.set()
+            await task
+        elif service is not None and service.consumer_thread is not None:
+            await asyncio.to_thread(service.drain)
+        if prediction_batcher is not None:
+            await prediction_batcher.stop()
+
+
 # FastAPI App Initialization
 app: FastAPI = FastAPI(
     title="Prediction Service API",
     description="A FastAPI service that integrates with Kafka for making predictions.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
-# Data Models
-class PredictionRequest(BaseModel):
-    """Request model for prediction."""
-
-    input_data: Dict[str, Any] = {"input": ["text 1", "text 2"]}
-
-    def validate_model(self) -> DataFrameBase[InputsSchema]:
-        """Validates the input data against InputsSchema."""
-        return InputsSchema.validate(pd.DataFrame([self.input_data]))
-
-
-class PredictionResponse(BaseModel):
-    """Response model for prediction."""
-
-    result: Dict[str, Any] = {"inference": [0.0], "quality": 0.0, "error": ""}
-
-
 # Core Service Class
 class FastAPIKafkaService:
-    """Service for deploying a FastAPI application with a Kafka producer and consumer."""
+    """Service for deploying a FastAPI application with a Kafka producer and consumer.
+
+    The tuning knobs are grouped in config (see KafkaServiceConfig). The consumer mode
+    depends on the callbacks and knobs. With a batch prediction callback and a batch_size
+    above 1, the messages are predicted by batches (opt-in, see BatchConsumer). Else, with max_in_flight above 1, they are predicted concurrently by a
+    worker pool (see ConcurrentConsumer). With an async prediction callback, the consumer
+    runs as an asyncio task of the FastAPI lifespan instead of a thread (see AsyncConsumer).
+    The concurrent modes apply backpressure and load shedding (see FlowControl).
+
+    Results are produced asynchronously: delivery callbacks are served with poll(0),
+    the producer is flushed every flush_interval seconds or when flush_size messages
+    are queued, and the source offsets are committed once their results are delivered:
+    in every mode, each partition commits only its highest contiguous delivered offset
+    (see OffsetTracker), so a message rerouted or delivered late holds back its partition.
+    A message whose delivery fails is produced again, up to delivery_attempts times in
+    total. If it still fails, the source message goes to the dead letter topic (if any)
+    and its offset is completed anyway, so it does not hold back its partition forever.
+
+    The request ID of a message (its request_id_header, or else its key) is the key of
+    its result, and is copied to the result headers. With an idempotency cache, the
+    successful results are cached by their request_id_header, and redelivered requests
+    are answered from the cache instead of being predicted again. Keys are not used for
+    deduplication: producers often key unrelated requests by user or session.
+
+    With retry topics (topic, delay), a failed message is rerouted instead of producing its
+    error result (see RetryRouter): the dead-lettered messages also produce their error
+    result, so callers get an answer. Invalid messages (decode errors, or InvalidRequestError
+    from the callbacks) are not retried. The consumer subscribes to the retry topics, and
+    pauses a retry partition until its next message is due (without blocking the others).
+
+    With several input topics (topic -> priority), the lanes are scheduled by priority
+    (see PriorityLanes): a held lane is paused and sought back to its next message, and
+    resumed once the lanes of higher priority are idle or once it has a free slot.
+
+    The stage latencies, in-flight predictions, batch sizes, consumer lag (every
+    lag_interval seconds) and message statuses are recorded in metrics (see /metrics).
+
+    On shutdown (stop, server exit, or SIGTERM in a worker), the consumer drains: it stops
+    fetching, waits up to drain_timeout seconds for the in-flight predictions (the queued
+    ones are dropped and consumed again by the next owner), flushes the producer, and
+    commits the final offsets before closing. On a rebalance, the revoked partitions are
+    drained and committed the same way, and the others keep running: use an incremental
+    cooperative assignor (partition.assignment.strategy=cooperative-sticky).
+
+    The Kafka clients are created by the transport, if any (e.g., an InMemoryBroker for
+    offline tests and benchmarks), else they connect to the Kafka cluster.
+    """
 
     def __init__(
         self,
-        prediction_callback: Callable[[PredictionRequest], PredictionResponse],
+        prediction_callback: PredictionCallback,
         producer_config: Dict[str, Any],
         consumer_config: Dict[str, Any],
         input_topic: str,
         output_topic: str,
+        batch_prediction_callback: Optional[BatchPredictionCallback] = None,
+        async_prediction_callback: Optional[AsyncPredictionCallback] = None,
+        idempotency_cache: Optional[IdempotencyCache] = None,
+        metrics: Optional[ServiceMetrics] = None,
+        transport: Optional[Transport] = None,
+        config: Optional[KafkaServiceConfig] = None,
     ):
         self.server_thread: threading.Thread | None = None
         self.stop_event: threading.Event = threading.Event()
@@ -101,6 +225,33 @@ class FastAPIKafkaService:
         self.consumer_config = consumer_config
         self.input_topic = input_topic
         self.output_topic = output_topic
+        self.batch_prediction_callback = batch_prediction_callback
+        self.async_prediction_callback = async_prediction_callback
+        self.idempotency_cache = idempotency_cache
+        self.config = config = config or KafkaServiceConfig()
+        self.last_flush = time.monotonic()
+        self.last_lag = time.monotonic()
+        self.offset_tracker = OffsetTracker()
+        self.metrics = metrics or ServiceMetrics()
+        self.router = RetryRouter(
+            config.retry_topics, config.dead_letter_topic, config.delivery_attempts, self.metrics
+        )
+        lanes = PriorityLanes(
+            dict(config.input_topics or {input_topic: 1}),
+            slots=config.max_in_flight + config.max_queued,
+            idle=config.lane_idle,
+        )
+        self.flow = FlowControl(
+            lanes,
+            self.router,
+            config.max_in_flight,
+            config.max_queued,
+            config.latency_slo,
+            config.deadline_header,
+            self.metrics,
+        )
+        self.consumer_thread: threading.Thread | None = None
+        self.transport = transport
         self.producer: Producer | None = None
         self.consumer: Consumer | None = None
 
@@ -111,20 +262,116 @@ class FastAPIKafkaService:
         else:
             logger.info(f"Message delivered to {msg.topic()} [{msg.partition()}]")
 
+    def _complete_on_delivery(self, msg: Any) -> DeliveryCallback:
+        """Create a delivery callback completing the source message offset in the tracker.
+
+        If the delivery failed (after all its attempts), the source message is produced to
+        the dead letter topic (if any) before its offset is completed.
+        """
+        topic, partition, offset = msg.topic(), msg.partition(), msg.offset()
+        produced = time.perf_counter()
+
+        def complete(err: Optional[KafkaError], delivered: Any) -> None:
+            self.delivery_report(err, delivered)
+            self.offset_tracker.complete(topic, partition, offset)
+
+        def callback(err: Optional[KafkaError], delivered: Any) -> None:
+            self.metrics.observe("delivery", time.perf_counter() - produced)
+            if err is not None:
+                self.metrics.count("undelivered")
+                dead_letter_topic = self.router.dead_letter_topic
+                if dead_letter_topic:  # complete the offset once dead-lettered
+                    self.delivery_report(err, delivered)
+                    error = f"Delivery failed: {err}"
+                    self.router.reroute(
+                        self.producer, msg, error, dead_letter_topic, None, complete, poll=False
+                    )
+                    return
+                logger.error(f"Result of {topic} [{partition}] offset {offset} is lost")
+            complete(err, delivered)
+
+        return callback
+
+    def _commit_completed(self, asynchronous: bool = True) -> None:
+        """Commit the highest contiguous completed offset of each partition."""
+        offsets = self.offset_tracker.committable()
+        if offsets and self.consumer:
+            try:
+                with self.metrics.time("commit"):
+                    if asynchronous:
+                        self.consumer.commit(offsets=offsets, asynchronous=True)
+                    else:  # e.g., the final offsets
+                        self.consumer.commit(offsets=offsets, asynchronous=False)
+            except Exception:
+                logger.exception("Error during Kafka commit:")
+
+    def _record_lag(self) -> None:
+        """Record the lag of the assigned partitions, every lag_interval seconds."""
+        now = time.monotonic()
+        if not self.consumer or now - self.last_lag < self.config.lag_interval:
+            return
+        self.last_lag = now
+        try:
+            for position in self.consumer.position(self.consumer.assignment()):
+                _, high = self.consumer.get_watermark_offsets(position, cached=True)
+                if position.offset >= 0 and high >= 0:
+                    self.metrics.set_lag(position.topic, position.partition, high - position.offset)
+        except Exception as e:  # e.g., a rebalance in progress
+            logger.debug(f"Consumer lag not recorded: {e}")
+
+    def _serve_deliveries(self) -> None:
+        """Serve the delivery callbacks, and flush the producer when it is due."""
+        if not self.producer:
+            return
+        self.producer.poll(0)
+        now = time.monotonic()
+        if (
+            len(self.producer) >= self.config.flush_size
+            or now - self.last_flush >= self.config.flush_interval
+        ):
+            self.producer.flush(self.config.flush_interval)
+            self.last_flush = now
+
     def start(self) -> None:
         """Start the FastAPI application and Kafka consumer."""
         self.stop_event.clear()
         self._initialize_kafka_producer()
         self._initialize_kafka_consumer()
-        time.sleep(2)  # Allow server to start
-        threading.Thread(target=self._consume_messages, daemon=True).start()
-        logger.info("FastAPI server and Kafka consumer threads started.")
+        if self.async_prediction_callback is None:  # else: started by the app lifespan
+            time.sleep(2)  # Allow server to start
+            self.consumer_thread = threading.Thread(target=self._consume_messages, daemon=True)
+            self.consumer_thread.start()
+            logger.info("FastAPI server and Kafka consumer threads started.")
         self._run_server()
 
+    def run_worker(self) -> None:
+        """Run the Kafka consumer in the current thread, without the FastAPI server.
+
+        Use it in prefork workers: the Kafka clients are created in the worker process,
+        and SIGTERM stops the consumer gracefully (it drains before closing).
+
+        Raises:
+            RuntimeError: if the consumer stopped without being asked to (e.g., on a Kafka
+                error), so the worker exits with an error code and is restarted.
+        """
+        self.stop_event.clear()
+        self._initialize_kafka_producer()
+        self._initialize_kafka_consumer()
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop_event.set())
+        if self.async_prediction_callback is not None:
+            asyncio.run(self.consume_async())
+        else:
+            self._consume_messages()
+        if not self.stop_event.is_set():
+            raise RuntimeError("Kafka consumer stopped on an error.")
+
     def _initialize_kafka_producer(self) -> None:
         """Initialize Kafka producer."""
         try:
-            self.producer = Producer(self.producer_config)
+            if self.transport is not None:
+                self.producer = self.transport.producer(self.producer_config)
+            else:
+                self.producer = Producer(self.producer_config)
             logger.info("Kafka producer initialized")
         except Exception as e:
             logger.error(f"Failed to initialize Kafka producer: {e}")
@@ -134,9 +381,13 @@ class FastAPIKafkaService:
         """Initialize Kafka consumer."""
         self.consumer_config["enable.auto.commit"] = False
         try:
-            self.consumer = Consumer(self.consumer_config)
-            self.consumer.subscribe([self.input_topic])
-            logger.info(f"Kafka consumer subscribed to topic: {self.input_topic}")
+            if self.transport is not None:
+                self.consumer = self.transport.consumer(self.consumer_config)
+            else:
+                self.consumer = Consumer(self.consumer_config)
+            topics = list(self.flow.lanes.priorities) + self.router.topics
+            self.consumer.subscribe(topics, on_revoke=self._on_revoke, on_lost=self._on_lost)
+            logger.info(f"Kafka consumer subscribed to topics: {topics}")
         except Exception as e:
             logger.error(f"Failed to initialize Kafka consumer: {e}")
             raise
@@ -150,8 +401,15 @@ class FastAPIKafkaService:
 
     def _consume_messages(self) -> None:
         """Consume messages from Kafka topic and produce predictions."""
+        if self.batch_prediction_callback is not None and self.config.batch_size > 1:
+            BatchConsumer(self).run()
+            return
+        if self.flow.max_in_flight > 1:
+            ConcurrentConsumer(self).run()
+            return
         while not self.stop_event.is_set():
-            time.sleep(0.1)
+            self._serve_deliveries()  # complete the delivered offsets
+            self._commit_completed()
             msg = self._poll_message()
             if msg is None:
                 continue
@@ -162,10 +420,24 @@ class FastAPIKafkaService:
             self._process_message(msg)
         self._close_consumer()
 
-    def _poll_message(self) -> Any:
-        """Poll message from Kafka consumer."""
+    async def consume_async(self) -> None:
+        """Consume messages in the running event loop, with up to max_in_flight predictions.
+
+        The consumer calls run in a dedicated thread (see AsyncConsumer).
+        """
+        await AsyncConsumer(self).run()
+
+    def _poll_message(self, timeout: float = 1.0) -> Any:
+        """Poll message from Kafka consumer (None for a retry not due yet)."""
         if self.consumer:
-            return self.consumer.poll(1.0)
+            self._record_lag()
+            if not self.flow.deferrable:
+                return self.consumer.poll(timeout)
+            self.flow.resume_due(self.consumer)
+            msg = self.consumer.poll(timeout)
+            if msg is not None and not msg.error() and self.flow.defer_message(self.consumer, msg):
+                return None
+            return msg
         else:
             logger.error("Kafka consumer is not initialized.")
             return None
@@ -182,60 +454,280 @@ class FastAPIKafkaService:
         return True
 
     def _process_message(self, msg: Any) -> None:
-        """Process a valid Kafka message."""
-        predictionresponse: PredictionResponse = PredictionResponse()
+        """Process a valid Kafka message, completing its offset on delivery."""
+        self.offset_tracker.track(msg.topic(), msg.partition(), msg.offset())
+        with self.metrics.time("process"):
+            prediction_result = self._predict_message(msg)
+            self._produce_message_result(
+                msg, prediction_result, callback=self._complete_on_delivery(msg)
+            )
+
+    def _predict_message(self, msg: Any) -> Dict[str, Any]:
+        """Predict the result of a valid Kafka message, or its error result."""
+        request_id = self._idempotency_key(msg)
+        cached = self._cached_result(request_id)
+        if cached is not None:
+            return cached
         try:
-            kafka_msg: Dict[str, Any] = json.loads(msg.value().decode("utf-8"))
-            input_obj: PredictionRequest = PredictionRequest()
-            input_obj.input_data = kafka_msg["input_data"]
-            logger.info("kafka Received input message")
-            prediction_result: Dict[str, Any] = self.prediction_callback(input_obj).result
-        except json.JSONDecodeError as e:
-            error_log = f"Failed to decode JSON message: {e}."
-            logger.error(error_log)
-            predictionresponse.result["error"] = "Invalid JSON format"
-            prediction_result = predictionresponse.result
+            input_obj = self._decode_message(msg)
+            with self.metrics.predicting(), self.metrics.time("predict"):
+                prediction_result: Dict[str, Any] = self.prediction_callback(input_obj).result
+            self._cache_result(request_id, prediction_result)
         except Exception as e:
-            error_msg = f"Error during prediction processing: {e}"
-            logger.exception(error_msg)
-            predictionresponse.result["error"] = "Internal processing error"
-            prediction_result = predictionresponse.result
+            prediction_result = self._failed_result(e)
+        return prediction_result
+
+    def _request_id(self, msg: Any) -> Optional[str]:
+        """Get the request ID of a Kafka message from its header, or else its key."""
+        request_id = header(msg, self.config.request_id_header)
+        if request_id is not None:
+            return request_id
+        key = msg.key()
+        if isinstance(key, bytes) and key:
+            return key.decode("utf-8", errors="replace")
+        return None
+
+    def _idempotency_key(self, msg: Any) -> Optional[str]:
+        """Get the request ID deduplicating a Kafka message: its header only, not its key."""
+        return header(msg, self.config.request_id_header)
+
+    def _cached_result(self, request_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Get the cached result of a redelivered request, if any."""
+        if request_id is None or self.idempotency_cache is None:
+            return None
+        result = self.idempotency_cache.get(request_id)
+        if result is not None:
+            self.metrics.count("duplicate")
+            logger.info(f"Duplicate request {request_id!r}: answered from the cache")
+        return result
+
+    def _cache_result(self, request_id: Optional[str], result: Dict[str, Any]) -> None:
+        """Cache the result of a request, unless it failed (so it can be retried)."""
+        if request_id is not None and self.idempotency_cache is not None:
+            if result.get("error") is None:
+                self.idempotency_cache.put(request_id, result)
+
+    def _result_metadata(self, codec: codecs.Codec, request_id: Optional[str]) -> Dict[str, Any]:
+        """Build the key and headers of a result from its codec and request ID."""
+        headers = [(codecs.CONTENT_TYPE_HEADER, codec.content_type.encode("utf-8"))]
+        if request_id is None:
+            return {"key": b"prediction", "headers": headers}
+        headers.append((self.config.request_id_header, request_id.encode("utf-8")))
+        return {"key": request_id.encode("utf-8"), "headers": headers}
+
+    @staticmethod
+    def _codec(msg: Any) -> codecs.Codec:
+        """Get the codec of a Kafka message from its content type header (JSON by default).
+
+        Raises:
+            DecodeError: if the content type of the message is not supported.
+        """
+        return codecs.get_codec(codecs.content_type(msg.headers()))
+
+    @classmethod
+    def _result_codec(cls, msg: Any) -> codecs.Codec:
+        """Get the codec of the result of a Kafka message (JSON for unsupported content types)."""
+        try:
+            return cls._codec(msg)
+        except codecs.DecodeError:
+            return codecs.get_codec(None)
+
+    def _validate_message(self, msg: Any) -> PredictionRequest:
+        """Decode and validate the prediction request of a Kafka message with its codec.
+
+        Raises:
+            DecodeError: if the message is not a valid prediction request.
+        """
+        with self.metrics.time("decode"):
+            try:
+                return self._codec(msg).validate(msg.value(), MessageRequest)
+            except ValidationError:
+                raise codecs.DecodeError("Invalid prediction request") from None  # has inputs
+
+    def _decode_message(self, msg: Any) -> PredictionRequest:
+        """Decode the prediction request of a valid Kafka message with its codec."""
+        input_obj = self._validate_message(msg)
+        logger.info("kafka Received input message")
+        return input_obj
+
+    def _failed_result(self, error: Exception) -> Dict[str, Any]:
+        """Log the error of a failed message (in its except block), and build its result.
+
+        Invalid messages are permanent failures, and are flagged so they are not retried.
+        """
+        if isinstance(error, codecs.DecodeError):
+            logger.error(f"Failed to decode message: {error}.")
+            return self._error_result(str(error), permanent=True)
+        if isinstance(error, InvalidRequestError):
+            logger.error(f"Invalid prediction request: {error}.")
+            return self._error_result(str(error), permanent=True)
+        logger.exception(f"Error during prediction processing: {error}")
+        return self._error_result("Internal processing error")
+
+    def _produce_message_result(
+        self,
+        msg: Any,
+        prediction_result: Dict[str, Any],
+        callback: DeliveryCallback,
+        poll: bool = True,
+    ) -> None:
+        """Produce the result of a message, or reroute the message if it failed."""
+        route = self._reroute_topic(msg, prediction_result)
+        if route is None:
+            self._count_result(prediction_result)
+            self._produce_result(
+                prediction_result,
+                callback=callback,
+                poll=poll,
+                codec=self._result_codec(msg),
+                request_id=self._request_id(msg),
+            )
+            return
+        topic, delay = route
+        error = prediction_result["error"]
+        if delay is None:  # dead letter: the caller still gets the error result
+            callback = self.router.on_all_delivered(callback, count=2)
+            self.router.reroute(self.producer, msg, error, topic, delay, callback, poll=False)
+            self._produce_result(
+                prediction_result,
+                callback=callback,
+                poll=poll,
+                codec=self._result_codec(msg),
+                request_id=self._request_id(msg),
+            )
+        else:
+            self.router.reroute(self.producer, msg, error, topic, delay, callback, poll=poll)
+
+    def _reroute_topic(
+        self, msg: Any, prediction_result: Dict[str, Any]
+    ) -> Optional[tuple[str, Optional[float]]]:
+        """Get the retry or dead letter topic (and retry delay) of a failed message, if any."""
+        error = prediction_result.get("error")
+        if error is None or error == RETRY_LATER_ERROR:  # shed messages are answered
+            return None
+        return self.router.route(msg, permanent=bool(prediction_result.get(PERMANENT_ERROR_FIELD)))
 
+    def _count_result(self, prediction_result: Dict[str, Any]) -> None:
+        """Count a produced result by status: ok, shed, or error."""
+        error = prediction_result.get("error")
+        if error is None:
+            self.metrics.count("ok")
+        else:
+            self.metrics.count("shed" if error == RETRY_LATER_ERROR else "error")
+
+    def _produce_result(
+        self,
+        prediction_result: Dict[str, Any],
+        callback: DeliveryCallback,
+        poll: bool = True,
+        codec: Optional[codecs.Codec] = None,
+        request_id: Optional[str] = None,
+    ) -> None:
+        """Produce a prediction result with a codec (JSON by default), keyed by its request ID.
+
+        The delivery callbacks are served if poll is set.
+        """
+        codec = codec or codecs.get_codec(None)
         try:
             logger.debug(f"Prediction result: {prediction_result}")
             if self.producer:
-                self.producer.produce(
-                    self.output_topic,
-                    key=b"prediction",
-                    value=json.dumps(prediction_result).encode("utf-8"),
-                    callback=self.delivery_report,
-                )
-                self.producer.flush()
+                result = {
+                    key: value
+                    for key, value in prediction_result.items()
+                    if key != PERMANENT_ERROR_FIELD
+                }
+                with self.metrics.time("serialize"):
+                    value = codec.dumps(result)
+                with self.metrics.time("produce"):
+                    self.producer.produce(
+                        self.output_topic,
+                        value=value,
+                        callback=self.router.redeliver_on_failure(self.producer, callback),
+                        **self._result_metadata(codec, request_id),
+                    )
+                if poll:  # only the consumer thread serves the callbacks
+                    self.producer.poll(0)
             else:
                 logger.error("Kafka producer is not initialized.")
-            if self.consumer:
-                self.consumer.commit(msg)
         except Exception:
             logger.exception("Error during Kafka production/commit:")
 
+    @staticmethod
+    def _error_result(error: str, permanent: bool = False) -> Dict[str, Any]:
+        """Build the result produced for a message that could not be predicted."""
+        predictionresponse: PredictionResponse = PredictionResponse()
+        predictionresponse.result["error"] = error
+        if permanent:
+            predictionresponse.result[PERMANENT_ERROR_FIELD] = True
+        return predictionresponse.result
+
+    def _on_revoke(self, consumer: Any, partitions: List[TopicPartition]) -> None:
+        """Drain and commit the revoked partitions before they are handed off.
+
+        Called by the consumer poll during a rebalance: the in-flight messages of the
+        revoked partitions have up to drain_timeout seconds to be delivered.
+        """
+        deadline = time.monotonic() + self.config.drain_timeout
+        while self.offset_tracker.pending(partitions) and time.monotonic() < deadline:
+            if self.producer:
+                self.producer.poll(0.1)  # serve the delivery callbacks
+            else:
+                time.sleep(0.1)
+        if self.producer:
+            self.producer.flush(max(deadline - time.monotonic(), 0))
+        self._commit_completed(asynchronous=False)
+        self._on_lost(consumer, partitions)
+        logger.info(f"Kafka partitions revoked: {len(partitions)}")
+
+    def _on_lost(self, consumer: Any, partitions: List[TopicPartition]) -> None:
+        """Forget the state of the partitions lost or revoked in a rebalance."""
+        self.offset_tracker.forget(partitions)
+        self.flow.forget(partitions)
+
     def _close_consumer(self) -> None:
-        """Close the Kafka consumer."""
+        """Flush the producer, commit the final offsets, and close the Kafka consumer."""
+        if self.producer:
+            remaining = self.producer.flush(
+                self.config.drain_timeout
+            )  # deliver the pending results
+            if remaining:
+                logger.warning(f"Drain timeout: {remaining} results not delivered")
+        self._commit_completed(asynchronous=False)
         if self.consumer:
             self.consumer.close()
+        if self.idempotency_cache:
+            self.idempotency_cache.save()
         logger.info("Kafka consumer stopped.")
 
-    def stop(self) -> None:
-        """Stop the FastAPI application and Kafka consumer."""
+    def drain(self) -> bool:
+        """Stop fetching, and wait for the consumer thread to drain and close the consumer.
+
+        Returns:
+            bool: True if the consumer thread stopped in time.
+        """
         self.stop_event.set()
-        if self.consumer:
-            self.consumer.close()
-            logger.info("Kafka consumer closed.")
+        thread = self.consumer_thread
+        if thread is None or thread is threading.current_thread():
+            return True
+        thread.join(2 * self.config.drain_timeout)  # in-flight predictions, then producer flush
+        if thread.is_alive():
+            logger.warning("Kafka consumer not drained: stopping anyway")
+            return False
+        self.consumer_thread = None
+        logger.info("Kafka consumer drained.")
+        return True
+
+    def stop(self) -> None:
+        """Drain the Kafka consumer, then stop the FastAPI application."""
+        self.drain()  # the asyncio consumer drains in the app lifespan
         os.kill(os.getpid(), signal.SIGINT)
         logger.info("Service stopped.")
 
 
 # Global Service Instance
-fastapi_kafka_service: FastAPIKafkaService
+fastapi_kafka_service: Optional[FastAPIKafkaService] = None
+prediction_batcher: Optional[DynamicBatcher] = None
+service_metrics: Optional[ServiceMetrics] = None
 
 
 @app.get("/health", summary="Health Check", tags=["System"])
@@ -244,8 +736,50 @@ async def health_check() -> Dict[str, str]:
     return {"status": "healthy"}
 
 
+async def _submit(request: PredictionRequest) -> PredictionResponse:
+    """Submit a request to the prediction batcher, hiding the internal errors."""
+    if prediction_batcher is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        return await prediction_batcher.submit(request)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal processing error") from None
+
+
+@app.get("/metrics", summary="Metrics", tags=["System"])
+async def get_metrics() -> Response:
+    """Expose the service metrics in the Prometheus text format."""
+    if service_metrics is None or not service_metrics.enabled:
+        raise HTTPException(status_code=503, detail="Metrics not available")
+    content, media_type = service_metrics.render()
+    return Response(content=content, media_type=media_type)
+
+
+def _output_tokens(outputs: Any) -> int:
+    """Count the tokens reported in the metadata of model outputs."""
+    if "metadata" not in getattr(outputs, "columns", []):
+        return 0
+    return sum(
+        int(metadata.get("tokens") or 0)
+        for metadata in outputs["metadata"]
+        if isinstance(metadata, dict)
+    )
+
+
+@app.post("/predict", summary="Predict", tags=["Predictions"])
+async def predict(request: PredictionRequest) -> PredictionResponse:
+    """Predict a request, batched with the concurrent requests."""
+    return await _submit(request)
+
+
+@app.post("/predict/batch", summary="Predict Batch", tags=["Predictions"])
+async def predict_batch(requests: List[PredictionRequest]) -> List[PredictionResponse]:
+    """Predict a list of requests, batched with the concurrent requests."""
+    return list(await asyncio.gather(*(_submit(request) for request in requests)))
+
+
 def main() -> None:
-    global fastapi_kafka_service
+    global fastapi_kafka_service, prediction_batcher, service_metrics
     # Configuration
     # Configuration
     # Initialize Mlflow Service
@@ -254,6 +788,8 @@ def main() -> None:
 
     # Get model URI from environment or construct it from name/alias
     model_uri = os.getenv("MLFLOW_MODEL_URI")
+    loader = CustomLoader()
+    watcher: Optional[ModelWatcher[Any]] = None
     if not model_uri:
         if hasattr(mlflow_service, "registry_name"):
             model_name = mlflow_service.registry_name
@@ -261,6 +797,20 @@ def main() -> None:
             model_name = "default"
         model_alias = os.getenv("MLFLOW_MODEL_ALIAS", "Champion")
         model_uri = f"models:/{model_name}@{model_alias}"
+        if DEFAULT_MODEL_WATCH_INTERVAL > 0:  # hot reload the model when the alias moves
+
+            def warmup(candidate: Any) -> None:
+                candidate.predict(inputs=InputsSchema.check(pd.DataFrame({"input": ["warmup"]})))
+
+            watcher = ModelWatcher(
+                client=mlflow_service.client(),
+                name=model_name,
+                alias=model_alias,
+                load=lambda uri: loader.load(uri=uri),
+                warmup=warmup,
+                interval=DEFAULT_MODEL_WATCH_INTERVAL,
+                max_backoff=DEFAULT_MODEL_WATCH_MAX_BACKOFF,
+            )
 
     # Allow local folder path as URI for debugging/workarounds
     if os.path.isdir(model_uri):
@@ -270,16 +820,36 @@ def main() -> None:
     else:
         logger.info(f"Loading model from: {model_uri}")
 
-    loader = CustomLoader()
+    version = watcher.resolve() if watcher else None  # before loading: a race reloads once more
     model = loader.load(uri=model_uri)
 
+    def current_model() -> Any:
+        """Get the served model (read once per request, as the watcher may swap it)."""
+        return watcher.model if watcher else model
+
+    # Service Metrics (shared by the HTTP batcher and the Kafka consumer)
+    if DEFAULT_WORKERS > 1:
+        if multiprocess_dir():
+            ServiceMetrics.reset_processes()
+        else:
+            logger.warning(f"Set {MULTIPROCESS_DIR_ENV} to export the metrics of all the workers")
+    metrics = service_metrics = ServiceMetrics()
+
+    # Input Validation (invalid inputs are not retried)
+    def validate_inputs(frame: Callable[[], pd.DataFrame]) -> DataFrameBase[InputsSchema]:
+        try:
+            with metrics.time("validation"):
+                return InputsSchema.check(frame())
+        except (SchemaError, SchemaErrors, ValueError, TypeError):
+            raise InvalidRequestError(INVALID_INPUT_ERROR) from None
+
     # Prediction Callback Function
     def my_prediction_function(input_data: PredictionRequest) -> PredictionResponse:
         predictionresponse: PredictionResponse = PredictionResponse()
+        inputs = validate_inputs(lambda: pd.DataFrame(input_data.input_data))
         try:
-            outputs: Outputs = model.predict(
-                inputs=InputsSchema.check(pd.DataFrame(input_data.input_data))
-            )
+            outputs: Outputs = current_model().predict(inputs=inputs)
+            metrics.count_tokens(_output_tokens(outputs))
             # Handle outputs format
             if hasattr(outputs, "to_numpy"):
                 predictionresponse.result["inference"] = outputs.to_numpy().tolist()
@@ -295,6 +865,54 @@ def main() -> None:
             predictionresponse.result["error"] = "Prediction failed"
         return predictionresponse
 
+    # Async Prediction Callback Function (awaited in the server event loop)
+    async def my_async_prediction_function(input_data: PredictionRequest) -> PredictionResponse:
+        predictionresponse: PredictionResponse = PredictionResponse()
+        inputs = validate_inputs(lambda: pd.DataFrame(input_data.input_data))
+        try:
+            outputs: Outputs = await current_model().apredict(inputs=inputs)
+            metrics.count_tokens(_output_tokens(outputs))
+            predictionresponse.result["inference"] = outputs.to_numpy().tolist()
+            predictionresponse.result["quality"] = 1
+            predictionresponse.result["error"] = None
+        except Exception as e:
+            logger.error(f"Prediction error: {e}")
+            predictionresponse.result["inference"] = 0
+            predictionresponse.result["quality"] = 0
+            predictionresponse.result["error"] = "Prediction failed"
+        return predictionresponse
+
+    # Batch Prediction Callback Function
+    def my_batch_prediction_function(
+        input_datas: List[PredictionRequest],
+    ) -> List[PredictionResponse]:
+        frames = [pd.DataFrame(input_data.input_data) for input_data in input_datas]
+        inputs = validate_inputs(lambda: pd.concat(frames, ignore_index=True))
+        outputs = current_model().predict(inputs=inputs)
+        metrics.count_tokens(_output_tokens(outputs))
+        rows = outputs.to_numpy().tolist()
+        if len(rows) != sum(len(frame) for frame in frames):  # cannot demultiplex the rows
+            return [my_prediction_function(input_data) for input_data in input_datas]
+        predictionresponses: List[PredictionResponse] = []
+        start = 0
+        for frame in frames:  # demultiplex the rows of each request
+            predictionresponse: PredictionResponse = PredictionResponse()
+            predictionresponse.result["inference"] = rows[start : start + len(frame)]
+            predictionresponse.result["quality"] = 1
+            predictionresponse.result["error"] = None
+            predictionresponses.append(predictionresponse)
+            start += len(frame)
+        return predictionresponses
+
+    # HTTP Batcher (shares the loaded model with the Kafka consumer)
+    prediction_batcher = DynamicBatcher(
+        batch_prediction_callback=my_batch_prediction_function,
+        max_batch_size=DEFAULT_HTTP_BATCH_SIZE,
+        max_wait=DEFAULT_BATCH_WAIT_MS / 1000,
+        max_concurrent_batches=DEFAULT_MAX_CONCURRENT_BATCHES,
+        metrics=metrics,
+    )
+
     # Kafka Configuration
     common_kafka_config = {
         "bootstrap.servers": DEFAULT_KAFKA_SERVER,
@@ -302,22 +920,82 @@ def main() -> None:
     }
 
     producer_config = common_kafka_config.copy()
+    producer_config.update(
+        {
+            "linger.ms": DEFAULT_LINGER_MS,
+            "compression.type": DEFAULT_COMPRESSION_TYPE,
+            "batch.num.messages": DEFAULT_BATCH_NUM_MESSAGES,
+        }
+    )
 
     consumer_config = common_kafka_config.copy()
     consumer_config.update(
         {
             "group.id": DEFAULT_GROUP_ID,
             "auto.offset.reset": DEFAULT_AUTO_OFFSET_RESET,
+            "partition.assignment.strategy": DEFAULT_ASSIGNMENT_STRATEGY,
         }
     )
 
-    # Initialize and Start Service
-    fastapi_kafka_service = FastAPIKafkaService(
+    # Service Configuration
+    service_config: Dict[str, Any] = dict(
         prediction_callback=my_prediction_function,
         producer_config=producer_config,
         consumer_config=consumer_config,
         input_topic=DEFAULT_INPUT_TOPIC,
         output_topic=DEFAULT_OUTPUT_TOPIC,
+        batch_prediction_callback=my_batch_prediction_function,
+        async_prediction_callback=my_async_prediction_function
+        if DEFAULT_ASYNCIO_CONSUMER
+        else None,
+        metrics=metrics,
+        config=KafkaServiceConfig(  # the other knobs default to their environment variables
+            retry_topics=DEFAULT_RETRY_TOPICS,
+            dead_letter_topic=DEFAULT_DEAD_LETTER_TOPIC,
+            input_topics=DEFAULT_INPUT_TOPICS,
+        ),
+    )
+
+    # Idempotency Cache (one file per worker, as the workers do not share their cache)
+    def idempotency_cache(index: int) -> Optional[IdempotencyCache]:
+        if DEFAULT_IDEMPOTENCY_TTL <= 0:
+            return None
+        path = DEFAULT_IDEMPOTENCY_PATH
+        if path and DEFAULT_WORKERS > 1:
+            path = f"{path}.{index}"
+        return IdempotencyCache(
+            max_size=DEFAULT_IDEMPOTENCY_SIZE, ttl=DEFAULT_IDEMPOTENCY_TTL, path=path
+        )
+
+    # Prefork Workers (share the loaded model copy-on-write): worker 0 serves the HTTP API
+    # (health probes, /predict, /metrics), the others run one Kafka consumer each
+    def run_worker(index: int) -> None:
+        if index == 0:
+            uvicorn.run(app, host=DEFAULT_FASTAPI_HOST, port=DEFAULT_FASTAPI_PORT, log_level="info")
+            return
+        FastAPIKafkaService(
+            **service_config, idempotency_cache=idempotency_cache(index)
+        ).run_worker()
+
+    if DEFAULT_WORKERS > 1:
+        supervisor = PreforkSupervisor(
+            target=run_worker,
+            workers=DEFAULT_WORKERS + 1,
+            on_exit=ServiceMetrics.mark_process_dead,
+        )
+        if watcher:  # watch in the supervisor only: the workers are forked again on a swap
+            watcher.on_swap = lambda _: supervisor.reload()
+            watcher.start(model=model, version=version)
+        code = supervisor.run()
+        if code:
+            sys.exit(code)
+        return
+
+    # Initialize and Start Service
+    if watcher:
+        watcher.start(model=model, version=version)
+    fastapi_kafka_service = FastAPIKafkaService(
+        **service_config, idempotency_cache=idempotency_cache(0)
     )
     fastapi_kafka_service.start()
     print("FastAPI and Kafka service is running.  Press Ctrl+C to stop.")
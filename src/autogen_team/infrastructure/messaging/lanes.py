@@ -0,0 +1,61 @@
+"""Priority lanes sharing the consumer between several input topics."""
+
+import os
+import threading
+import time
+from typing import Dict
+
+# Constants
+DEFAULT_LANE_IDLE = float(os.getenv("DEFAULT_LANE_IDLE", 1.0))
+
+
+class PriorityLanes:
+    """Schedule the input topics (lanes) of the consumer by priority.
+
+    A lane is held (its partitions paused) while a lane of higher priority has backlog,
+    i.e., delivered a message in the last `idle` seconds: bulk traffic waits while the
+    interactive lanes are busy. Among the lanes with backlog or in-flight messages, a
+    lane is also held once it uses its weighted share of the slots (slots * priority /
+    total priority), and until one of its in-flight messages is finished.
+
+    Parameters:
+        priorities (Dict[str, int]): priority (and weight) of each lane.
+        slots (int): number of slots shared by the lanes.
+        idle (float): seconds without message after which a lane has no more backlog.
+    """
+
+    def __init__(self, priorities: Dict[str, int], slots: int, idle: float = DEFAULT_LANE_IDLE):
+        self.priorities = priorities
+        self.slots = slots
+        self.idle = idle
+        self._lock = threading.Lock()
+        self._seen: Dict[str, float] = {}  # lane -> last message time
+        self._in_flight: Dict[str, int] = {}
+
+    def seen(self, topic: str) -> None:
+        """Record a message delivered by a lane."""
+        with self._lock:
+            self._seen[topic] = time.monotonic()
+
+    def start(self, topic: str) -> None:
+        """Record a message of a lane taking a slot."""
+        with self._lock:
+            self._in_flight[topic] = self._in_flight.get(topic, 0) + 1
+
+    def finish(self, topic: str) -> None:
+        """Record a message of a lane releasing its slot."""
+        with self._lock:
+            self._in_flight[topic] = self._in_flight.get(topic, 0) - 1
+
+    def held(self, topic: str) -> bool:
+        """Check if a lane must wait for the lanes of higher priority or for its share."""
+        now = time.monotonic()
+        priority = self.priorities[topic]
+        with self._lock:
+            backlog = {lane for lane, seen in self._seen.items() if now - seen < self.idle}
+            if any(self.priorities[lane] > priority for lane in backlog):
+                return True
+            busy = backlog | {lane for lane, count in self._in_flight.items() if count > 0}
+            total = sum(self.priorities[lane] for lane in busy | {topic})
+            share = max(1, self.slots * priority // total)
+            return self._in_flight.get(topic, 0) >= share
@@ -0,0 +1,180 @@
+"""Prometheus metrics of the prediction service (no-op without prometheus_client)."""
+
+import contextlib
+import glob
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import prometheus_client as prom
+    from prometheus_client import multiprocess
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+# Constants
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def multiprocess_dir() -> Optional[str]:
+    """Get the directory sharing the metrics of the processes, if prometheus_client uses one."""
+    if not PROMETHEUS_AVAILABLE:
+        return None
+    return os.environ.get(MULTIPROCESS_DIR_ENV) or os.environ.get(MULTIPROCESS_DIR_ENV.lower())
+
+
+class ServiceMetrics:
+    """Metrics of the prediction service, in their own Prometheus registry.
+
+    Stage latencies (e.g., decode, predict, serialize, produce, commit) are histograms
+    labeled by stage, whose children are cached to keep the instrumentation overhead low.
+    Without prometheus_client, all the methods are no-ops and enabled is False.
+
+    Prefork workers have their own metrics: set PROMETHEUS_MULTIPROC_DIR in the environment
+    of the service (it is read when prometheus_client is imported) to aggregate the metrics
+    of all the processes when rendering them. The gauges then sum the live processes (the
+    consumer lag takes their max).
+
+    Parameters:
+        namespace (str): prefix of the metric names.
+    """
+
+    def __init__(self, namespace: str = "prediction_service"):
+        self.enabled = PROMETHEUS_AVAILABLE
+        self._children: Dict[Tuple[int, Tuple[str, ...]], Any] = {}
+        if not self.enabled:
+            return
+        self.registry = prom.CollectorRegistry()
+        options: Dict[str, Any] = {"namespace": namespace, "registry": self.registry}
+        self.stage_latency = prom.Histogram(
+            "stage_latency_seconds",
+            "Latency of the processing stages.",
+            ["stage"],
+            buckets=LATENCY_BUCKETS,
+            **options,
+        )
+        self.batch_size = prom.Histogram(
+            "batch_size",
+            "Size of the predicted batches.",
+            ["source"],
+            buckets=BATCH_BUCKETS,
+            **options,
+        )
+        self.in_flight = prom.Gauge(
+            "predictions_in_flight", "Predictions running.", multiprocess_mode="livesum", **options
+        )
+        self.outstanding = prom.Gauge(
+            "outstanding_messages",
+            "Messages admitted and not processed yet.",
+            multiprocess_mode="livesum",
+            **options,
+        )
+        self.consumer_lag = prom.Gauge(
+            "consumer_lag",
+            "Messages behind the partition end.",
+            ["topic", "partition"],
+            multiprocess_mode="livemax",
+            **options,
+        )
+        self.messages = prom.Counter(
+            "messages", "Processed messages by status.", ["status"], **options
+        )
+        self.tokens = prom.Counter("llm_tokens", "Tokens of the model outputs.", **options)
+
+    def _child(self, metric: Any, *labels: str) -> Any:
+        """Get the cached child of a labeled metric."""
+        key = (id(metric), labels)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = metric.labels(*labels)
+        return child
+
+    @contextlib.contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Measure the latency of a processing stage.
+
+        Args:
+            stage (str): name of the stage.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the latency of a processing stage measured by the caller."""
+        if self.enabled:
+            self._child(self.stage_latency, stage).observe(seconds)
+
+    def observe_batch(self, size: int, source: str = "kafka") -> None:
+        """Record the size of a predicted batch."""
+        if self.enabled:
+            self._child(self.batch_size, source).observe(size)
+
+    def count(self, status: str, amount: int = 1) -> None:
+        """Count processed messages by status (e.g., ok, error, shed, duplicate, rerouted)."""
+        if self.enabled:
+            self._child(self.messages, status).inc(amount)
+
+    def count_tokens(self, amount: int) -> None:
+        """Count the tokens of model outputs."""
+        if self.enabled and amount > 0:
+            self.tokens.inc(amount)
+
+    @contextlib.contextmanager
+    def predicting(self) -> Iterator[None]:
+        """Track a running prediction in the in-flight gauge."""
+        if not self.enabled:
+            yield
+            return
+        self.in_flight.inc()
+        try:
+            yield
+        finally:
+            self.in_flight.dec()
+
+    def set_outstanding(self, count: int) -> None:
+        """Set the number of outstanding messages."""
+        if self.enabled:
+            self.outstanding.set(count)
+
+    def set_lag(self, topic: str, partition: int, lag: int) -> None:
+        """Set the consumer lag of a partition."""
+        if self.enabled:
+            self._child(self.consumer_lag, topic, str(partition)).set(lag)
+
+    def render(self) -> Tuple[bytes, str]:
+        """Render the metrics in the Prometheus text format.
+
+        Returns:
+            Tuple[bytes, str]: metrics and their content type.
+        """
+        if not self.enabled:
+            return b"", "text/plain"
+        registry = self.registry
+        if multiprocess_dir():  # aggregate the metrics of all the processes
+            registry = prom.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return prom.generate_latest(registry), prom.CONTENT_TYPE_LATEST
+
+    @staticmethod
+    def reset_processes() -> None:
+        """Remove the metrics of the previous runs from the multiprocess directory, if any."""
+        path = multiprocess_dir()
+        if path:
+            for file in glob.glob(os.path.join(path, "*.db")):
+                os.remove(file)
+
+    @staticmethod
+    def mark_process_dead(pid: int) -> None:
+        """Remove the live gauges of a process that exited from the multiprocess directory."""
+        if multiprocess_dir():
+            multiprocess.mark_process_dead(pid)
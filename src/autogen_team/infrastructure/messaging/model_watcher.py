@@ -0,0 +1,126 @@
+"""Hot reload of the model of a registry alias, without restarting the service."""
+
+import logging
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from autogen_team.registry.adapters.mlflow_adapter import uri_for_model_version
+
+logger = logging.getLogger(__name__)
+
+Model = TypeVar("Model")
+
+
+class ModelWatcher(Generic[Model]):
+    """Poll a registry alias, and swap the model when the alias moves to a new version.
+
+    The new version is loaded (from its pinned URI) and warmed up in the watcher thread,
+    then the model reference is swapped in one assignment: the callbacks read `model`
+    once per request, so in-flight requests finish with the model they started with.
+    A version that fails to load or to warm up is not swapped, and is retried later.
+    Polling errors (e.g., the registry is unreachable) back off exponentially,
+    from interval up to max_backoff seconds.
+
+    Threads do not survive a fork: with prefork workers, watch the alias in the parent
+    only (a single load and warmup per version), and fork the workers again in on_swap.
+
+    Parameters:
+        client (Any): registry client (e.g., mlflow.MlflowClient).
+        name (str): name of the registered model.
+        alias (str): alias of the registered model to watch.
+        load (Callable[[str], Model]): load a model from its URI.
+        warmup (Callable[[Model], None], optional): run a model once before serving it.
+        interval (float): seconds between the polls of the alias.
+        max_backoff (float): maximum seconds between the polls after errors.
+        on_swap (Callable[[Model], None], optional): called with the model after each swap.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        name: str,
+        alias: str,
+        load: Callable[[str], Model],
+        warmup: Optional[Callable[[Model], None]] = None,
+        interval: float = 30.0,
+        max_backoff: float = 600.0,
+        on_swap: Optional[Callable[[Model], None]] = None,
+    ):
+        self.client = client
+        self.name = name
+        self.alias = alias
+        self.load = load
+        self.warmup = warmup
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.on_swap = on_swap
+        self.model: Optional[Model] = None
+        self.version: Optional[str] = None
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self, model: Optional[Model] = None, version: Optional[str] = None) -> Model:
+        """Load the current version of the alias, and watch the alias in a daemon thread.
+
+        Args:
+            model (Model, optional): model already loaded, instead of loading it.
+            version (str, optional): version of the loaded model, resolved before loading it.
+
+        Returns:
+            Model: model of the current version.
+        """
+        if model is not None:
+            self.model, self.version = model, version
+        if self.model is None:
+            self.check()
+        if self.model is None:
+            raise RuntimeError(f"No model version for {self.name}@{self.alias}")
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self.thread.start()
+        return self.model
+
+    def stop(self) -> None:
+        """Stop watching the alias."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def check(self) -> bool:
+        """Swap the model if the alias moved to a new version.
+
+        Raises:
+            Exception: if the alias cannot be resolved, or its model loaded and warmed up.
+
+        Returns:
+            bool: True if the model was swapped.
+        """
+        version = self.resolve()
+        if version == self.version:
+            return False
+        uri = uri_for_model_version(name=self.name, version=version)
+        logger.info(f"Loading model {uri} ({self.name}@{self.alias})")
+        model = self.load(uri)
+        if self.warmup is not None:
+            self.warmup(model)
+        self.model, self.version = model, version  # in-flight requests keep the previous model
+        logger.info(f"Model swapped to version {version} of {self.name}@{self.alias}")
+        if self.on_swap is not None:
+            self.on_swap(model)
+        return True
+
+    def resolve(self) -> str:
+        """Resolve the model version of the alias."""
+        return str(self.client.get_model_version_by_alias(name=self.name, alias=self.alias).version)
+
+    def _watch(self) -> None:
+        """Poll the alias until the watcher is stopped, with backoff on errors."""
+        delay = self.interval
+        while not self.stop_event.wait(delay):
+            try:
+                self.check()
+                delay = self.interval
+            except Exception:
+                delay = min(delay * 2, self.max_backoff)
+                logger.exception(f"Model reload failed: next check in {delay} seconds")
@@ -0,0 +1,71 @@
+"""Offsets of the in-flight messages of a consumer, committed by contiguous prefix."""
+
+import heapq
+import threading
+from typing import Dict, List
+
+from confluent_kafka import TopicPartition
+
+
+class OffsetTracker:
+    """Track the in-flight offsets of each partition to commit completed prefixes only.
+
+    An offset is committable once it and all the tracked offsets before it are completed:
+    a slow message holds back the commits of its partition, never the other partitions.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple[str, int], List[int]] = {}  # heap of in-flight offsets
+        self._done: Dict[tuple[str, int], set[int]] = {}  # completed, not contiguous yet
+        self._next: Dict[tuple[str, int], int] = {}  # committable offset
+        self._committed: Dict[tuple[str, int], int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of tracked offsets not committable yet."""
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def track(self, topic: str, partition: int, offset: int) -> None:
+        """Track an offset as in flight."""
+        with self._lock:
+            heapq.heappush(self._pending.setdefault((topic, partition), []), offset)
+
+    def complete(self, topic: str, partition: int, offset: int) -> None:
+        """Complete an in-flight offset, and advance the committable offset of its partition."""
+        key = (topic, partition)
+        with self._lock:
+            pending, done = self._pending.get(key, []), self._done.setdefault(key, set())
+            done.add(offset)
+            while pending and pending[0] in done:
+                completed = heapq.heappop(pending)
+                done.discard(completed)
+                self._next[key] = completed + 1
+
+    def pending(self, partitions: List[TopicPartition]) -> int:
+        """Number of in-flight offsets of some partitions."""
+        with self._lock:
+            return sum(len(self._pending.get((tp.topic, tp.partition), [])) for tp in partitions)
+
+    def forget(self, partitions: List[TopicPartition]) -> None:
+        """Forget the offsets of revoked partitions: their next owner consumes them again."""
+        with self._lock:
+            for tp in partitions:
+                key = (tp.topic, tp.partition)
+                for offsets in (self._pending, self._done, self._next, self._committed):
+                    offsets.pop(key, None)
+
+    def committable(self) -> List[TopicPartition]:
+        """Get the committable offsets that changed since the last call."""
+        with self._lock:
+            changed = {
+                key: offset
+                for key, offset in self._next.items()
+                if self._committed.get(key) != offset
+            }
+            self._committed.update(changed)
+        return [
+            TopicPartition(topic, partition, offset)
+            for (topic, partition), offset in changed.items()
+        ]
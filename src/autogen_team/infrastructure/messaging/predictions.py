@@ -0,0 +1,47 @@
+"""Prediction requests and responses of the messaging services."""
+
+from typing import Any, Awaitable, Callable, Dict, List
+
+import pandas as pd
+from pandera.typing.common import DataFrameBase
+from pydantic import BaseModel
+
+from autogen_team.core.schemas import InputsSchema
+
+
+class PredictionRequest(BaseModel):
+    """Request model for prediction."""
+
+    input_data: Dict[str, Any] = {"input": ["text 1", "text 2"]}
+
+    def validate_model(self) -> DataFrameBase[InputsSchema]:
+        """Validates the input data against InputsSchema."""
+        return InputsSchema.validate(pd.DataFrame([self.input_data]))
+
+
+class MessageRequest(PredictionRequest):
+    """Prediction request of a Kafka message, whose input data is required.
+
+    The input data is checked by the prediction callback (e.g., against InputsSchema).
+    """
+
+    input_data: Any
+
+
+class PredictionResponse(BaseModel):
+    """Response model for prediction."""
+
+    result: Dict[str, Any] = {"inference": [0.0], "quality": 0.0, "error": ""}
+
+
+class InvalidRequestError(ValueError):
+    """Raised by a prediction callback for a request that can never be predicted.
+
+    For example, inputs that do not match InputsSchema: such failures are not retried.
+    The message is safe to return to the producer: it never contains the inputs.
+    """
+
+
+PredictionCallback = Callable[[PredictionRequest], PredictionResponse]
+BatchPredictionCallback = Callable[[List[PredictionRequest]], List[PredictionResponse]]
+AsyncPredictionCallback = Callable[[PredictionRequest], Awaitable[PredictionResponse]]
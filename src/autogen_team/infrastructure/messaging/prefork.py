@@ -0,0 +1,197 @@
+"""Prefork worker processes sharing the memory of a parent process (e.g., a loaded model)."""
+
+import gc
+import logging
+import os
+import signal
+import threading
+import time
+from types import FrameType
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Constants
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+WAIT_INTERVAL = 0.1  # seconds between the checks of the exited workers
+
+
+class PreforkSupervisor:
+    """Fork worker processes from a parent process, and restart the workers that crash.
+
+    The workers share the parent memory copy-on-write: load the model in the parent,
+    then create the clients that own sockets or threads (e.g., Kafka) in each worker.
+    The parent objects are frozen out of the garbage collector before forking, so
+    the collections of the workers do not touch (and copy) the shared pages.
+
+    A worker exiting with code 0 is done, any other exit is restarted after restart_delay
+    seconds. The supervisor gives up when more than max_restarts restarts happen within
+    restart_window seconds. SIGTERM and SIGINT are forwarded to the workers as SIGTERM.
+    The on_exit callback gets the pid of each exited worker (e.g., to clean its metrics).
+
+    A reload restarts the workers one at a time, so they are forked again from the current
+    parent memory (e.g., after the parent loaded a new model) while the others keep serving.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[int], None],
+        workers: int,
+        restart_delay: float = 1.0,
+        max_restarts: int = 10,
+        restart_window: float = 60.0,
+        on_exit: Optional[Callable[[int], None]] = None,
+    ):
+        self.target = target
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.on_exit = on_exit
+        self.pids: Dict[int, int] = {}  # pid -> worker index
+        self.restarts: List[float] = []  # restart times
+        self.stopping = False
+        self.replacing: List[int] = []  # pids of the workers to reload
+        self.replaced: Optional[int] = None  # pid of the worker being reloaded
+        self.lock = threading.RLock()  # reloads are requested from other threads
+
+    def run(self) -> int:
+        """Fork the workers, and supervise them until they are all done.
+
+        Returns:
+            int: 0 if the workers are done or stopped, 1 if they crash too often.
+        """
+        handlers = {sig: signal.signal(sig, self._forward) for sig in STOP_SIGNALS}
+        try:
+            for index in range(self.workers):
+                self._spawn(index)
+            while self.pids:
+                pid, status = self._wait_any()
+                if pid not in self.pids:
+                    continue
+                index = self.pids.pop(pid)
+                self._exited(pid)
+                if self._reloaded(pid, index):
+                    continue
+                code = os.waitstatus_to_exitcode(status)
+                if code == 0 or self.stopping:
+                    logger.info(f"Worker {index} (pid {pid}) exited with code {code}.")
+                    continue
+                logger.error(f"Worker {index} (pid {pid}) crashed with code {code}.")
+                now = time.monotonic()
+                self.restarts = [t for t in self.restarts if now - t < self.restart_window]
+                if len(self.restarts) >= self.max_restarts:
+                    logger.error("Workers crash too often: stopping the supervisor.")
+                    self.stop()
+                    self._wait()
+                    return 1
+                self.restarts.append(now)
+                time.sleep(self.restart_delay)
+                if not self.stopping:
+                    self._spawn(index)
+            return 0
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+            gc.unfreeze()
+
+    def stop(self) -> None:
+        """Stop the supervisor, and send SIGTERM to the workers."""
+        self.stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reload(self) -> None:
+        """Restart the workers one at a time, to fork them again from the parent memory.
+
+        Each worker is stopped with SIGTERM, and forked again once it exited, before the
+        next worker is stopped. This method is thread-safe (e.g., for a model watcher).
+        """
+        with self.lock:
+            self.replacing = [pid for pid in self.pids if pid != self.replaced]
+            if self.replaced is None:
+                self._replace_next()
+
+    def _replace_next(self) -> None:
+        """Stop the next worker to reload, if any (with the lock held)."""
+        self.replaced = None
+        while self.replacing and not self.stopping:
+            pid = self.replacing.pop(0)
+            if pid in self.pids:
+                self.replaced = pid
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass  # exited: waited by the supervisor loop
+                return
+
+    def _reloaded(self, pid: int, index: int) -> bool:
+        """Fork again a worker that exited for a reload, and stop the next one."""
+        with self.lock:
+            if pid != self.replaced:
+                return False
+            logger.info(f"Worker {index} (pid {pid}) stopped for a reload.")
+            if not self.stopping:
+                self._spawn(index)
+            self._replace_next()
+            return True
+
+    def _spawn(self, index: int) -> None:
+        """Fork a worker process running the target."""
+        gc.freeze()  # keep the parent objects (e.g., a reloaded model) out of the collections
+        with self.lock:  # a reload includes all the workers forked before it
+            mask = signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)  # pending in the fork
+            pid = os.fork()
+            if pid == 0:  # worker process
+                code = 0
+                try:
+                    for sig in STOP_SIGNALS:
+                        signal.signal(sig, signal.SIG_DFL)
+                    signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+                    self.target(index)
+                except BaseException:
+                    logger.exception(f"Worker {index} failed.")
+                    code = 1
+                finally:
+                    os._exit(code)  # skip the parent atexit handlers
+            self.pids[pid] = index
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        logger.info(f"Worker {index} started (pid {pid}).")
+        if self.stopping:  # stopped during the fork (e.g., by a signal of another thread)
+            os.kill(pid, signal.SIGTERM)
+
+    def _wait(self) -> None:
+        """Wait for the remaining workers to exit."""
+        while self.pids:
+            pid, _ = self._wait_any()
+            if self.pids.pop(pid, None) is not None:
+                self._exited(pid)
+
+    @staticmethod
+    def _wait_any() -> Tuple[int, int]:
+        """Wait for a worker to exit, and get its pid and wait status.
+
+        The wait is not blocking: a signal delivered to another thread of the parent
+        (e.g., a model watcher) would not interrupt it, and its handler would never run.
+        """
+        while True:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                return pid, status
+            time.sleep(WAIT_INTERVAL)
+
+    def _exited(self, pid: int) -> None:
+        """Notify the exit of a worker to the on_exit callback, if any."""
+        if self.on_exit is not None:
+            try:
+                self.on_exit(pid)
+            except Exception:
+                logger.exception(f"Error in the exit callback of the worker pid {pid}.")
+
+    def _forward(self, signum: int, frame: Optional[FrameType]) -> None:
+        """Forward a stop signal of the parent to the workers."""
+        logger.info(f"Supervisor received signal {signum}: stopping the workers.")
+        self.stop()
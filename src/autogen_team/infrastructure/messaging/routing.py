@@ -0,0 +1,205 @@
+"""Retry topics and dead letter topic of the messages that failed to be predicted or delivered."""
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from confluent_kafka import KafkaError, Producer
+
+from autogen_team.infrastructure.messaging.metrics import ServiceMetrics
+
+logger = logging.getLogger(__name__)
+
+DeliveryCallback = Callable[[Optional[KafkaError], Any], None]
+Headers = List[Tuple[str, Any]]
+
+# Constants
+DEFAULT_RETRY_DELAYS = [  # seconds before each retry (e.g., "10,60,300"), opt-in: no retry
+    float(delay) for delay in os.getenv("DEFAULT_RETRY_DELAYS", "").split(",") if delay
+]
+DEFAULT_DEAD_LETTER_TOPIC = os.getenv("DEFAULT_DEAD_LETTER_TOPIC") or None  # opt-in: no DLQ
+DEFAULT_DELIVERY_ATTEMPTS = int(os.getenv("DEFAULT_DELIVERY_ATTEMPTS", 3))  # produce attempts
+PERMANENT_ERROR_FIELD = "permanent"  # internal flag of the failures not to retry (not produced)
+RETRY_ATTEMPT_HEADER = "retry-attempt"
+RETRY_AFTER_HEADER = "retry-after"  # epoch seconds
+ERROR_HEADER = "error"
+SOURCE_HEADERS = ("source-topic", "source-partition", "source-offset")
+
+
+def header(msg: Any, name: str) -> Optional[str]:
+    """Get the value of a Kafka message header, if it is set.
+
+    Args:
+        msg (Any): Kafka message.
+        name (str): key of the header.
+
+    Returns:
+        Optional[str]: decoded value of the header, or None.
+    """
+    for key, value in msg.headers() or []:
+        if key == name and isinstance(value, bytes) and value:
+            return value.decode("utf-8", errors="replace")
+    return None
+
+
+class RetryRouter:
+    """Reroute the failed messages to retry topics, then to a dead letter topic.
+
+    A failed message is produced to the first retry topic (topic, delay), then to the next
+    retry topic if it fails again, and finally to the dead letter topic (if any) with its
+    error and source topic, partition, and offset in its headers. Permanent failures (e.g.,
+    invalid messages) skip the retry topics. A retry message carries its due time (epoch
+    seconds) in its retry-after header: the consumer holds it back until then.
+
+    A message whose delivery fails is produced again, up to delivery_attempts times in total.
+
+    Parameters:
+        retry_topics (Sequence[tuple[str, float]]): retry topics and their delays (seconds).
+        dead_letter_topic (str, optional): topic of the messages that cannot be retried.
+        delivery_attempts (int): produce attempts of each message.
+        metrics (ServiceMetrics, optional): metrics counting the rerouted messages.
+    """
+
+    def __init__(
+        self,
+        retry_topics: Sequence[tuple[str, float]] = (),
+        dead_letter_topic: Optional[str] = None,
+        delivery_attempts: int = DEFAULT_DELIVERY_ATTEMPTS,
+        metrics: Optional[ServiceMetrics] = None,
+    ):
+        self.retry_topics = list(retry_topics)
+        self.dead_letter_topic = dead_letter_topic
+        self.delivery_attempts = delivery_attempts
+        self.metrics = metrics or ServiceMetrics()
+
+    @property
+    def topics(self) -> List[str]:
+        """Names of the retry topics (the consumer subscribes to them)."""
+        return [topic for topic, _ in self.retry_topics]
+
+    @staticmethod
+    def attempt(msg: Any) -> int:
+        """Get the number of failed attempts of a Kafka message from its header."""
+        attempt = header(msg, RETRY_ATTEMPT_HEADER)
+        return int(attempt) if attempt and attempt.isdigit() else 0
+
+    @staticmethod
+    def due(msg: Any) -> float:
+        """Get the time (epoch seconds) at which a retry message is due (0 if unset)."""
+        retry_after = header(msg, RETRY_AFTER_HEADER)
+        try:
+            return float(retry_after) if retry_after else 0.0
+        except ValueError:
+            return 0.0
+
+    def route(self, msg: Any, permanent: bool = False) -> Optional[tuple[str, Optional[float]]]:
+        """Get the retry or dead letter topic (and retry delay) of a failed message, if any.
+
+        Args:
+            msg (Any): failed Kafka message.
+            permanent (bool): skip the retry topics (e.g., for an invalid message).
+
+        Returns:
+            Optional[tuple[str, Optional[float]]]: topic and delay (None for the dead letter).
+        """
+        attempt = self.attempt(msg)
+        if attempt < len(self.retry_topics) and not permanent:
+            return self.retry_topics[attempt]
+        if self.dead_letter_topic:
+            return self.dead_letter_topic, None
+        return None
+
+    def headers(self, msg: Any, error: Any, delay: Optional[float]) -> Headers:
+        """Build the headers of a rerouted message: its source, attempts, error and due time."""
+        attempt = self.attempt(msg) + 1
+        retry_headers = (RETRY_ATTEMPT_HEADER, RETRY_AFTER_HEADER, ERROR_HEADER)
+        headers = [(key, value) for key, value in msg.headers() or [] if key not in retry_headers]
+        if header(msg, SOURCE_HEADERS[0]) is None:  # first failure: keep its source
+            source = (msg.topic(), str(msg.partition()), str(msg.offset()))
+            headers += [(key, value.encode("utf-8")) for key, value in zip(SOURCE_HEADERS, source)]
+        headers += [
+            (RETRY_ATTEMPT_HEADER, str(attempt).encode("utf-8")),
+            (ERROR_HEADER, str(error).encode("utf-8")),
+        ]
+        if delay is not None:
+            headers.append((RETRY_AFTER_HEADER, str(time.time() + delay).encode("utf-8")))
+        return headers
+
+    def reroute(
+        self,
+        producer: Optional[Producer],
+        msg: Any,
+        error: Any,
+        topic: str,
+        delay: Optional[float],
+        callback: DeliveryCallback,
+        poll: bool = True,
+    ) -> None:
+        """Produce a failed message to a retry (with a delay) or dead letter topic.
+
+        The delivery callbacks are served if poll is set.
+        """
+        headers = self.headers(msg, error, delay)
+        self.metrics.count("rerouted")
+        try:
+            if producer:
+                producer.produce(
+                    topic,
+                    key=msg.key(),
+                    value=msg.value(),
+                    headers=headers,
+                    callback=self.redeliver_on_failure(producer, callback),
+                )
+                attempts = self.attempt(msg) + 1
+                logger.warning(f"Message rerouted to {topic} after {attempts} attempts: {error}")
+                if poll:
+                    producer.poll(0)
+            else:
+                logger.error("Kafka producer is not initialized.")
+        except Exception:
+            logger.exception("Error during Kafka production/commit:")
+
+    def redeliver_on_failure(
+        self, producer: Optional[Producer], callback: DeliveryCallback
+    ) -> DeliveryCallback:
+        """Wrap a delivery callback to produce a failed message again, up to delivery_attempts.
+
+        The callback gets the delivery error once the attempts are exhausted.
+        """
+        attempts = {"left": self.delivery_attempts - 1}
+
+        def wrapper(err: Optional[KafkaError], msg: Any) -> None:
+            if err is not None and attempts["left"] > 0 and producer:
+                attempts["left"] -= 1
+                logger.warning(f"Message delivery failed, producing it again: {err}")
+                try:
+                    producer.produce(
+                        msg.topic(),
+                        key=msg.key(),
+                        value=msg.value(),
+                        headers=msg.headers(),
+                        callback=wrapper,
+                    )
+                    return
+                except Exception:
+                    logger.exception("Error during Kafka production:")
+            callback(err, msg)
+
+        return wrapper
+
+    @staticmethod
+    def on_all_delivered(callback: DeliveryCallback, count: int) -> DeliveryCallback:
+        """Wrap a delivery callback to call it once, when `count` messages are delivered.
+
+        The callback gets the first delivery error, if any.
+        """
+        pending: Dict[str, Any] = {"count": count, "err": None}
+
+        def wrapper(err: Optional[KafkaError], msg: Any) -> None:
+            pending["err"] = pending["err"] or err
+            pending["count"] -= 1
+            if pending["count"] == 0:
+                callback(pending["err"], msg)
+
+        return wrapper
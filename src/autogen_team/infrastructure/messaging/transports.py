@@ -0,0 +1,452 @@
+"""Transports of the Kafka service: confluent-kafka clients, or an in-process broker."""
+
+import abc
+import itertools
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from confluent_kafka import (
+    OFFSET_BEGINNING,
+    OFFSET_END,
+    OFFSET_INVALID,
+    Consumer,
+    Producer,
+    TopicPartition,
+)
+
+Headers = Optional[List[Tuple[str, Any]]]
+DeliveryCallback = Callable[[Optional[Any], Any], None]
+RebalanceCallback = Callable[[Any, List[TopicPartition]], None]
+
+
+class Transport(abc.ABC):
+    """Base class for a transport: create the producer and consumer of the service.
+
+    The clients follow the confluent-kafka Producer and Consumer interfaces.
+    """
+
+    @abc.abstractmethod
+    def producer(self, config: Dict[str, Any]) -> Any:
+        """Create a producer.
+
+        Args:
+            config (Dict[str, Any]): producer configuration.
+
+        Returns:
+            Any: producer client.
+        """
+
+    @abc.abstractmethod
+    def consumer(self, config: Dict[str, Any]) -> Any:
+        """Create a consumer.
+
+        Args:
+            config (Dict[str, Any]): consumer configuration (with a group.id).
+
+        Returns:
+            Any: consumer client.
+        """
+
+
+class KafkaTransport(Transport):
+    """Connect to a Kafka cluster with the confluent-kafka clients."""
+
+    def producer(self, config: Dict[str, Any]) -> Producer:
+        return Producer(config)
+
+    def consumer(self, config: Dict[str, Any]) -> Consumer:
+        return Consumer(config)
+
+
+class InMemoryMessage:
+    """Message of the in-memory broker, with the accessors of a confluent-kafka message."""
+
+    def __init__(
+        self,
+        topic: str,
+        partition: int,
+        offset: int,
+        key: Optional[bytes],
+        value: Optional[bytes],
+        headers: Headers,
+    ):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._headers = headers
+        self._timestamp = int(time.time() * 1000)
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return self._partition
+
+    def offset(self) -> int:
+        return self._offset
+
+    def key(self) -> Optional[bytes]:
+        return self._key
+
+    def value(self) -> Optional[bytes]:
+        return self._value
+
+    def headers(self) -> Headers:
+        return self._headers
+
+    def timestamp(self) -> Tuple[int, int]:
+        return 1, self._timestamp  # TIMESTAMP_CREATE_TIME
+
+    def error(self) -> None:
+        return None
+
+
+class InMemoryBroker(Transport):
+    """In-process broker: topics of partitioned logs, consumer groups, and committed offsets.
+
+    Messages are partitioned by key (crc32) or round-robin, and never expire. The members
+    of a consumer group share the partitions of their topics: when a member joins or
+    leaves, the partitions are reassigned, and each member revokes and assigns the
+    partitions it lost and gained on its next poll (like the cooperative assignors).
+    Messages are delivered at least once: a new owner resumes from the committed offsets.
+
+    Use it as the transport of the service for offline tests and benchmarks.
+
+    Parameters:
+        partitions (int): number of partitions of the topics (created on first use).
+    """
+
+    def __init__(self, partitions: int = 1):
+        self.partitions = partitions
+        self.topics: Dict[str, List[List[InMemoryMessage]]] = {}
+        self.committed: Dict[Tuple[str, str, int], int] = {}  # (group, topic, partition)
+        self.groups: Dict[str, Dict[int, List[str]]] = {}  # group -> member -> topics
+        self.generations: Dict[str, int] = {}
+        self.condition = threading.Condition()
+        self._members = itertools.count()
+        self._round_robin = itertools.count()
+
+    def producer(self, config: Dict[str, Any]) -> "InMemoryProducer":
+        return InMemoryProducer(self)
+
+    def consumer(self, config: Dict[str, Any]) -> "InMemoryConsumer":
+        return InMemoryConsumer(self, config)
+
+    def log(self, topic: str) -> List[List[InMemoryMessage]]:
+        """Get the partitions of a topic (created if needed)."""
+        with self.condition:
+            return self.topics.setdefault(topic, [[] for _ in range(self.partitions)])
+
+    def append(
+        self,
+        topic: str,
+        value: Optional[bytes],
+        key: Optional[bytes] = None,
+        headers: Headers = None,
+        partition: Optional[int] = None,
+    ) -> InMemoryMessage:
+        """Append a message to a partition of a topic, and wake up the consumers.
+
+        Returns:
+            InMemoryMessage: appended message, with its partition and offset.
+        """
+        with self.condition:
+            partitions = self.log(topic)
+            if partition is None or partition < 0:
+                index = zlib.crc32(key) if key is not None else next(self._round_robin)
+                partition = index % len(partitions)
+            log = partitions[partition]
+            message = InMemoryMessage(topic, partition, len(log), key, value, headers)
+            log.append(message)
+            self.condition.notify_all()
+            return message
+
+    def messages(self, topic: str) -> List[InMemoryMessage]:
+        """Get all the messages of a topic, ordered by partition and offset."""
+        with self.condition:
+            return [message for log in self.log(topic) for message in log]
+
+    def join(self, group: str, topics: List[str]) -> int:
+        """Add a member to a consumer group, and rebalance the group.
+
+        Returns:
+            int: ID of the member.
+        """
+        for topic in topics:
+            self.log(topic)
+        with self.condition:
+            member = next(self._members)
+            self.groups.setdefault(group, {})[member] = list(topics)
+            self._rebalance(group)
+            return member
+
+    def leave(self, group: str, member: int) -> None:
+        """Remove a member from a consumer group, and rebalance the group."""
+        with self.condition:
+            if self.groups.get(group, {}).pop(member, None) is not None:
+                self._rebalance(group)
+
+    def assignment(self, group: str, member: int) -> Tuple[int, List[Tuple[str, int]]]:
+        """Get the current generation of a group, and the partitions of one of its members."""
+        with self.condition:
+            members = self.groups.get(group, {})
+            owned: List[Tuple[str, int]] = []
+            for topic in sorted({topic for topics in members.values() for topic in topics}):
+                subscribers = sorted(id_ for id_, topics in members.items() if topic in topics)
+                for partition in range(len(self.log(topic))):
+                    if subscribers[partition % len(subscribers)] == member:
+                        owned.append((topic, partition))
+            return self.generations.get(group, 0), owned
+
+    def _rebalance(self, group: str) -> None:
+        """Start a new generation of a group (the members pick it up on their next poll)."""
+        self.generations[group] = self.generations.get(group, 0) + 1
+        self.condition.notify_all()
+
+
+class InMemoryProducer:
+    """Producer of the in-memory broker: messages are appended on produce.
+
+    The delivery callbacks are queued, and served by poll and flush (like librdkafka).
+    """
+
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+        self._deliveries: Deque[Tuple[DeliveryCallback, InMemoryMessage]] = deque()
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._deliveries)
+
+    def __bool__(self) -> bool:
+        return True  # like confluent-kafka, even without queued messages
+
+    def produce(
+        self,
+        topic: str,
+        value: Optional[bytes] = None,
+        key: Optional[bytes] = None,
+        partition: int = -1,
+        callback: Optional[DeliveryCallback] = None,
+        on_delivery: Optional[DeliveryCallback] = None,
+        headers: Headers = None,
+        **_: Any,
+    ) -> None:
+        message = self.broker.append(topic, value, key=key, headers=headers, partition=partition)
+        callback = callback or on_delivery
+        if callback is not None:
+            with self._condition:
+                self._deliveries.append((callback, message))
+                self._condition.notify_all()
+
+    def poll(self, timeout: Optional[float] = None) -> int:
+        """Serve the queued delivery callbacks, waiting at most timeout seconds for one.
+
+        Args:
+            timeout (float, optional): maximum wait without callback (None or -1: forever).
+
+        Returns:
+            int: number of callbacks served.
+        """
+        deadline = None if timeout is None or timeout < 0 else time.monotonic() + timeout
+        served = 0
+        while True:
+            with self._condition:
+                if not self._deliveries:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if served or (remaining is not None and remaining <= 0):
+                        return served
+                    self._condition.wait(remaining)
+                    continue
+                callback, message = self._deliveries.popleft()
+            callback(None, message)
+            served += 1
+
+    def flush(self, timeout: Optional[float] = None) -> int:
+        """Serve all the delivery callbacks.
+
+        Returns:
+            int: number of messages still queued (always 0).
+        """
+        self.poll(0)
+        return 0
+
+
+class InMemoryConsumer:
+    """Consumer of the in-memory broker, member of a consumer group.
+
+    Parameters:
+        broker (InMemoryBroker): broker of the consumer.
+        config (Dict[str, Any]): group.id and auto.offset.reset (earliest or latest).
+    """
+
+    def __init__(self, broker: InMemoryBroker, config: Dict[str, Any]):
+        self.broker = broker
+        self.group = str(config["group.id"])
+        self.reset = config.get("auto.offset.reset", "latest")
+        self.member: Optional[int] = None
+        self.generation = -1
+        self.positions: Dict[Tuple[str, int], int] = {}  # assigned partition -> next offset
+        self.paused: set[Tuple[str, int]] = set()
+        self.on_assign: Optional[RebalanceCallback] = None
+        self.on_revoke: Optional[RebalanceCallback] = None
+        self._next = 0  # round-robin over the assigned partitions
+
+    def subscribe(
+        self,
+        topics: List[str],
+        on_assign: Optional[RebalanceCallback] = None,
+        on_revoke: Optional[RebalanceCallback] = None,
+        on_lost: Optional[RebalanceCallback] = None,
+    ) -> None:
+        if self.member is not None:
+            self.broker.leave(self.group, self.member)
+        self.on_assign, self.on_revoke = on_assign, on_revoke
+        self.member = self.broker.join(self.group, topics)
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[InMemoryMessage]:
+        messages = self.consume(num_messages=1, timeout=-1 if timeout is None else timeout)
+        return messages[0] if messages else None
+
+    def consume(self, num_messages: int = 1, timeout: float = -1) -> List[InMemoryMessage]:
+        """Consume up to num_messages, waiting at most timeout seconds (-1: forever)."""
+        if self.member is None:  # not subscribed: no partition will ever be assigned
+            return []
+        deadline = None if timeout < 0 else time.monotonic() + timeout
+        messages: List[InMemoryMessage] = []
+        while True:
+            self._rebalance()
+            with self.broker.condition:
+                messages = self._fetch(num_messages)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if messages or (remaining is not None and remaining <= 0):
+                    return messages
+                if self.generation == self.broker.generations.get(self.group, 0):
+                    self.broker.condition.wait(remaining)
+
+    def _fetch(self, num_messages: int) -> List[InMemoryMessage]:
+        """Fetch the next messages of the assigned partitions, round-robin."""
+        messages: List[InMemoryMessage] = []
+        keys = [key for key in self.positions if key not in self.paused]
+        for index in range(len(keys)):
+            key = keys[(self._next + index) % len(keys)]
+            log = self.broker.topics[key[0]][key[1]]
+            count = min(num_messages - len(messages), len(log) - self.positions[key])
+            if count > 0:
+                messages.extend(log[self.positions[key] : self.positions[key] + count])
+                self.positions[key] += count
+            if len(messages) >= num_messages:
+                self._next += index + 1
+                break
+        return messages
+
+    def _rebalance(self) -> None:
+        """Revoke and assign the partitions of a new group generation (in the poll thread)."""
+        if self.member is None:
+            return
+        generation, owned = self.broker.assignment(self.group, self.member)
+        if generation == self.generation:
+            return
+        self.generation = generation
+        revoked = [key for key in self.positions if key not in owned]
+        if revoked:
+            if self.on_revoke is not None:
+                self.on_revoke(self, [TopicPartition(*key) for key in revoked])
+            for key in revoked:
+                self.positions.pop(key)
+                self.paused.discard(key)
+        assigned = [key for key in owned if key not in self.positions]
+        for key in assigned:
+            self.positions[key] = self._start(key)
+        if assigned and self.on_assign is not None:
+            self.on_assign(self, [TopicPartition(*key) for key in assigned])
+
+    def _start(self, key: Tuple[str, int]) -> int:
+        """Get the start offset of a partition: committed, else auto.offset.reset."""
+        committed = self.broker.committed.get((self.group, *key))
+        if committed is not None:
+            return committed
+        return 0 if self.reset in ("earliest", "smallest", "beginning") else self._high(key)
+
+    def _high(self, key: Tuple[str, int]) -> int:
+        """Get the high watermark of a partition."""
+        with self.broker.condition:
+            return len(self.broker.log(key[0])[key[1]])
+
+    def commit(
+        self,
+        message: Optional[InMemoryMessage] = None,
+        offsets: Optional[List[TopicPartition]] = None,
+        asynchronous: bool = True,
+    ) -> Optional[List[TopicPartition]]:
+        """Commit the offsets, the next offset of a message, or the current positions."""
+        if message is not None:
+            offsets = [TopicPartition(message.topic(), message.partition(), message.offset() + 1)]
+        elif offsets is None:
+            offsets = self.position(self.assignment())
+        with self.broker.condition:
+            for tp in offsets:
+                self.broker.committed[(self.group, tp.topic, tp.partition)] = tp.offset
+        return None if asynchronous else offsets
+
+    def committed(
+        self, partitions: List[TopicPartition], timeout: Optional[float] = None
+    ) -> List[TopicPartition]:
+        with self.broker.condition:
+            return [
+                TopicPartition(
+                    tp.topic,
+                    tp.partition,
+                    self.broker.committed.get((self.group, tp.topic, tp.partition), OFFSET_INVALID),
+                )
+                for tp in partitions
+            ]
+
+    def assignment(self) -> List[TopicPartition]:
+        return [TopicPartition(topic, partition) for topic, partition in self.positions]
+
+    def position(self, partitions: List[TopicPartition]) -> List[TopicPartition]:
+        return [
+            TopicPartition(
+                tp.topic, tp.partition, self.positions.get((tp.topic, tp.partition), OFFSET_INVALID)
+            )
+            for tp in partitions
+        ]
+
+    def get_watermark_offsets(
+        self, partition: TopicPartition, timeout: Optional[float] = None, cached: bool = False
+    ) -> Tuple[int, int]:
+        return 0, self._high((partition.topic, partition.partition))
+
+    def pause(self, partitions: List[TopicPartition]) -> None:
+        self.paused.update((tp.topic, tp.partition) for tp in partitions)
+
+    def resume(self, partitions: List[TopicPartition]) -> None:
+        self.paused.difference_update((tp.topic, tp.partition) for tp in partitions)
+
+    def seek(self, partition: TopicPartition) -> None:
+        key = (partition.topic, partition.partition)
+        if key not in self.positions:
+            raise ValueError(f"Partition not assigned: {key}")
+        if partition.offset == OFFSET_BEGINNING:
+            self.positions[key] = 0
+        elif partition.offset == OFFSET_END:
+            self.positions[key] = self._high(key)
+        else:
+            self.positions[key] = partition.offset
+
+    def close(self) -> None:
+        """Revoke the assigned partitions, and leave the consumer group."""
+        if self.member is None:
+            return
+        if self.positions and self.on_revoke is not None:
+            self.on_revoke(self, self.assignment())
+        self.broker.leave(self.group, self.member)
+        self.member = None
+        self.positions.clear()
+        self.paused.clear()
@@ -1,23 +1,29 @@
 """Infrastructure Utilities - Signers, splitters, searchers, and time."""
 
 from .searchers import (
+    AsyncGridSearcher,
     CrossValidation,
     Grid,
     GridCVSearcher,
+    HalvingSearcher,
+    Objective,
     Results,
     Searcher,
     SearcherKind,
+    TPESearcher,
 )
 from .signers import InferSigner, Signature, Signer, SignerKind
 from .splitters import (
     Index,
     Splitter,
     SplitterKind,
+    StratifiedSubsampleSplitter,
     TimeSeriesSplitter,
     TrainTestIndex,
     TrainTestSplits,
     TrainTestSplitter,
 )
+from .trials import SQLiteTrialStore, Trial, TrialKey, TrialStore, TrialStoreKind
 
 __all__ = [
     # Signers
@@ -29,6 +35,7 @@ __all__ = [
     "Splitter",
     "TrainTestSplitter",
     "TimeSeriesSplitter",
+    "StratifiedSubsampleSplitter",
     "SplitterKind",
     "TrainTestSplits",
     "Index",
@@ -36,8 +43,18 @@ __all__ = [
     # Searchers
     "Searcher",
     "GridCVSearcher",
+    "HalvingSearcher",
+    "AsyncGridSearcher",
+    "TPESearcher",
+    "Objective",
     "SearcherKind",
     "Grid",
     "Results",
     "CrossValidation",
+    # Trials
+    "Trial",
+    "TrialKey",
+    "TrialStore",
+    "SQLiteTrialStore",
+    "TrialStoreKind",
 ]
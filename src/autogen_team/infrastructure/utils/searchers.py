@@ -3,15 +3,23 @@
 # %% IMPORTS
 
 import abc
+import asyncio
+import hashlib
+import json
+import math
+import time
 import typing as T
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 import pydantic as pdt
 from sklearn import model_selection
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
 
 from autogen_team.core import schemas
 from autogen_team.evaluation import metrics
-from autogen_team.infrastructure.utils import splitters
+from autogen_team.infrastructure.utils import splitters, trials
 from autogen_team.models import entities as models
 
 # %% TYPES
@@ -29,6 +37,70 @@ Results = tuple[
 # Cross-validation options for searchers
 CrossValidation = int | splitters.TrainTestSplits | splitters.Splitter
 
+# Scores of the candidates (rows) on the folds (columns)
+Scores = npt.NDArray[np.float64]
+
+# %% OBJECTIVES
+
+
+class Objective(pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
+    """Select the best candidate on its quality, latency, and token usage.
+
+    The weighted strategy maximizes the objective:
+        mean_test_score - latency_weight * latency_p95 - tokens_weight * mean_tokens.
+    The pareto strategy keeps the candidates not dominated on (mean_test_score, latency_p95,
+    mean_tokens), then picks the fastest of them (i.e., the lowest latency_p95).
+    Candidates below min_score are excluded, unless no candidate reaches it:
+    then only the candidates with the best score are considered.
+    Candidates without a latency or tokens usage are ranked as the most costly ones.
+
+    Parameters:
+        strategy (str): selection strategy (weighted or pareto).
+        min_score (float, optional): minimum mean score of the selected candidate.
+        latency_weight (float): cost of a second of latency (p95 by row).
+        tokens_weight (float): cost of a token (mean by row).
+    """
+
+    strategy: T.Literal["weighted", "pareto"] = "weighted"
+    min_score: float | None = None
+    latency_weight: float = pdt.Field(default=0.0, ge=0.0)
+    tokens_weight: float = pdt.Field(default=0.0, ge=0.0)
+
+    def select(self, results: pd.DataFrame, candidates: npt.NDArray[np.bool_]) -> int:
+        """Add the objective and pareto columns to the results, and select the best candidate.
+
+        Args:
+            results (pd.DataFrame): search results with scores, latencies and tokens.
+            candidates (npt.NDArray[np.bool_]): results rows that can be selected.
+
+        Returns:
+            int: index of the best candidate in the results.
+        """
+        score = results["mean_test_score"].to_numpy(dtype=np.float64)
+        latency = _worst(results["latency_p95"]).to_numpy(dtype=np.float64)
+        tokens = _worst(results["mean_tokens"]).to_numpy(dtype=np.float64)
+        objective = score - self.latency_weight * latency - self.tokens_weight * tokens
+        candidates = candidates & ~np.isnan(score)
+        min_score = -np.inf if self.min_score is None else self.min_score
+        feasible = candidates & (score >= min_score)
+        if not feasible.any():  # fall back on the best scores
+            feasible = candidates & (score == score[candidates].max())
+        costs = np.stack([-score, latency, tokens], axis=1)
+        # dominates[j, i]: candidate j is as good as i on all the costs, and better on one
+        as_good = (costs[:, None, :] <= costs[None, :, :]).all(axis=2)
+        better = (costs[:, None, :] < costs[None, :, :]).any(axis=2)
+        dominated = (feasible[:, None] & as_good & better).any(axis=0)
+        pareto = feasible & ~dominated
+        results["objective"] = objective
+        results["pareto"] = pareto
+        if self.strategy == "pareto":
+            front = np.flatnonzero(pareto)
+            order = np.lexsort((tokens[front], -score[front], latency[front]))
+            return int(results.index[front[order[0]]])
+        index = np.flatnonzero(feasible)
+        return int(results.index[index[np.argmax(objective[index])]])
+
+
 # %% SEARCHERS
 
 
@@ -40,11 +112,17 @@ class Searcher(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid")
 
     Parameters:
         param_grid (Grid): mapping of param key -> values.
+        cache_predictions (bool): share the model predictions between candidates.
+        store (trials.TrialStoreKind, optional): record the trials and skip the finished ones.
+        objective (Objective, optional): select the best candidate on latency and tokens too.
     """
 
     KIND: str
 
     param_grid: Grid
+    cache_predictions: bool = True
+    store: trials.TrialStoreKind | None = None
+    objective: Objective | None = None
 
     @abc.abstractmethod
     def search(
@@ -68,11 +146,64 @@ class Searcher(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid")
             Results: all the results of the searcher execution process.
         """
 
+    def _scorer(self, metric: metrics.Metric) -> "_TrialScorer":
+        """Create the scorer of the model candidates for a search.
+
+        Args:
+            metric (metrics.Metric): main metric to optimize.
+
+        Returns:
+            _TrialScorer: scorer sharing a prediction cache and the trial store.
+        """
+        cache = models.PredictionCache(enabled=self.cache_predictions)
+        return _TrialScorer(
+            metric=metric, cache=cache, store=self.store, params=list(self.param_grid)
+        )
+
+    def _finish(
+        self,
+        results: pd.DataFrame,
+        best: int,
+        scorer: "_TrialScorer",
+        n_candidates: int,
+        cv: model_selection.BaseCrossValidator,
+        inputs: schemas.Inputs,
+        targets: schemas.Targets,
+    ) -> Results:
+        """Add the usage of the candidates to the results, and select the best candidate.
+
+        Args:
+            results (pd.DataFrame): results of the search (one row per candidate evaluation).
+            best (int): index of the best candidate by score.
+            scorer (_TrialScorer): scorer of the candidates.
+            n_candidates (int): number of candidates in the grid.
+            cv (model_selection.BaseCrossValidator): cross-fold validation of the search.
+            inputs (schemas.Inputs): model inputs for tuning.
+            targets (schemas.Targets): model targets for tuning.
+
+        Returns:
+            Results: all the results of the searcher execution process.
+        """
+        usage = scorer.usage(results["params"])
+        results[usage.columns] = usage
+        calls = _calls(
+            scorer.cache, n_candidates=n_candidates, cv=cv, inputs=inputs, targets=targets
+        )
+        results.attrs.update(calls, tokens=scorer.tokens)
+        if self.objective is not None:
+            last = results["iter"] == results["iter"].max() if "iter" in results else True
+            candidates = np.broadcast_to(np.asarray(last, dtype=bool), len(results))
+            best = self.objective.select(results=results, candidates=candidates)
+        best_params: models.Params = results.at[best, "params"]
+        return results, float(results.at[best, "mean_test_score"]), best_params
+
 
 class GridCVSearcher(Searcher):
     """Grid searcher with cross-fold validation.
 
     Convention: metric returns higher values for better models.
+    The usage (calls, latencies, tokens) is collected in the current process only:
+    an objective cannot be combined with parallel jobs.
 
     Parameters:
         n_jobs (int, optional): number of jobs to run in parallel.
@@ -90,6 +221,13 @@ class GridCVSearcher(Searcher):
     error_score: str | float = "raise"
     return_train_score: bool = False
 
+    @pdt.model_validator(mode="after")
+    def _check_objective(self) -> T.Self:
+        """Reject an objective with parallel jobs: their usage is collected in the workers."""
+        if self.objective is not None and self.n_jobs not in (None, 1):
+            raise ValueError("objective requires n_jobs=None or 1 (usage is per process)")
+        return self
+
     def search(
         self,
         model: models.Model,
@@ -98,9 +236,11 @@ class GridCVSearcher(Searcher):
         targets: schemas.Targets,
         cv: CrossValidation,
     ) -> Results:
+        cv = model_selection.check_cv(cv)  # reuse the splits to count the calls
+        scorer = self._scorer(metric=metric)
         searcher = model_selection.GridSearchCV(
             estimator=model,
-            scoring=metric.scorer,
+            scoring=scorer,
             cv=cv,
             param_grid=self.param_grid,
             n_jobs=self.n_jobs,
@@ -111,7 +251,627 @@ class GridCVSearcher(Searcher):
         )
         searcher.fit(inputs, targets)
         results = pd.DataFrame(searcher.cv_results_)
-        return results, searcher.best_score_, searcher.best_params_
+        return self._finish(
+            results=results,
+            best=searcher.best_index_,
+            scorer=scorer,
+            n_candidates=len(results),
+            cv=cv,
+            inputs=inputs,
+            targets=targets,
+        )
+
+
+class HalvingSearcher(Searcher):
+    """Successive halving searcher with cross-fold validation.
+
+    Evaluate all the candidates on a small sample of rows,
+    then keep the best 1 / factor candidates and multiply their rows by factor.
+
+    Convention: metric returns higher values for better models.
+    The usage (calls, latencies, tokens) is collected in the current process only:
+    an objective cannot be combined with parallel jobs.
+
+    Parameters:
+        factor (int): proportion of candidates kept (and rows added) at each iteration.
+        min_resources (int | str): number of rows of the first iteration (or strategy).
+        aggressive_elimination (bool): eliminate candidates until the last iteration is full.
+        random_state (int): random state for sampling the rows.
+        n_jobs (int, optional): number of jobs to run in parallel.
+        refit (bool): refit the model after the tuning.
+        verbose (int): set the searcher verbosity level.
+        error_score (str | float): strategy or value on error.
+    """
+
+    KIND: T.Literal["HalvingSearcher"] = "HalvingSearcher"
+
+    factor: int = pdt.Field(default=3, gt=1)
+    min_resources: int | T.Literal["exhaust", "smallest"] = "exhaust"
+    aggressive_elimination: bool = False
+    random_state: int = 42
+    n_jobs: int | None = None
+    refit: bool = True
+    verbose: int = 3
+    error_score: str | float = "raise"
+
+    @pdt.model_validator(mode="after")
+    def _check_objective(self) -> T.Self:
+        """Reject an objective with parallel jobs: their usage is collected in the workers."""
+        if self.objective is not None and self.n_jobs not in (None, 1):
+            raise ValueError("objective requires n_jobs=None or 1 (usage is per process)")
+        return self
+
+    def search(
+        self,
+        model: models.Model,
+        metric: metrics.Metric,
+        inputs: schemas.Inputs,
+        targets: schemas.Targets,
+        cv: CrossValidation,
+    ) -> Results:
+        cv = model_selection.check_cv(cv)  # reuse the splits to count the calls
+        scorer = self._scorer(metric=metric)
+        searcher = model_selection.HalvingGridSearchCV(
+            estimator=model,
+            scoring=scorer,
+            cv=cv,
+            param_grid=self.param_grid,
+            factor=self.factor,
+            resource="n_samples",
+            min_resources=self.min_resources,
+            aggressive_elimination=self.aggressive_elimination,
+            random_state=self.random_state,
+            n_jobs=self.n_jobs,
+            refit=self.refit,
+            verbose=self.verbose,
+            error_score=self.error_score,
+            return_train_score=False,
+        )
+        searcher.fit(inputs, targets)
+        results = pd.DataFrame(searcher.cv_results_)
+        results.attrs["iterations"] = searcher.n_iterations_
+        return self._finish(
+            results=results,
+            best=searcher.best_index_,
+            scorer=scorer,
+            n_candidates=searcher.n_candidates_[0],
+            cv=cv,
+            inputs=inputs,
+            targets=targets,
+        )
+
+
+class AsyncGridSearcher(Searcher):
+    """Grid searcher evaluating all the candidates concurrently in one event loop.
+
+    Each (candidate, fold, row) prediction is a coroutine awaiting the model apredict,
+    and all of them share the model client under a bounded number of concurrent calls.
+
+    Convention: metric returns higher values for better models.
+
+    Parameters:
+        concurrency (int): maximum number of concurrent model calls.
+        error_score (str | float): strategy or value on error.
+    """
+
+    KIND: T.Literal["AsyncGridSearcher"] = "AsyncGridSearcher"
+
+    concurrency: int = pdt.Field(default=16, gt=0)
+    error_score: str | float = "raise"
+
+    def search(
+        self,
+        model: models.Model,
+        metric: metrics.Metric,
+        inputs: schemas.Inputs,
+        targets: schemas.Targets,
+        cv: CrossValidation,
+    ) -> Results:
+        cv = model_selection.check_cv(cv)  # reuse the splits to count the calls
+        splits = list(cv.split(inputs, targets))
+        candidates = list(model_selection.ParameterGrid(self.param_grid))
+        scorer = self._scorer(metric=metric)
+        scores = asyncio.run(
+            _aevaluate(
+                model=model,
+                scorer=scorer,
+                candidates=candidates,
+                splits=splits,
+                inputs=inputs,
+                targets=targets,
+                semaphore=asyncio.Semaphore(self.concurrency),
+                error_score=self.error_score,
+            )
+        )
+        results = _results(candidates=candidates, scores=scores)
+        return self._finish(
+            results=results,
+            best=int(results["rank_test_score"].idxmin()),
+            scorer=scorer,
+            n_candidates=len(results),
+            cv=cv,
+            inputs=inputs,
+            targets=targets,
+        )
+
+
+class TPESearcher(Searcher):
+    """Tree-structured Parzen estimator searcher with budgets.
+
+    Numeric params are searched in the [min, max] range of their grid values
+    (integers if all the values are integers), other params among their grid values.
+    After n_startup random candidates, each round proposes the candidates that maximize
+    the density ratio of the best (gamma quantile) trials over the others.
+    The search stops when a budget (trials, seconds, or tokens) is exhausted.
+
+    Convention: metric returns higher values for better models.
+
+    Parameters:
+        max_trials (int): maximum number of candidates to evaluate.
+        max_seconds (float, optional): maximum wall-clock time of the search.
+        max_tokens (int, optional): maximum number of tokens spent by the model calls.
+        n_startup (int): number of random candidates before modeling the trials.
+        n_concurrent (int): number of candidates proposed and evaluated per round.
+        n_samples (int): number of samples drawn to choose the proposals.
+        gamma (float): quantile of the trials modeled as the best ones.
+        concurrency (int): maximum number of concurrent model calls.
+        random_state (int): random state of the proposals.
+        error_score (str | float): strategy or value on error.
+    """
+
+    KIND: T.Literal["TPESearcher"] = "TPESearcher"
+
+    max_trials: int = pdt.Field(default=20, gt=0)
+    max_seconds: float | None = pdt.Field(default=None, gt=0)
+    max_tokens: int | None = pdt.Field(default=None, gt=0)
+    n_startup: int = pdt.Field(default=5, gt=0)
+    n_concurrent: int = pdt.Field(default=4, gt=0)
+    n_samples: int = pdt.Field(default=24, gt=0)
+    gamma: float = pdt.Field(default=0.25, gt=0.0, lt=1.0)
+    concurrency: int = pdt.Field(default=16, gt=0)
+    random_state: int = 42
+    error_score: str | float = "raise"
+
+    def search(
+        self,
+        model: models.Model,
+        metric: metrics.Metric,
+        inputs: schemas.Inputs,
+        targets: schemas.Targets,
+        cv: CrossValidation,
+    ) -> Results:
+        cv = model_selection.check_cv(cv)  # reuse the splits to count the calls
+        splits = list(cv.split(inputs, targets))
+        scorer = self._scorer(metric=metric)
+        candidates: list[models.Params] = []
+        scores = asyncio.run(
+            self._asearch(
+                model=model,
+                scorer=scorer,
+                candidates=candidates,
+                splits=splits,
+                inputs=inputs,
+                targets=targets,
+            )
+        )
+        results = _results(candidates=candidates, scores=scores)
+        return self._finish(
+            results=results,
+            best=int(results["rank_test_score"].idxmin()),
+            scorer=scorer,
+            n_candidates=len(results),
+            cv=cv,
+            inputs=inputs,
+            targets=targets,
+        )
+
+    async def _asearch(
+        self,
+        model: models.Model,
+        scorer: "_TrialScorer",
+        candidates: list[models.Params],
+        splits: list[splitters.TrainTestIndex],
+        inputs: schemas.Inputs,
+        targets: schemas.Targets,
+    ) -> Scores:
+        """Propose and evaluate candidates by rounds until a budget is exhausted."""
+        rng = np.random.default_rng(self.random_state)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.monotonic()
+        scores = np.empty((0, len(splits)), dtype=np.float64)
+        while len(candidates) < self.max_trials:
+            if self.max_seconds is not None and time.monotonic() - start >= self.max_seconds:
+                break
+            if self.max_tokens is not None and scorer.tokens >= self.max_tokens:
+                break
+            size = min(self.n_concurrent, self.max_trials - len(candidates))
+            if len(candidates) < self.n_startup:
+                proposals = [_sample(self.param_grid, rng) for _ in range(size)]
+            else:
+                proposals = _propose(
+                    grid=self.param_grid,
+                    candidates=candidates,
+                    scores=scores.mean(axis=1),
+                    size=size,
+                    n_samples=self.n_samples,
+                    gamma=self.gamma,
+                    rng=rng,
+                )
+            round_scores = await _aevaluate(
+                model=model,
+                scorer=scorer,
+                candidates=proposals,
+                splits=splits,
+                inputs=inputs,
+                targets=targets,
+                semaphore=semaphore,
+                error_score=self.error_score,
+            )
+            candidates.extend(proposals)
+            scores = np.concatenate([scores, round_scores])
+        return scores
+
+
+SearcherKind = GridCVSearcher | HalvingSearcher | AsyncGridSearcher | TPESearcher
+
+# %% HELPERS
+
+
+def _calls(
+    cache: models.PredictionCache,
+    n_candidates: int,
+    cv: CrossValidation,
+    inputs: schemas.Inputs,
+    targets: schemas.Targets,
+) -> dict[str, int]:
+    """Compare the model calls of a search with the calls of a full grid search.
+
+    The calls are counted in the current process (i.e., with n_jobs=None).
+
+    Args:
+        cache (models.PredictionCache): prediction cache used by the search.
+        n_candidates (int): number of candidates in the grid.
+        cv (CrossValidation): choice for cross-fold validation.
+        inputs (schemas.Inputs): model inputs for tuning.
+        targets (schemas.Targets): model targets for tuning.
+
+    Returns:
+        dict[str, int]: calls made, calls of a full grid search and calls saved.
+    """
+    splits = model_selection.check_cv(cv).split(inputs, targets)
+    calls_grid = n_candidates * sum(len(test_index) for _, test_index in splits)
+    return {
+        "calls": cache.misses,
+        "calls_grid": calls_grid,
+        "calls_saved": calls_grid - cache.misses,
+    }
+
+
+class _TrialScorer:
+    """Score model candidates with a shared prediction cache and an optional trial store.
+
+    Finished trials are read from the store instead of being predicted again.
+
+    Parameters:
+        metric (metrics.Metric): main metric to optimize.
+        cache (models.PredictionCache): memo of the model predictions.
+        store (trials.TrialStore, optional): record of the finished trials.
+        params (list[str]): names of the searched params.
+    """
+
+    def __init__(
+        self,
+        metric: metrics.Metric,
+        cache: models.PredictionCache,
+        store: trials.TrialStore | None,
+        params: list[str],
+    ) -> None:
+        self.metric = metric
+        self.cache = cache
+        self.store = store
+        self.params = params
+        self.rows: dict[str, tuple[list[float], list[int]]] = {}  # latencies and tokens by row
+
+    def __call__(self, model: models.Model, inputs: schemas.Inputs, targets: pd.DataFrame) -> float:
+        """Score the model on a fold (sklearn scorer signature)."""
+        key = self.key(model=model, inputs=inputs)
+        if self.store is not None and (trial := self.store.get(key)) is not None:
+            return self.replay(trial)
+        start = time.perf_counter()
+        outputs = self.cache.predict(model=model, inputs=inputs)
+        return self.record(key, model, targets, outputs, latency=time.perf_counter() - start)
+
+    async def ascore(
+        self,
+        model: models.Model,
+        inputs: schemas.Inputs,
+        targets: pd.DataFrame,
+        semaphore: asyncio.Semaphore,
+    ) -> float:
+        """Score the model on a fold in the event loop, with one request per row."""
+        key = self.key(model=model, inputs=inputs)
+        if self.store is not None and (trial := self.store.get(key)) is not None:
+            return self.replay(trial)
+        start = time.perf_counter()
+        rows = [inputs.iloc[[index]] for index in range(len(inputs))]
+        outputs = await asyncio.gather(
+            *(self.cache.apredict(model=model, inputs=row, semaphore=semaphore) for row in rows)
+        )
+        outputs_ = T.cast(schemas.Outputs, pd.concat(outputs, ignore_index=True))
+        return self.record(key, model, targets, outputs_, latency=time.perf_counter() - start)
+
+    @property
+    def tokens(self) -> int:
+        """Tokens spent by the model calls (the cached and resumed rows are free)."""
+        return self.cache.tokens
+
+    def key(self, model: models.Model, inputs: schemas.Inputs) -> trials.TrialKey:
+        """Compute the key of the trial of a model on a fold."""
+        params = json.dumps(model.request_params(), sort_keys=True, default=str).encode("utf-8")
+        rows = pd.util.hash_pandas_object(inputs, index=False).to_numpy().tobytes()
+        params_key = hashlib.sha256(params).hexdigest()
+        fold_key = hashlib.sha256(rows).hexdigest()
+        return params_key, fold_key, self.metric.name
+
+    def record(
+        self,
+        key: trials.TrialKey,
+        model: models.Model,
+        targets: pd.DataFrame,
+        outputs: schemas.Outputs,
+        latency: float,
+    ) -> float:
+        """Score the outputs of a model on a fold and record the trial."""
+        score = self.metric.score(targets=targets, outputs=outputs)
+        metadata = [meta for meta in outputs.get("metadata", []) if isinstance(meta, dict)]
+        latencies = [float(meta["latency"]) for meta in metadata if meta.get("latency") is not None]
+        tokens_ = [int(meta.get("tokens") or 0) for meta in metadata]
+        tokens = sum(tokens_)
+        params = model.get_params()
+        candidate = {name: params[name] for name in self.params}
+        self._add_rows(candidate, latencies=latencies, tokens=tokens_)
+        if self.store is not None:
+            params_key, fold_key, metric = key
+            trial = trials.Trial(
+                params_key=params_key,
+                fold_key=fold_key,
+                metric=metric,
+                params=candidate,
+                score=float(score),
+                latency=latency,
+                tokens=tokens,
+                row_latencies=latencies,
+                row_tokens=tokens_,
+            )
+            self.store.put(trial)
+        return score
+
+    def replay(self, trial: trials.Trial) -> float:
+        """Add the usage of a finished trial to the rows of its candidate, and return its score.
+
+        The tokens of the trial were spent by a previous search: they don't count in this one.
+        """
+        self._add_rows(trial.params, latencies=trial.row_latencies, tokens=trial.row_tokens)
+        return trial.score
+
+    def _add_rows(
+        self, candidate: models.Params, latencies: list[float], tokens: list[int]
+    ) -> None:
+        """Collect the latencies and tokens of the rows predicted for a candidate."""
+        rows = self.rows.setdefault(_candidate_key(candidate), ([], []))
+        rows[0].extend(latencies)
+        rows[1].extend(tokens)
+
+    def usage(self, candidates: pd.Series) -> pd.DataFrame:
+        """Summarize the latency percentiles and tokens by row of the candidates.
+
+        Args:
+            candidates (pd.Series): searched params of each candidate.
+
+        Returns:
+            pd.DataFrame: latency_p50, latency_p95 and mean_tokens of each candidate.
+        """
+        usage = []
+        for candidate in candidates:
+            latencies, tokens = self.rows.get(_candidate_key(candidate), ([], []))
+            p50, p95 = np.percentile(latencies, [50, 95]) if latencies else (np.nan, np.nan)
+            mean_tokens = np.mean(tokens) if tokens else np.nan
+            usage.append({"latency_p50": p50, "latency_p95": p95, "mean_tokens": mean_tokens})
+        return pd.DataFrame(usage, index=candidates.index, dtype=np.float64)
+
+
+def _worst(costs: pd.Series) -> pd.Series:
+    """Replace the missing costs with the highest cost (or zero if all of them are missing)."""
+    return costs.fillna(costs.max()).fillna(0.0)
+
+
+def _candidate_key(params: models.Params) -> str:
+    """Identify a candidate by its searched params."""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+async def _aevaluate(
+    model: models.Model,
+    scorer: _TrialScorer,
+    candidates: list[models.Params],
+    splits: list[splitters.TrainTestIndex],
+    inputs: schemas.Inputs,
+    targets: schemas.Targets,
+    semaphore: asyncio.Semaphore,
+    error_score: str | float = "raise",
+) -> Scores:
+    """Score the candidates on the folds concurrently in the running event loop.
+
+    Candidates are copies of the model sharing its client (e.g., its connection pool).
+
+    Args:
+        model (models.Model): AI/ML model to fine-tune.
+        scorer (_TrialScorer): scorer of the candidates.
+        candidates (list[models.Params]): model params of each candidate.
+        splits (list[splitters.TrainTestIndex]): train and test rows of each fold.
+        inputs (schemas.Inputs): model inputs for tuning.
+        targets (schemas.Targets): model targets for tuning.
+        semaphore (asyncio.Semaphore): bound of the concurrent model calls.
+        error_score (str | float): strategy or value on error.
+
+    Returns:
+        Scores: scores of the candidates (rows) on the folds (columns).
+    """
+
+    async def score(params: models.Params, train: splitters.Index, test: splitters.Index) -> float:
+        try:
+            estimator = model.model_copy(update=params)
+            estimator.fit(
+                inputs=splitters.take(inputs, train), targets=splitters.take(targets, train)
+            )
+            return await scorer.ascore(
+                model=estimator,
+                inputs=splitters.take(inputs, test),
+                targets=splitters.take(targets, test),
+                semaphore=semaphore,
+            )
+        except Exception:
+            if error_score == "raise":
+                raise
+            return float(error_score)
+
+    tasks = [score(params, train, test) for params in candidates for train, test in splits]
+    scores = await asyncio.gather(*tasks)
+    return np.array(scores, dtype=np.float64).reshape(len(candidates), len(splits))
+
+
+def _results(candidates: list[models.Params], scores: Scores) -> pd.DataFrame:
+    """Tabulate the scores of the candidates like the sklearn cv_results_.
+
+    Args:
+        candidates (list[models.Params]): model params of each candidate.
+        scores (Scores): scores of the candidates (rows) on the folds (columns).
+
+    Returns:
+        pd.DataFrame: params, param_*, split*_test_score, and mean/std/rank_test_score.
+    """
+    results = pd.DataFrame({"params": candidates})
+    params = pd.DataFrame.from_records(candidates, index=results.index)
+    results[[f"param_{key}" for key in params.columns]] = params
+    for fold in range(scores.shape[1]):
+        results[f"split{fold}_test_score"] = scores[:, fold]
+    results["mean_test_score"] = scores.mean(axis=1)
+    results["std_test_score"] = scores.std(axis=1)
+    results["rank_test_score"] = (
+        results["mean_test_score"].rank(method="min", ascending=False).fillna(len(results))
+    ).astype(np.int32)
+    return results
+
+
+def _is_numeric(values: list[models.ParamValue]) -> bool:
+    """Check if the grid values of a param define a numeric range."""
+    numbers = all(
+        isinstance(value, int | float) and not isinstance(value, bool) for value in values
+    )
+    return numbers and len(set(values)) > 1
+
+
+def _cast(values: list[models.ParamValue], value: float) -> models.ParamValue:
+    """Cast a value sampled in a numeric range to the type of its grid values."""
+    if all(isinstance(value_, int) for value_ in values):
+        return int(round(value))
+    return float(value)
+
+
+def _sample(grid: Grid, rng: np.random.Generator) -> models.Params:
+    """Sample candidate params uniformly from the grid ranges and values."""
+    params: models.Params = {}
+    for key, values in grid.items():
+        if _is_numeric(values):
+            params[key] = _cast(values, rng.uniform(min(values), max(values)))
+        else:
+            params[key] = values[rng.integers(len(values))]
+    return params
+
+
+def _propose(
+    grid: Grid,
+    candidates: list[models.Params],
+    scores: npt.NDArray[np.float64],
+    size: int,
+    n_samples: int,
+    gamma: float,
+    rng: np.random.Generator,
+) -> list[models.Params]:
+    """Propose the candidates maximizing the density ratio of the good over the bad trials.
+
+    Each param is modeled independently: a Parzen estimator (gaussian kernels and a uniform
+    prior) for the numeric ranges, and smoothed frequencies for the other values.
+
+    Args:
+        grid (Grid): mapping of param key -> values.
+        candidates (list[models.Params]): params of the evaluated candidates.
+        scores (npt.NDArray[np.float64]): mean score of the evaluated candidates.
+        size (int): number of candidates to propose.
+        n_samples (int): number of samples drawn from the good trials densities.
+        gamma (float): quantile of the trials modeled as the best ones.
+        rng (np.random.Generator): random generator.
+
+    Returns:
+        list[models.Params]: proposed candidates, ordered by decreasing ratio.
+    """
+    order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")
+    n_good = max(1, int(np.ceil(gamma * len(candidates))))
+    good, bad = order[:n_good], order[n_good:]
+    n_draws = max(n_samples, size)
+    draws: dict[str, list[models.ParamValue]] = {}
+    ratios = np.zeros(n_draws, dtype=np.float64)
+    for key, values in grid.items():
+        observed = [candidate[key] for candidate in candidates]
+        if _is_numeric(values):
+            low, high = float(min(values)), float(max(values))
+            points = np.array(observed, dtype=np.float64)
+            samples = _parzen_sample(points[good], low, high, size=n_draws, rng=rng)
+            ratios += np.log(_parzen_pdf(samples, points[good], low, high))
+            ratios -= np.log(_parzen_pdf(samples, points[bad], low, high))
+            draws[key] = [_cast(values, sample) for sample in samples]
+        else:
+            index = np.array([values.index(value) for value in observed], dtype=np.int64)
+            p_good = np.bincount(index[good], minlength=len(values)) + 1.0
+            p_bad = np.bincount(index[bad], minlength=len(values)) + 1.0
+            p_good, p_bad = p_good / p_good.sum(), p_bad / p_bad.sum()
+            choices = rng.choice(len(values), size=n_draws, p=p_good)
+            ratios += np.log(p_good[choices]) - np.log(p_bad[choices])
+            draws[key] = [values[choice] for choice in choices]
+    proposals: dict[str, models.Params] = {}  # distinct proposals by their repr
+    for draw in np.argsort(-ratios, kind="stable"):
+        params = {key: draws[key][draw] for key in grid}
+        proposals.setdefault(repr(sorted(params.items())), params)
+        if len(proposals) == size:
+            break
+    while len(proposals) < size:  # small spaces: duplicates are served by the cache
+        proposals[str(len(proposals))] = _sample(grid, rng)
+    return list(proposals.values())
+
+
+def _bandwidth(points: npt.NDArray[np.float64], low: float, high: float) -> float:
+    """Compute the kernel bandwidth of a Parzen estimator (Scott's rule on the range)."""
+    return max((high - low) * math.pow(len(points) + 1, -0.2), (high - low) * 1e-3)
+
+
+def _parzen_sample(
+    points: npt.NDArray[np.float64], low: float, high: float, size: int, rng: np.random.Generator
+) -> npt.NDArray[np.float64]:
+    """Sample from a Parzen estimator mixing gaussian kernels and a uniform prior."""
+    components = rng.integers(len(points) + 1, size=size)  # last component: the prior
+    samples = rng.normal(np.append(points, 0.0)[components], _bandwidth(points, low, high))
+    prior = components == len(points)
+    samples[prior] = rng.uniform(low, high, size=prior.sum())
+    clipped: npt.NDArray[np.float64] = np.clip(samples, low, high)
+    return clipped
 
 
-SearcherKind = GridCVSearcher
+def _parzen_pdf(
+    values: npt.NDArray[np.float64], points: npt.NDArray[np.float64], low: float, high: float
+) -> npt.NDArray[np.float64]:
+    """Compute the density of a Parzen estimator mixing gaussian kernels and a uniform prior."""
+    sigma = _bandwidth(points, low, high)
+    z = (values[:, None] - points[None, :]) / sigma
+    kernels = np.exp(-0.5 * z**2).sum(axis=1) / (sigma * np.sqrt(2 * np.pi))
+    density: npt.NDArray[np.float64] = (kernels + 1.0 / (high - low)) / (len(points) + 1)
+    return density
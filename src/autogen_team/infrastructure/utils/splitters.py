@@ -7,6 +7,7 @@ import typing as T
 
 import numpy as np
 import numpy.typing as npt
+import pandas as pd
 import pydantic as pdt
 from sklearn import model_selection
 
@@ -17,6 +18,7 @@ from autogen_team.core import schemas
 Index = npt.NDArray[np.int64]
 TrainTestIndex = tuple[Index, Index]
 TrainTestSplits = T.Iterator[TrainTestIndex]
+Frame = T.TypeVar("Frame", bound=pd.DataFrame)
 
 # %% SPLITTERS
 
@@ -120,4 +122,148 @@ class TimeSeriesSplitter(Splitter):
         return self.n_splits
 
 
-SplitterKind = TrainTestSplitter | TimeSeriesSplitter
+class StratifiedSubsampleSplitter(Splitter):
+    """Split a small representative subsample of a dataframe as the test set.
+
+    Rows are stratified by input length buckets (quantiles) and optionally by a hashed
+    category column, then each stratum gives its share of the test rows (proportional
+    allocation). Rows are picked by their seeded content hash: the subsample is
+    deterministic, and does not depend on the order of the rows. The training job logs
+    the full set estimate (and its variance) of the row metrics from the test subsample.
+
+    Parameters:
+        test_size (int | float): number/ratio (lower than 1) for the test set.
+        n_buckets (int): number of input length buckets.
+        column (str, optional): category column of the inputs or targets.
+        n_categories (int): number of hashed categories.
+        random_state (int): random state for hashing the rows.
+    """
+
+    KIND: T.Literal["StratifiedSubsampleSplitter"] = "StratifiedSubsampleSplitter"
+
+    test_size: int | float = pdt.Field(default=0.05, gt=0)
+    n_buckets: int = pdt.Field(default=4, gt=0)
+    column: str | None = None
+    n_categories: int = pdt.Field(default=8, gt=0)
+    random_state: int = 42
+
+    @pdt.field_validator("test_size")
+    @classmethod
+    def _check_test_size(cls, test_size: int | float) -> int | float:
+        """Reject a test ratio that is not lower than 1 (use an int for a number of rows)."""
+        if isinstance(test_size, float) and test_size >= 1.0:
+            raise ValueError("test_size ratio must be lower than 1")
+        return test_size
+
+    def split(
+        self, inputs: schemas.Inputs, targets: schemas.Targets, groups: Index | None = None
+    ) -> TrainTestSplits:
+        strata = self.strata(inputs=inputs, targets=targets)
+        counts = np.bincount(strata)
+        sizes = self._allocate(counts)
+        # rank the rows of each stratum by their seeded hash, and keep the first ones
+        key = f"{self.random_state:016d}"[-16:]
+        hashes = pd.util.hash_pandas_object(inputs, index=False, hash_key=key).to_numpy()
+        order = np.lexsort((hashes, strata))
+        starts = np.cumsum(counts) - counts
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order)) - np.repeat(starts, counts)
+        test = ranks < sizes[strata]
+        yield np.flatnonzero(~test), np.flatnonzero(test)
+
+    def get_n_splits(
+        self, inputs: schemas.Inputs, targets: schemas.Targets, groups: Index | None = None
+    ) -> int:
+        return 1
+
+    def strata(self, inputs: schemas.Inputs, targets: schemas.Targets) -> Index:
+        """Compute the stratum of each row.
+
+        Args:
+            inputs (schemas.Inputs): model inputs.
+            targets (schemas.Targets): model targets.
+
+        Returns:
+            Index: stratum label of each row (from 0 to the number of strata).
+        """
+        lengths = inputs[schemas.InputsSchema.input].str.len().to_numpy(dtype=np.float64)
+        quantiles = np.linspace(0, 1, self.n_buckets + 1)[1:-1]
+        edges = np.quantile(lengths, quantiles) if len(lengths) else quantiles
+        labels = np.searchsorted(edges, lengths, side="right").astype(np.int64)
+        if self.column is not None:
+            frame = inputs if self.column in inputs else targets
+            values = frame[self.column].astype(str).to_numpy(dtype=object)
+            categories = pd.util.hash_array(values) % np.uint64(self.n_categories)
+            labels = labels * self.n_categories + categories.astype(np.int64)
+        _, inverse = np.unique(labels, return_inverse=True)  # drop the empty strata
+        strata: Index = inverse.astype(np.int64)
+        return strata
+
+    def estimate(
+        self,
+        inputs: schemas.Inputs,
+        targets: schemas.Targets,
+        test_index: Index,
+        scores: npt.NDArray[np.float64],
+    ) -> tuple[float, float]:
+        """Estimate the full set mean score from the scores of the test subsample.
+
+        Args:
+            inputs (schemas.Inputs): model inputs (full set).
+            targets (schemas.Targets): model targets (full set).
+            test_index (Index): rows of the test subsample.
+            scores (npt.NDArray[np.float64]): score of each test row.
+
+        Returns:
+            tuple[float, float]: stratified mean and its variance estimate.
+        """
+        strata = self.strata(inputs=inputs, targets=targets)
+        population = np.bincount(strata).astype(np.float64)
+        sample = strata[test_index]
+        n = np.bincount(sample, minlength=len(population)).astype(np.float64)
+        sums = np.bincount(sample, weights=scores, minlength=len(population))
+        squares = np.bincount(sample, weights=scores**2, minlength=len(population))
+        sampled = n > 0
+        weights = population[sampled] / population[sampled].sum()  # renormalized on sampled
+        n, sums, squares = n[sampled], sums[sampled], squares[sampled]
+        means = sums / n
+        variances = np.where(n > 1, (squares - n * means**2) / np.maximum(n - 1, 1), 0.0)
+        correction = 1.0 - n / population[sampled]  # finite population correction
+        mean = float(weights @ means)
+        variance = float((weights**2 * correction * variances / n).sum())
+        return mean, variance
+
+    def _allocate(self, counts: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        """Allocate the test rows to the strata proportionally (largest remainders)."""
+        total = int(counts.sum())
+        size = self.test_size if isinstance(self.test_size, int) else self.test_size * total
+        size = min(total, max(1, int(round(size)))) if total else 0
+        quotas = counts * size / max(total, 1)
+        sizes: npt.NDArray[np.int64] = np.floor(quotas).astype(np.int64)
+        remainders = np.argsort(-(quotas - sizes), kind="stable")
+        sizes[remainders[: size - sizes.sum()]] += 1
+        return sizes
+
+
+SplitterKind = TrainTestSplitter | TimeSeriesSplitter | StratifiedSubsampleSplitter
+
+
+# %% HELPERS
+
+
+def take(data: Frame, index: Index) -> Frame:
+    """Select the rows of a dataframe split from their integer positions.
+
+    Contiguous positions (e.g., unshuffled train/test or time series splits)
+    are selected with a slice, which returns a view of the data instead of a copy.
+
+    Args:
+        data (Frame): dataframe to select from.
+        index (Index): integer positions of the rows.
+
+    Returns:
+        Frame: selected rows of the dataframe.
+    """
+    if len(index) and index[-1] - index[0] == len(index) - 1 and (np.diff(index) == 1).all():
+        return T.cast(Frame, data.iloc[index[0] : index[-1] + 1])
+    return T.cast(Frame, data.iloc[index])
@@ -0,0 +1,238 @@
+"""Persist the trials of a model search (e.g., to resume a tuning job)."""
+
+# %% IMPORTS
+
+import abc
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import typing as T
+
+import mlflow
+import pandas as pd
+import pydantic as pdt
+
+# %% TYPES
+
+# Trial key: params digest, fold digest, metric name
+TrialKey = tuple[str, str, str]
+
+# %% TRIALS
+
+
+class Trial(pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
+    """Evaluation of a model candidate on a cross-validation fold.
+
+    Parameters:
+        params_key (str): digest of the model request params.
+        fold_key (str): digest of the fold test rows.
+        metric (str): name of the metric.
+        params (dict[str, T.Any]): searched params of the candidate.
+        score (float): metric score of the candidate on the fold.
+        latency (float): seconds spent predicting the fold.
+        tokens (int): tokens used by the predictions of the fold.
+        row_latencies (list[float]): latency of each prediction of the fold.
+        row_tokens (list[int]): tokens of each prediction of the fold.
+    """
+
+    params_key: str
+    fold_key: str
+    metric: str
+    params: dict[str, T.Any]
+    score: float
+    latency: float = 0.0
+    tokens: int = 0
+    row_latencies: list[float] = []
+    row_tokens: list[int] = []
+
+    @property
+    def key(self) -> TrialKey:
+        """Key of the trial in a store."""
+        return self.params_key, self.fold_key, self.metric
+
+
+# %% STORES
+
+
+class TrialStore(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
+    """Base class for a trial store.
+
+    Use a trial store to record the trials as they complete,
+    and to skip the finished trials when a search is run again.
+    """
+
+    KIND: str
+
+    @abc.abstractmethod
+    def get(self, key: TrialKey) -> Trial | None:
+        """Get a finished trial.
+
+        Args:
+            key (TrialKey): key of the trial.
+
+        Returns:
+            Trial | None: the trial if it is finished, else None.
+        """
+
+    @abc.abstractmethod
+    def put(self, trial: Trial) -> None:
+        """Record a finished trial.
+
+        Args:
+            trial (Trial): trial to record.
+        """
+
+    @abc.abstractmethod
+    def read(self) -> pd.DataFrame:
+        """Read all the trials of the store.
+
+        Returns:
+            pd.DataFrame: one row per trial, with an exported column.
+        """
+
+    @abc.abstractmethod
+    def mark_exported(self, keys: list[TrialKey]) -> None:
+        """Mark trials as exported to MLflow.
+
+        Args:
+            keys (list[TrialKey]): keys of the exported trials.
+        """
+
+    def stream(self) -> int:
+        """Log the trials not exported yet as nested runs of the active MLflow run.
+
+        Returns:
+            int: number of trials exported.
+        """
+        trials = self.read()
+        trials = trials[~trials["exported"]]
+        for trial in trials.itertuples(index=False):
+            run_name = f"trial-{trial.params_key[:8]}-{trial.fold_key[:8]}"
+            with mlflow.start_run(run_name=run_name, nested=True):
+                mlflow.log_params({**trial.params, "fold": trial.fold_key})
+                mlflow.log_metrics(
+                    {trial.metric: trial.score, "latency": trial.latency, "tokens": trial.tokens}
+                )
+            self.mark_exported([(trial.params_key, trial.fold_key, trial.metric)])
+        return len(trials)
+
+
+class SQLiteTrialStore(TrialStore):
+    """Store the trials in a local SQLite database.
+
+    Each trial is committed as soon as it completes. The connection is opened once per
+    process (e.g., for the parallel jobs of a search), and shared by its threads.
+
+    Parameters:
+        path (str): path of the database file.
+        timeout (float): seconds to wait for a lock held by another writer.
+    """
+
+    KIND: T.Literal["SQLiteTrialStore"] = "SQLiteTrialStore"
+
+    path: str
+    timeout: float = 30.0
+
+    _connection: sqlite3.Connection | None = pdt.PrivateAttr(default=None)
+    _pid: int | None = pdt.PrivateAttr(default=None)
+    _lock: threading.Lock = pdt.PrivateAttr(default_factory=threading.Lock)
+
+    def __getstate__(self) -> dict[T.Any, T.Any]:
+        state = super().__getstate__()
+        state["__pydantic_private__"] = None  # the connection is opened again after unpickling
+        return state
+
+    def __setstate__(self, state: dict[T.Any, T.Any]) -> None:
+        super().__setstate__(state)
+        self.__pydantic_private__ = {"_connection": None, "_pid": None, "_lock": threading.Lock()}
+
+    @contextlib.contextmanager
+    def _connect(self) -> T.Iterator[sqlite3.Connection]:
+        """Get the connection to the trials table, then commit its changes."""
+        with self._lock:
+            if self._connection is None or self._pid != os.getpid():
+                self._connection = self._open()
+                self._pid = os.getpid()
+            with self._connection:  # commit or rollback
+                yield self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a connection to the database, and create the trials table."""
+        connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS trials ("
+                "params_key TEXT, fold_key TEXT, metric TEXT, params TEXT, score REAL, "
+                "latency REAL, tokens INTEGER, row_latencies TEXT, row_tokens TEXT, "
+                "exported INTEGER DEFAULT 0, "
+                "created TEXT DEFAULT CURRENT_TIMESTAMP, "
+                "PRIMARY KEY (params_key, fold_key, metric))"
+            )
+        return connection
+
+    def close(self) -> None:
+        """Close the connection to the database (it is opened again on the next access)."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get(self, key: TrialKey) -> Trial | None:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT params, score, latency, tokens, row_latencies, row_tokens FROM trials "
+                "WHERE params_key = ? AND fold_key = ? AND metric = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        params, score, latency, tokens, row_latencies, row_tokens = row
+        params_key, fold_key, metric = key
+        return Trial(
+            params_key=params_key,
+            fold_key=fold_key,
+            metric=metric,
+            params=json.loads(params),
+            score=float("nan") if score is None else score,  # NaN is stored as NULL
+            latency=latency,
+            tokens=tokens,
+            row_latencies=json.loads(row_latencies),
+            row_tokens=json.loads(row_tokens),
+        )
+
+    def put(self, trial: Trial) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO trials "
+                "(params_key, fold_key, metric, params, score, latency, tokens, row_latencies, row_tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    *trial.key,
+                    json.dumps(trial.params, sort_keys=True, default=str),
+                    trial.score,
+                    trial.latency,
+                    trial.tokens,
+                    json.dumps(trial.row_latencies),
+                    json.dumps(trial.row_tokens),
+                ),
+            )
+
+    def read(self) -> pd.DataFrame:
+        with self._connect() as connection:
+            trials = pd.read_sql_query("SELECT * FROM trials ORDER BY created", connection)
+        trials["params"] = trials["params"].map(json.loads)
+        trials["exported"] = trials["exported"].astype(bool)
+        return trials
+
+    def mark_exported(self, keys: list[TrialKey]) -> None:
+        with self._connect() as connection:
+            connection.executemany(
+                "UPDATE trials SET exported = 1 "
+                "WHERE params_key = ? AND fold_key = ? AND metric = ?",
+                keys,
+            )
+
+
+TrialStoreKind = SQLiteTrialStore
@@ -7,6 +7,7 @@ from .entities import (
     ParamKey,
     Params,
     ParamValue,
+    PredictionCache,
 )
 
 __all__ = [
@@ -16,4 +17,5 @@ __all__ = [
     "ParamKey",
     "ParamValue",
     "Params",
+    "PredictionCache",
 ]
@@ -4,8 +4,11 @@
 
 import abc
 import asyncio
+import contextlib
+import hashlib
 import json
 import os
+import time
 import typing as T
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
@@ -66,6 +69,16 @@ class Model(
             setattr(self, key, value)
         return self
 
+    def request_params(self) -> Params:
+        """Get the model params that change the prediction requests.
+
+        Override to exclude the params that have no effect on the outputs.
+
+        Returns:
+            Params: params used to identify the model predictions.
+        """
+        return self.get_params()
+
     @abc.abstractmethod
     def load_context(self, model_config: Dict[str, Any]) -> None:
         """
@@ -95,6 +108,17 @@ class Model(
             schemas.Outputs: model prediction outputs.
         """
 
+    async def apredict(self, inputs: schemas.Inputs) -> schemas.Outputs:
+        """Generate outputs with the model for the given inputs, without blocking the event loop.
+
+        Args:
+            inputs (schemas.Inputs): model prediction inputs.
+
+        Returns:
+            schemas.Outputs: model prediction outputs.
+        """
+        return await asyncio.to_thread(self.predict, inputs=inputs)
+
     def explain_model(self) -> schemas.FeatureImportances:
         """Explain the internal model structure.
 
@@ -255,7 +279,9 @@ class BaselineAutogenModel(Model):
             message = ChatMessage(text=content, role="user")
 
             # Use get_response instead of create
+            start = time.perf_counter()
             response: ChatResponse = await self._model_client.get_response(messages=[message])
+            response.additional_properties["latency"] = time.perf_counter() - start
 
         except Exception as e:
             # Create a dummy response for error
@@ -271,22 +297,33 @@ class BaselineAutogenModel(Model):
 
         return response
 
+    async def _rungroupchats(self, inputs: schemas.Inputs) -> list[ChatResponse]:
+        """Executes the group chat requests of all the inputs concurrently."""
+        tasks = []
+        for row in inputs.itertuples(index=False):
+            tasks.append(self._rungroupchat(str(row.input)))
+        return await asyncio.gather(*tasks)
+
     def predict(self, inputs: schemas.Inputs) -> schemas.Outputs:
         """
         Predicts the output using the assistant team based on the given inputs.
         Processes each input element concurrently and appends results to the output DataFrame.
         """
-        # Initialize a list to collect messages or results
-        results = []
+        # Run all requests concurrently
+        responses = asyncio.run(self._rungroupchats(inputs))
+        return self._outputs(responses)
 
-        async def _run_all_predictions(inputs: schemas.Inputs) -> list[ChatResponse]:
-            tasks = []
-            for row in inputs.itertuples(index=False):
-                tasks.append(self._rungroupchat(str(row.input)))
-            return await asyncio.gather(*tasks)
+    async def apredict(self, inputs: schemas.Inputs) -> schemas.Outputs:
+        """
+        Predicts the output in the running event loop (e.g., to share the model client).
+        """
+        responses = await self._rungroupchats(inputs)
+        return self._outputs(responses)
 
-        # Run all requests concurrently
-        responses = asyncio.run(_run_all_predictions(inputs))
+    def _outputs(self, responses: list[ChatResponse]) -> schemas.Outputs:
+        """Collect the responses with messages into the outputs schema."""
+        # Initialize a list to collect messages or results
+        results = []
 
         for response in responses:
             if response and response.messages:  # Check if response has messages
@@ -304,6 +341,8 @@ class BaselineAutogenModel(Model):
                             "model_version": "v1.0.0",
                             "terminated": response.finish_reason is not None,
                             "messages": [msg.text for msg in response.messages],
+                            "tokens": (response.usage_details or {}).get("total_token_count") or 0,
+                            "latency": (response.additional_properties or {}).get("latency"),
                         },
                     }
                 )
@@ -410,3 +449,160 @@ class BaselineAutogenModel(Model):
 
 
 ModelKind = BaselineAutogenModel
+
+# %% CACHES
+
+
+class PredictionCache(pdt.BaseModel, strict=True, frozen=False, extra="forbid"):
+    """Memoize model predictions by request params and input rows.
+
+    Share a cache between candidates and metrics to never predict the same row twice.
+    The cache lives in memory: parallel workers (e.g., n_jobs > 1) get their own copy,
+    and their counters are not reported to the parent process.
+
+    Parameters:
+        enabled (bool): memoize predictions if True, else delegate to the model.
+    """
+
+    enabled: bool = True
+
+    _outputs: dict[tuple[str, int], dict[str, Any]] = PrivateAttr(default_factory=dict)
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _tokens: int = PrivateAttr(default=0)
+    _pending: dict[tuple[str, int], asyncio.Future[None]] = PrivateAttr(default_factory=dict)
+
+    @property
+    def hits(self) -> int:
+        """Number of rows served from the cache."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Number of rows predicted by the models."""
+        return self._misses
+
+    @property
+    def tokens(self) -> int:
+        """Number of tokens spent by the models (i.e., on the rows predicted, not the hits)."""
+        return self._tokens
+
+    def keys(self, model: Model, inputs: schemas.Inputs) -> list[tuple[str, int]]:
+        """Compute the cache keys of the model predictions for the given inputs.
+
+        Args:
+            model (Model): model generating the predictions.
+            inputs (schemas.Inputs): model prediction inputs.
+
+        Returns:
+            list[tuple[str, int]]: request params digest and hash of each input row.
+        """
+        params = json.dumps(model.request_params(), sort_keys=True, default=str)
+        digest = hashlib.sha256(params.encode("utf-8")).hexdigest()
+        hashes = pd.util.hash_pandas_object(inputs, index=False).tolist()
+        return [(digest, hash_) for hash_ in hashes]
+
+    def predict(self, model: Model, inputs: schemas.Inputs) -> schemas.Outputs:
+        """Generate outputs with the model, skipping the rows already predicted.
+
+        Args:
+            model (Model): model generating the predictions.
+            inputs (schemas.Inputs): model prediction inputs.
+
+        Returns:
+            schemas.Outputs: model prediction outputs.
+        """
+        if not self.enabled:
+            outputs = model.predict(inputs=inputs)
+            self._count(outputs, rows=len(inputs))
+            return outputs
+        keys = self.keys(model=model, inputs=inputs)
+        missing: dict[tuple[str, int], int] = {}  # key -> first position
+        for position, key in enumerate(keys):
+            if key not in self._outputs and key not in missing:
+                missing[key] = position
+        if missing:
+            outputs = model.predict(inputs=inputs.iloc[list(missing.values())])
+            self._count(outputs, rows=len(missing))
+            if len(outputs) != len(missing):  # rows cannot be matched to their inputs
+                if len(missing) < len(keys):
+                    outputs = model.predict(inputs=inputs)
+                    self._count(outputs, rows=len(keys))
+                return outputs
+            self._outputs.update(zip(missing, outputs.to_dict(orient="records")))
+        self._hits += len(keys) - len(missing)
+        return self._collect(keys)
+
+    async def apredict(
+        self, model: Model, inputs: schemas.Inputs, semaphore: asyncio.Semaphore | None = None
+    ) -> schemas.Outputs:
+        """Generate outputs in the event loop, skipping the rows already predicted.
+
+        Rows being predicted by another task are awaited instead of predicted twice.
+
+        Args:
+            model (Model): model generating the predictions.
+            inputs (schemas.Inputs): model prediction inputs.
+            semaphore (asyncio.Semaphore, optional): bound of the concurrent model calls.
+
+        Returns:
+            schemas.Outputs: model prediction outputs.
+        """
+        limit = semaphore or contextlib.nullcontext()
+        if not self.enabled:
+            async with limit:
+                outputs = await model.apredict(inputs=inputs)
+            self._count(outputs, rows=len(inputs))
+            return outputs
+        keys = self.keys(model=model, inputs=inputs)
+        missing: dict[tuple[str, int], int] = {}  # key -> first position
+        pending: set[asyncio.Future[None]] = set()  # predictions of other tasks
+        for position, key in enumerate(keys):
+            if key in self._outputs or key in missing:
+                continue
+            if key in self._pending:
+                pending.add(self._pending[key])
+            else:
+                missing[key] = position
+        if missing:
+            done = asyncio.get_running_loop().create_future()
+            self._pending.update(dict.fromkeys(missing, done))
+            try:
+                async with limit:
+                    outputs = await model.apredict(inputs=inputs.iloc[list(missing.values())])
+                self._count(outputs, rows=len(missing))
+                if len(outputs) == len(missing):
+                    self._outputs.update(zip(missing, outputs.to_dict(orient="records")))
+            finally:
+                for key in missing:
+                    del self._pending[key]
+                done.set_result(None)
+        if pending:
+            await asyncio.wait(pending)
+        if any(key not in self._outputs for key in keys):  # rows cannot be matched to their inputs
+            if not pending and len(missing) == len(keys):
+                return outputs
+            async with limit:
+                outputs = await model.apredict(inputs=inputs)
+            self._count(outputs, rows=len(keys))
+            return outputs
+        self._hits += len(keys) - len(missing)
+        return self._collect(keys)
+
+    def _count(self, outputs: schemas.Outputs, rows: int) -> None:
+        """Count the rows predicted by a model call and the tokens of their outputs."""
+        self._misses += rows
+        metadata = outputs.get("metadata", [])
+        self._tokens += sum(
+            int(meta.get("tokens") or 0) for meta in metadata if isinstance(meta, dict)
+        )
+
+    def _collect(self, keys: list[tuple[str, int]]) -> schemas.Outputs:
+        """Assemble the cached outputs of the given keys."""
+        outputs = pd.DataFrame([self._outputs[key] for key in keys])
+        return T.cast(schemas.Outputs, outputs)  # rows were validated by the model
+
+    def clear(self) -> None:
+        """Remove all the cached predictions and reset the counters."""
+        self._outputs.clear()
+        self._hits = self._misses = self._tokens = 0
@@ -4,6 +4,7 @@
 # %% IMPORTS
 
 import abc
+import asyncio
 import json
 import os
 import typing as T
@@ -12,6 +13,7 @@ from typing import Any, Dict
 import mlflow
 import mlflow.entities
 import mlflow.entities.model_registry
+import mlflow.exceptions
 import mlflow.models.model
 import pandas as pd
 import pydantic as pdt
@@ -233,6 +235,17 @@ class Loader(abc.ABC, pdt.BaseModel, strict=True, frozen=True, extra="forbid"):
                 schemas.Outputs: validated outputs of the project model.
             """
 
+        async def apredict(self, inputs: schemas.Inputs) -> schemas.Outputs:
+            """Generate predictions without blocking the event loop.
+
+            Args:
+                inputs (schemas.Inputs): validated inputs for the project model.
+
+            Returns:
+                schemas.Outputs: validated outputs of the project model.
+            """
+            return await asyncio.to_thread(self.predict, inputs=inputs)
+
     @abc.abstractmethod
     def load(self, uri: str) -> "Loader.Adapter":
         """Load a model from the model registry.
@@ -273,8 +286,22 @@ class CustomLoader(Loader):
         def predict(self, inputs: schemas.Inputs) -> schemas.Outputs:
             # model validation is already done in predict
             prediction = self.model.predict(data=inputs)
-
-            # Return the outputs schema
+            return self._outputs(prediction)
+
+        async def apredict(self, inputs: schemas.Inputs) -> schemas.Outputs:
+            # await the project model in the running event loop (e.g., to share its client)
+            try:
+                python_model = self.model.unwrap_python_model()
+            except mlflow.exceptions.MlflowException:  # not a python model flavor
+                python_model = None
+            if not isinstance(python_model, CustomSaver.Adapter):
+                return await super().apredict(inputs=inputs)
+            prediction = await python_model.model.apredict(inputs=inputs)
+            return self._outputs(prediction)
+
+        @staticmethod
+        def _outputs(prediction: Any) -> schemas.Outputs:
+            """Wrap a prediction of the pyfunc model into the outputs schema."""
             outputs = schemas.Outputs(
                 pd.DataFrame(
                     {
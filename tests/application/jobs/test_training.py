@@ -166,3 +166,42 @@ def test_training_job(
     ), "MLFlow model version run id should be the same!"
     # - alerting service
     assert "Training Job Finished" in capsys.readouterr().out, "Alerting service should be called!"
+
+
+def test_training_job_stratified_estimate(
+    mlflow_service: services.MlflowService,
+    alerts_service: services.AlertsService,
+    logger_service: services.LoggerService,
+    inputs_reader: datasets.ParquetReader,
+    targets_reader: datasets.ParquetReader,
+    model: models.BaselineAutogenModel,
+    metric: metrics.AutogenMetric,
+    saver: registries.CustomSaver,
+    signer: signers.InferSigner,
+    register: registries.MlflowRegister,
+) -> None:
+    # given
+    run_config = mlflow_service.RunConfig(name="TrainingStratifiedTest")
+    splitter = splitters.StratifiedSubsampleSplitter(test_size=0.5, n_buckets=2)
+    client = mlflow_service.client()
+    # when
+    job = jobs.TrainingJob(
+        logger_service=logger_service,
+        alerts_service=alerts_service,
+        mlflow_service=mlflow_service,
+        run_config=run_config,
+        inputs=inputs_reader,
+        targets=targets_reader,
+        model=model,
+        metrics=[metric],
+        splitter=splitter,
+        saver=saver,
+        signer=signer,
+        registry=register,
+    )
+    with job as runner:
+        out = runner.run()
+    # then
+    logged = client.get_run(out["run"].info.run_id).data.metrics
+    assert out["estimate"] == (logged[f"{metric.name}/estimate"], logged[f"{metric.name}/variance"])
+    assert logged[f"{metric.name}/variance"] >= 0.0, "Variance should be positive!"
@@ -3,13 +3,18 @@
 from typing import Any, Dict, Iterator, List, Literal, Optional
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pandas as pd
+import pydantic as pdt
 import pytest
 
 # Assuming the metrics are in a module named 'metrics.py'
 from autogen_team.evaluation.metrics import (
     AutogenConversationMetric,
     AutogenMetric,
+    BleuMetric,
+    ChrFMetric,
+    RougeLMetric,
     Threshold,
 )
 
@@ -123,6 +128,30 @@ class TestAutogenTextMetric:
 
         # Calculate and verify score
         assert pytest.approx(metric.score(targets, outputs), rel=0.01) == expected
+        assert metric.scores(targets, outputs).mean() == pytest.approx(expected, rel=0.01)
+
+    def test_interval(self) -> None:
+        targets = pd.DataFrame({"response": ["a", "b", "c", "d"] * 25})
+        outputs = pd.DataFrame({"response": ["a", "b", "c", "x"] * 25})
+        metric = AutogenMetric(
+            name="test_metric",
+            metric_type="exact_match",
+            greater_is_better=True,
+            bootstrap_samples=500,
+        )
+        lower, upper = metric.interval(targets, outputs)
+        assert lower < metric.score(targets, outputs) < upper
+        assert (lower, upper) == metric.interval(targets, outputs)  # seeded
+
+    def test_interval_empty(self) -> None:
+        empty = pd.DataFrame({"response": pd.Series([], dtype=str)})
+        metric = AutogenMetric(
+            name="test_metric",
+            metric_type="exact_match",
+            greater_is_better=True,
+            bootstrap_samples=500,
+        )
+        assert np.isnan(metric.interval(empty, empty)).all()
 
 
 # Test AutogenConversationMetric
@@ -180,6 +209,97 @@ class TestAutogenConversationMetric:
 
         assert metric.score(targets, outputs) == expected
 
+    def test_bootstrap(self) -> None:
+        with pytest.raises(pdt.ValidationError, match="has no confidence interval"):
+            AutogenConversationMetric(
+                name="conv_metric", greater_is_better=True, bootstrap_samples=100
+            )
+
+
+# Test BleuMetric
+class TestBleuMetric:
+    def test_score(self) -> None:
+        targets = pd.DataFrame({"response": ["the cat is on the mat", "hello world"]})
+        outputs = pd.DataFrame({"response": ["the cat is on the mat", "hello there world"]})
+        metric = BleuMetric(name="bleu", greater_is_better=True, max_order=2)
+        # p1 = 8/9, p2 = 5/7, brevity penalty = 1 (9 >= 8 tokens)
+        expected = ((8 / 9) * (5 / 7)) ** 0.5
+        assert metric.score(targets, outputs) == pytest.approx(expected)
+
+    def test_score_identical(self) -> None:
+        texts = pd.DataFrame({"response": ["a b c d e", "f g h i j k"]})
+        metric = BleuMetric(name="bleu", greater_is_better=True)
+        assert metric.score(texts, texts) == pytest.approx(1.0)
+
+    def test_score_brevity_penalty(self) -> None:
+        targets = pd.DataFrame({"response": ["a b c d"]})
+        outputs = pd.DataFrame({"response": ["a b"]})
+        metric = BleuMetric(name="bleu", greater_is_better=True, max_order=1)
+        assert metric.score(targets, outputs) == pytest.approx(np.exp(1 - 4 / 2))
+
+    def test_score_smooth(self) -> None:
+        targets = pd.DataFrame({"response": ["a b c d"]})
+        outputs = pd.DataFrame({"response": ["d c b a"]})
+        assert BleuMetric(name="bleu", greater_is_better=True).score(targets, outputs) == 0.0
+        smoothed = BleuMetric(name="bleu", greater_is_better=True, smooth=True)
+        assert 0.0 < smoothed.score(targets, outputs) < 1.0
+
+    def test_interval(self) -> None:
+        targets = pd.DataFrame({"response": ["a b c d", "e f g h", "i j k l"] * 10})
+        outputs = pd.DataFrame({"response": ["a b c d", "e f x h", "i j k z"] * 10})
+        metric = BleuMetric(name="bleu", greater_is_better=True, max_order=2, bootstrap_samples=200)
+        lower, upper = metric.interval(targets, outputs)
+        assert 0.0 <= lower <= metric.score(targets, outputs) <= upper <= 1.0
+
+    def test_interval_empty(self) -> None:
+        empty = pd.DataFrame({"response": pd.Series([], dtype=str)})
+        metric = BleuMetric(name="bleu", greater_is_better=True, bootstrap_samples=200)
+        assert np.isnan(metric.interval(empty, empty)).all()
+
+
+# Test RougeLMetric
+class TestRougeLMetric:
+    def test_scores(self) -> None:
+        targets = pd.DataFrame({"response": ["the cat sat on the mat", "a b", "", "x y"]})
+        outputs = pd.DataFrame({"response": ["The cat on a mat", "a b", "a", ""]})
+        metric = RougeLMetric(name="rouge_l", greater_is_better=True, batch_size=2)
+        scores = metric.scores(targets, outputs)
+        # LCS("the cat sat on the mat", "the cat on a mat") = "the cat on mat" (4 tokens)
+        precision, recall = 4 / 5, 4 / 6
+        expected = 2 * precision * recall / (precision + recall)
+        assert scores == pytest.approx([expected, 1.0, 0.0, 0.0])
+        assert metric.score(targets, outputs) == pytest.approx(scores.mean())
+
+
+# Test ChrFMetric
+class TestChrFMetric:
+    def test_scores(self) -> None:
+        targets = pd.DataFrame({"response": ["hello world", "abc", "abc"]})
+        outputs = pd.DataFrame({"response": ["hello  world", "xyz", "ab"]})
+        metric = ChrFMetric(name="chrf", greater_is_better=True, max_order=2)
+        scores = metric.scores(targets, outputs)
+        # row 3: precision = (2/2 + 1/1) / 2 = 1, recall = (2/3 + 1/2) / 2 = 7/12
+        recall = 7 / 12
+        expected = 5 * recall / (4 + recall)
+        assert scores == pytest.approx([1.0, 0.0, expected])
+
+    def test_to_mlflow(self) -> None:
+        metric = ChrFMetric(name="chrf", greater_is_better=True)
+        mlflow_metric = metric.to_mlflow()
+        predictions = pd.Series(["hello world"])
+        values = mlflow_metric.eval_fn(predictions, predictions)
+        assert values.aggregate_results == {"chrf": pytest.approx(1.0)}
+
+    def test_to_mlflow_interval(self) -> None:
+        metric = ChrFMetric(name="chrf", greater_is_better=False, bootstrap_samples=100)
+        mlflow_metric = metric.to_mlflow()
+        predictions = pd.Series(["hello world", "abc", "xyz"])
+        targets = pd.Series(["hello world", "abd", "xyz"])
+        values = mlflow_metric.eval_fn(predictions, targets)
+        results = values.aggregate_results
+        assert set(results) == {"chrf", "ci_lower", "ci_upper"}
+        assert results["ci_lower"] <= results["chrf"] <= results["ci_upper"] <= 0.0
+
 
 # Test Threshold
 class TestThreshold:
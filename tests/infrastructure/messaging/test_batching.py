@@ -0,0 +1,45 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from autogen_team.infrastructure.messaging.batching import DynamicBatcher
+from autogen_team.infrastructure.messaging.predictions import PredictionRequest, PredictionResponse
+
+
+def echo_batch(requests: list[PredictionRequest]) -> list[PredictionResponse]:
+    """Batch prediction callback echoing the inputs."""
+    return [
+        PredictionResponse(result={"inference": request.input_data["input"], "error": None})
+        for request in requests
+    ]
+
+
+def test_dynamic_batcher() -> None:
+    """Test DynamicBatcher groups concurrent requests into batches."""
+    callback = MagicMock(side_effect=echo_batch)
+    batcher = DynamicBatcher(batch_prediction_callback=callback, max_batch_size=4, max_wait=0.05)
+
+    async def run() -> list[PredictionResponse]:
+        requests = [PredictionRequest(input_data={"input": [str(i)]}) for i in range(6)]
+        responses = await asyncio.gather(*(batcher.submit(request) for request in requests))
+        await batcher.stop()
+        return list(responses)
+
+    responses = asyncio.run(run())
+
+    assert [response.result["inference"] for response in responses] == [[str(i)] for i in range(6)]
+    assert [len(args[0]) for args, _ in callback.call_args_list] == [4, 2]
+
+
+def test_dynamic_batcher_error() -> None:
+    """Test DynamicBatcher fails every request of a failed batch."""
+    batcher = DynamicBatcher(batch_prediction_callback=MagicMock(return_value=[]), max_wait=0.01)
+
+    async def run() -> None:
+        try:
+            await batcher.submit(PredictionRequest())
+        finally:
+            await batcher.stop()
+
+    with pytest.raises(ValueError, match="0 responses for 1 requests"):
+        asyncio.run(run())
@@ -0,0 +1,71 @@
+import pydantic as pdt
+import pytest
+
+from autogen_team.infrastructure.messaging import codecs
+
+
+class Request(pdt.BaseModel):
+    input_data: dict[str, list[str]]
+
+
+def test_json_codec() -> None:
+    """Test the JSON codec round trip and its errors."""
+    codec = codecs.JsonCodec()
+    message = {"input_data": {"input": ["a", "b"]}}
+
+    payload = codec.dumps(message)
+
+    assert codec.loads(payload) == message
+    assert codec.validate(payload, Request) == Request.model_validate(message)
+    with pytest.raises(codecs.DecodeError, match="Invalid JSON format"):
+        codec.loads(b'{"input_data": ')
+    with pytest.raises(codecs.DecodeError, match="Invalid JSON format") as error:
+        codec.validate(b'{"input_data": "secret", ', Request)
+    assert "secret" not in str(error.value), "Errors should not contain the payload!"
+    with pytest.raises(codecs.DecodeError, match="Invalid JSON message"):
+        codec.loads(b"[1, 2]")
+
+
+def test_arrow_codec() -> None:
+    """Test the Arrow codec decodes records into the message field."""
+    pa = pytest.importorskip("pyarrow")
+    codec = codecs.ArrowCodec()
+    table = pa.table({"input": ["a", "b"]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    message = codec.loads(sink.getvalue().to_pybytes())
+    result = codec.loads(codec.dumps({"inference": [0.5], "quality": 1.0, "error": None}))
+
+    assert message == {"input_data": {"input": ["a", "b"]}}
+    assert result == {"input_data": {"inference": [[0.5]], "quality": [1.0], "error": [None]}}
+    with pytest.raises(codecs.DecodeError, match="Invalid Arrow format"):
+        codec.loads(b"not arrow")
+
+
+def test_msgpack_codec() -> None:
+    """Test the MessagePack codec round trip."""
+    pytest.importorskip("msgpack")
+    codec = codecs.MsgpackCodec()
+    message = {"input_data": {"input": ["a", "b"]}}
+
+    assert codec.loads(codec.dumps(message)) == message
+    with pytest.raises(codecs.DecodeError):
+        codec.loads(b"\xc1")
+
+
+def test_get_codec() -> None:
+    """Test the codecs are selected by the content type header (JSON by default, or an error)."""
+    headers = [("deadline", b"1.0"), ("Content-Type", b"application/json; charset=utf-8")]
+
+    assert codecs.content_type(headers) == codecs.JSON_CONTENT_TYPE
+    assert codecs.content_type(None) is None
+    assert isinstance(codecs.get_codec(None), codecs.JsonCodec)
+    with pytest.raises(codecs.DecodeError, match="Unsupported content type: text/unknown"):
+        codecs.get_codec("text/unknown")
+    if not codecs.MSGPACK_AVAILABLE:
+        with pytest.raises(codecs.DecodeError, match="Unavailable content type"):
+            codecs.get_codec(codecs.MSGPACK_CONTENT_TYPE)
+    if codecs.ARROW_AVAILABLE:
+        assert isinstance(codecs.get_codec(codecs.ARROW_CONTENT_TYPE), codecs.ArrowCodec)
@@ -0,0 +1,18 @@
+import pydantic as pdt
+import pytest
+from autogen_team.infrastructure.messaging.config import KafkaServiceConfig
+
+
+def test_kafka_service_config() -> None:
+    """Test the tuning knobs default to the opt-in modes, and reject invalid values."""
+    config = KafkaServiceConfig(retry_topics=[("retry_0", 10.0)], input_topics={"bulk": 1})
+
+    assert config.batch_size == 1, "Batch mode should be opt-in!"
+    assert config.dead_letter_topic is None, "The dead letter topic should be opt-in!"
+    assert config.retry_topics == [("retry_0", 10.0)]
+    with pytest.raises(pdt.ValidationError):
+        KafkaServiceConfig(max_in_flight=0)
+    with pytest.raises(pdt.ValidationError):
+        KafkaServiceConfig(flush_intervals=1.0)  # type: ignore[call-arg]
+    with pytest.raises(pdt.ValidationError):
+        config.batch_size = 32
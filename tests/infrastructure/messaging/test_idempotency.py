@@ -0,0 +1,37 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from autogen_team.infrastructure.messaging.idempotency import IdempotencyCache
+
+
+def test_idempotency_cache_evicts_and_expires() -> None:
+    """Test the cache evicts the least recently used results, and expires them."""
+    cache = IdempotencyCache(max_size=2, ttl=10.0)
+    with patch("autogen_team.infrastructure.messaging.idempotency.time.time", return_value=0.0):
+        cache.put("a", {"inference": [1]})
+        cache.put("b", {"inference": [2]})
+        assert cache.get("a") == {"inference": [1]}
+        cache.put("c", {"inference": [3]})  # evicts b, the least recently used
+
+        assert cache.get("b") is None
+        assert len(cache) == 2
+    with patch("autogen_team.infrastructure.messaging.idempotency.time.time", return_value=10.0):
+        assert cache.get("a") is None, "Results should expire after the ttl!"
+        assert len(cache) == 1
+
+
+def test_idempotency_cache_persistence(tmp_path: Path) -> None:
+    """Test the cache saves its unexpired results to its path, and loads them."""
+    path = str(tmp_path / "cache.json")
+    cache = IdempotencyCache(ttl=10.0, path=path)
+    cache.put("a", {"inference": [1]})
+    cache.put("b", {"inference": [2]})
+    cache.entries["b"] = (0.0, {"inference": [2]})  # expired
+
+    cache.save()
+    loaded = IdempotencyCache(ttl=10.0, path=path)
+
+    assert loaded.get("a") == {"inference": [1]}
+    assert loaded.get("b") is None
+    (tmp_path / "cache.json").write_text("{invalid")
+    assert len(IdempotencyCache(path=path)) == 0, "Invalid files should be ignored!"
@@ -1,20 +1,34 @@
+import asyncio
 import json
+import math
 import os
 import signal
+import threading
+import time
 from typing import Any, Dict, Generator
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 # Assuming the code you provided is in a file named 'app.py'
+from autogen_team.infrastructure.messaging import codecs, kafka_app
+from autogen_team.infrastructure.messaging.consumers import BatchConsumer, ConcurrentConsumer
+from autogen_team.infrastructure.messaging.idempotency import IdempotencyCache
+from autogen_team.infrastructure.messaging.lanes import PriorityLanes
 from autogen_team.infrastructure.messaging.kafka_app import (
     DEFAULT_FASTAPI_HOST,
     DEFAULT_FASTAPI_PORT,
+    DynamicBatcher,
     FastAPIKafkaService,
+    PredictionRequest,
     PredictionResponse,
     app,
 )
-from confluent_kafka import KafkaError
+from autogen_team.infrastructure.messaging.metrics import ServiceMetrics
+from confluent_kafka import KafkaError, TopicPartition
+from fastapi.testclient import TestClient
+
+Thread = threading.Thread  # the fixtures patch threading.Thread
 
 
 @pytest.fixture()
@@ -234,6 +248,9 @@ def test_process_message(
     msg = MagicMock()
     msg.value.return_value = b'{"input_data": "test_input"}'
     msg.decode.return_value = '{"input_data": "test_input"}'
+    msg.topic.return_value = "test_input_topic"
+    msg.partition.return_value = 0
+    msg.offset.return_value = 7
 
     service.producer = MagicMock()
     service.consumer = MagicMock()
@@ -245,8 +262,82 @@ def test_process_message(
 
     service.prediction_callback.assert_called_once()
     service.producer.produce.assert_called_once()
+    service.producer.poll.assert_called_once_with(0)
+    service.producer.flush.assert_not_called()
+    service._commit_completed()
+    service.consumer.commit.assert_not_called()  # not delivered yet
+    _, kwargs = service.producer.produce.call_args
+    kwargs["callback"](None, MagicMock())  # delivery confirmation
+    service._commit_completed()
+    service.consumer.commit.assert_called_once()
+    _, kwargs = service.consumer.commit.call_args
+    assert kwargs["offsets"][0].offset == 8, "The next offset should be committed!"
+
+
+def test_process_message_delivery_failure(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test a result not delivered is produced again, then its offset is completed anyway."""
+    service, *_ = mock_kafka_service
+    msg = make_message(b'{"input_data": {"input": ["a"]}}', offset=3)
+    service.producer = MagicMock()
+    service.consumer = MagicMock()
+
+    service._process_message(msg)
+    for _ in range(service.router.delivery_attempts):
+        _, kwargs = service.producer.produce.call_args
+        service._commit_completed()
+        service.consumer.commit.assert_not_called()
+        kwargs["callback"](MagicMock(spec=KafkaError), MagicMock())
+    service._commit_completed()
+
+    assert service.producer.produce.call_count == service.router.delivery_attempts
+    _, kwargs = service.consumer.commit.call_args
+    assert [tp.offset for tp in kwargs["offsets"]] == [4], "The partition should not be held!"
+
+
+def test_process_message_delivery_failure_dead_letter(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the message of a result not delivered goes to the dead letter topic."""
+    service, *_ = mock_kafka_service
+    service.router.dead_letter_topic = "dlq"
+    service.router.delivery_attempts = 1
+    service.prediction_callback.return_value = PredictionResponse(result={"error": None})
+    msg = make_message(b'{"input_data": {"input": ["a"]}}', offset=3)
+    service.producer = MagicMock()
+    service.consumer = MagicMock()
+
+    service._process_message(msg)
+    _, kwargs = service.producer.produce.call_args
+    kwargs["callback"](MagicMock(spec=KafkaError), MagicMock())
+    service._commit_completed()
+    service.consumer.commit.assert_not_called()  # the dead letter is not delivered yet
+    args, kwargs = service.producer.produce.call_args
+    kwargs["callback"](None, MagicMock())
+    service._commit_completed()
+
+    assert args == ("dlq",)
+    assert dict(kwargs["headers"])["error"].startswith(b"Delivery failed")
+    service.consumer.commit.assert_called_once()
+
+
+def test_serve_deliveries(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test _serve_deliveries flushes the producer by interval or size."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.producer.__len__.return_value = 0
+    service.config = service.config.model_copy(update={"flush_interval": 3600.0})
+
+    service._serve_deliveries()
+    service.producer.poll.assert_called_once_with(0)
+    service.producer.flush.assert_not_called()
+
+    service.producer.__len__.return_value = service.config.flush_size
+    service._serve_deliveries()
     service.producer.flush.assert_called_once()
-    service.consumer.commit.assert_called_once_with(msg)
 
 
 @patch("json.loads")
@@ -312,17 +403,82 @@ def test_stop(
     mock_os_kill: MagicMock,
     mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
 ) -> None:
-    """Test the stop method."""
+    """Test the stop method drains the consumer thread before stopping the server."""
     service, *_ = mock_kafka_service
     service.consumer = MagicMock()
+    service.consumer_thread = thread = MagicMock()
+    thread.is_alive.return_value = False
     service.stop()
-    service.consumer.close.assert_called_once()
+    thread.join.assert_called_once_with(2 * service.config.drain_timeout)
+    service.consumer.close.assert_not_called()  # closed by the consumer thread
     mock_os_kill.assert_called_once_with(os.getpid(), signal.SIGINT)
     assert service.stop_event.is_set()
+    assert service.consumer_thread is None
     with patch("autogen_team.infrastructure.messaging.kafka_app.logger.info") as mock_logger_info:
         service.stop()
         assert service.stop_event.is_set()
-        assert mock_logger_info.call_count == 2
+        assert mock_logger_info.call_count == 1
+
+
+def test_drain_timeout(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the drain waits for the in-flight predictions up to the drain timeout."""
+    service, *_ = mock_kafka_service
+    service.flow.max_in_flight = 2
+    service.config = service.config.model_copy(update={"drain_timeout": 0.1})
+    polls = iter([make_message(b'{"input_data": {"input": ["a"]}}', offset=i) for i in range(3)])
+
+    def poll(timeout: float) -> Any:
+        msg = next(polls, None)
+        if msg is None:
+            service.stop_event.set()
+        return msg
+
+    release = threading.Event()
+
+    def predict(request: Any) -> PredictionResponse:
+        release.wait(5)
+        return PredictionResponse()
+
+    service.consumer = MagicMock()
+    service.consumer.poll.side_effect = poll
+    service.producer = MagicMock()
+    service.producer.flush.return_value = 0
+    service.prediction_callback = MagicMock(side_effect=predict)
+
+    with (
+        patch("threading.Thread", Thread),  # real workers
+        patch("autogen_team.infrastructure.messaging.consumers.logger.warning") as mock_warning,
+    ):
+        service._consume_messages()
+    release.set()
+
+    assert service.prediction_callback.call_count == 2, "The queued message should be dropped!"
+    mock_warning.assert_called_once()
+    service.consumer.commit.assert_not_called()
+    service.consumer.close.assert_called_once()
+
+
+def test_on_revoke(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the revoked partitions are drained and committed before their hand off."""
+    service, *_ = mock_kafka_service
+    service.consumer = MagicMock()
+    service.producer = MagicMock()
+    service.offset_tracker.track("topic", 0, 4)
+    service.offset_tracker.track("topic", 1, 8)
+    service.flow.deferred[("topic", 0)] = (time.time() + 10, 4)
+    service.producer.poll.side_effect = lambda _: service.offset_tracker.complete("topic", 0, 4)
+
+    service._on_revoke(service.consumer, [TopicPartition("topic", 0)])
+
+    _, kwargs = service.consumer.commit.call_args
+    assert [(tp.partition, tp.offset) for tp in kwargs["offsets"]] == [(0, 5)]
+    assert kwargs["asynchronous"] is False
+    assert service.flow.deferred == {}
+    assert service.offset_tracker.in_flight == 1, "Partition 1 is not revoked!"
 
 
 def test_main_function() -> None:
@@ -364,6 +520,9 @@ def test_main_function() -> None:
         MockCustomLoader.assert_called_once()
         mock_loader.load.assert_called_once_with(uri="models:/test_registry@Champion")
         MockFastAPIKafkaService.assert_called_once()
+        _, kwargs = MockFastAPIKafkaService.call_args
+        assert kwargs["config"].retry_topics == [], "Retry topics should be opt-in!"
+        assert kwargs["config"].dead_letter_topic is None, "The dead letter topic should be opt-in!"
         mock_fastapi_kafka_service = MockFastAPIKafkaService.return_value
         mock_fastapi_kafka_service.start.assert_called_once()
         mock_print.assert_called()
@@ -433,6 +592,44 @@ def test_main_prediction_callback_numpy() -> None:
         assert resp.result["inference"] == [0.5]
 
 
+def test_main_hot_reload() -> None:
+    """Test the callbacks of main predict with the model swapped by the watcher."""
+    with (
+        patch("autogen_team.infrastructure.messaging.kafka_app.services.MlflowService"),
+        patch("autogen_team.infrastructure.messaging.kafka_app.CustomLoader") as MockCustomLoader,
+        patch("autogen_team.infrastructure.messaging.kafka_app.FastAPIKafkaService") as MockService,
+        patch("autogen_team.infrastructure.messaging.kafka_app.ModelWatcher") as MockWatcher,
+        patch.object(kafka_app.InputsSchema, "check", side_effect=lambda x: x),
+    ):
+        watcher = MockWatcher.return_value
+        watcher.resolve.return_value = "1"
+        kafka_app.main()
+        _, kwargs = MockService.call_args
+        watcher.model = MagicMock()  # swapped by the watcher thread
+        watcher.model.predict.return_value.to_numpy.return_value.tolist.return_value = [0.9]
+
+        response = kwargs["prediction_callback"](PredictionRequest(input_data={"input": ["a"]}))
+
+    watcher.start.assert_called_once_with(
+        model=MockCustomLoader.return_value.load.return_value, version="1"
+    )
+    assert response.result["inference"] == [0.9]
+
+
+def test_main_prediction_callback_invalid_inputs() -> None:
+    """Test the prediction callback inside main rejects the invalid inputs."""
+    with (
+        patch("autogen_team.infrastructure.messaging.kafka_app.services.MlflowService"),
+        patch("autogen_team.infrastructure.messaging.kafka_app.CustomLoader"),
+        patch("autogen_team.infrastructure.messaging.kafka_app.FastAPIKafkaService") as MockService,
+    ):
+        kafka_app.main()
+        _, kwargs = MockService.call_args
+
+        with pytest.raises(kafka_app.InvalidRequestError, match="Invalid input schema"):
+            kwargs["prediction_callback"](PredictionRequest(input_data={"input": "a"}))
+
+
 def test_main_prediction_callback_error() -> None:
     """Test the prediction callback inside main when predict fails."""
     with (
@@ -454,3 +651,747 @@ def test_main_prediction_callback_error() -> None:
         req = PredictionRequest(input_data={"input": ["test"]})
         resp = callback(req)
         assert resp.result["error"] == "Prediction failed"
+
+
+def make_message(value: bytes, partition: int = 0, offset: int = 0) -> MagicMock:
+    """Create a valid Kafka message mock."""
+    msg = MagicMock()
+    msg.error.return_value = None
+    msg.value.return_value = value
+    msg.topic.return_value = "test_input_topic"
+    msg.partition.return_value = partition
+    msg.offset.return_value = offset
+    return msg
+
+
+def test_consume_batches(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test _consume_messages reads batches when a batch callback is set."""
+    service, *_ = mock_kafka_service
+    assert service.config.batch_size == 1, "Batch mode should be opt-in!"
+    service.batch_prediction_callback = MagicMock()
+    service.config = service.config.model_copy(update={"batch_size": 32})
+    service.consumer = MagicMock()
+    msgs = [make_message(b"{}", offset=i) for i in range(3)]
+    service.consumer.consume.return_value = msgs
+    service.stop_event.is_set = MagicMock(side_effect=[False, True])
+    service._close_consumer = MagicMock()
+
+    with patch.object(BatchConsumer, "process") as mock_process:
+        service._consume_messages()
+
+    service.consumer.consume.assert_called_once_with(
+        num_messages=service.config.batch_size, timeout=service.config.batch_timeout
+    )
+    mock_process.assert_called_once_with(msgs)
+    service._close_consumer.assert_called_once()
+
+
+def test_process_batch(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the batch consumer predicts once and produces one result per message."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.consumer = MagicMock()
+    service.batch_prediction_callback = MagicMock(
+        side_effect=lambda requests: [
+            PredictionResponse(result={"inference": request.input_data["input"], "error": None})
+            for request in requests
+        ]
+    )
+    msgs = [
+        make_message(b'{"input_data": {"input": ["a"]}}', partition=0, offset=4),
+        make_message(b"invalid json", partition=0, offset=5),
+        make_message(b'{"input_data": {"input": ["b", "c"]}}', partition=1, offset=9),
+    ]
+
+    BatchConsumer(service).process(msgs)
+
+    service.batch_prediction_callback.assert_called_once()
+    values = [
+        json.loads(kwargs["value"].decode("utf-8"))
+        for _, kwargs in service.producer.produce.call_args_list
+    ]
+    assert [value["inference"] for value in values] == [["a"], [0.0], ["b", "c"]]
+    assert values[1]["error"] == "Invalid JSON format"
+    assert "permanent" not in values[1], "The internal flag should not be produced!"
+    service.producer.flush.assert_not_called()
+    callbacks = [kwargs["callback"] for _, kwargs in service.producer.produce.call_args_list]
+    callbacks[1](None, MagicMock())  # delivered out of order
+    callbacks[2](None, MagicMock())
+    service._commit_completed()
+    _, kwargs = service.consumer.commit.call_args
+    assert [(tp.partition, tp.offset) for tp in kwargs["offsets"]] == [(1, 10)]
+    callbacks[0](None, MagicMock())
+    service._commit_completed()
+    _, kwargs = service.consumer.commit.call_args
+    offsets = {(tp.partition, tp.offset) for tp in kwargs["offsets"]}
+    assert offsets == {(0, 6)}, "The contiguous delivered offsets should be committed!"
+
+
+def test_process_batch_fallback(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the batch consumer predicts each request when the batch prediction fails."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.consumer = MagicMock()
+    service.batch_prediction_callback = MagicMock(side_effect=Exception("Batch failed"))
+    service.prediction_callback = MagicMock(
+        side_effect=[PredictionResponse(), Exception("Sensitive internal error")]
+    )
+    msgs = [make_message(b'{"input_data": {"input": ["a"]}}', offset=i) for i in range(2)]
+
+    BatchConsumer(service).process(msgs)
+
+    assert service.prediction_callback.call_count == 2
+    values = [
+        json.loads(kwargs["value"].decode("utf-8"))
+        for _, kwargs in service.producer.produce.call_args_list
+    ]
+    assert [value["error"] for value in values] == ["", "Internal processing error"]
+
+
+def test_main_batch_prediction_callback() -> None:
+    """Test the batch prediction callback inside main demultiplexes the rows."""
+    with (
+        patch("autogen_team.infrastructure.messaging.kafka_app.services.MlflowService"),
+        patch("autogen_team.infrastructure.messaging.kafka_app.CustomLoader") as MockCustomLoader,
+        patch("autogen_team.infrastructure.messaging.kafka_app.FastAPIKafkaService") as MockService,
+    ):
+        mock_model = MagicMock()
+        MockCustomLoader.return_value.load.return_value = mock_model
+        mock_model.predict.side_effect = lambda inputs: inputs
+
+        from autogen_team.infrastructure.messaging.kafka_app import (
+            InputsSchema,
+            PredictionRequest,
+            main,
+        )
+
+        with patch.object(InputsSchema, "check", side_effect=lambda x: x):
+            main()
+            callback = MockService.call_args.kwargs["batch_prediction_callback"]
+            requests = [
+                PredictionRequest(input_data={"input": ["a"]}),
+                PredictionRequest(input_data={"input": ["b", "c"]}),
+            ]
+            responses = callback(requests)
+
+        mock_model.predict.assert_called_once()
+        assert [response.result["inference"] for response in responses] == [[["a"]], [["b"], ["c"]]]
+
+
+def test_consume_concurrently(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test _consume_messages predicts messages concurrently and commits in order."""
+    service, *_ = mock_kafka_service
+    service.flow.max_in_flight = 4
+    msgs = [make_message(b'{"input_data": {"input": ["a"]}}', offset=i) for i in range(4)]
+    polls = iter(msgs)
+
+    def poll(timeout: float) -> Any:
+        msg = next(polls, None)
+        if msg is None:
+            service.stop_event.set()
+        return msg
+
+    callbacks: list[Any] = []  # delivery callbacks, served by poll or flush
+
+    def serve(*_: Any) -> int:
+        while callbacks:
+            callbacks.pop(0)(None, MagicMock())
+        return 0
+
+    barrier = threading.Barrier(4, timeout=5)  # all the messages are in flight together
+
+    def predict(request: Any) -> PredictionResponse:
+        barrier.wait()
+        return PredictionResponse()
+
+    service.consumer = MagicMock()
+    service.consumer.poll.side_effect = poll
+    service.producer = MagicMock()
+    service.producer.__len__.return_value = 0
+    service.producer.produce.side_effect = lambda *_, callback, **__: callbacks.append(callback)
+    service.producer.poll.side_effect = serve
+    service.producer.flush.side_effect = serve
+    service.prediction_callback = MagicMock(side_effect=predict)
+
+    with patch("threading.Thread", Thread):  # real workers
+        service._consume_messages()
+
+    assert service.prediction_callback.call_count == 4
+    assert service.producer.produce.call_count == 4
+    service.producer.poll.assert_called_with(0)  # from the consumer thread only
+    _, kwargs = service.consumer.commit.call_args
+    assert [(tp.partition, tp.offset) for tp in kwargs["offsets"]] == [(0, 4)]
+    assert service.offset_tracker.in_flight == 0
+    service.consumer.close.assert_called_once()
+
+
+def test_apply_backpressure(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the flow control pauses and resumes partitions on the watermarks."""
+    service, *_ = mock_kafka_service
+    service.consumer = MagicMock()
+    service.consumer.assignment.return_value = [TopicPartition("topic", i) for i in range(3)]
+    flow = service.flow
+    flow.deferred[("topic", 1)] = (time.time() + 10, 4)  # e.g., a retry not due yet
+    flow.max_in_flight, flow.max_queued = 2, 4  # high: 6, low: 4
+
+    flow.outstanding = 5
+    assert flow.apply_backpressure(service.consumer) is False
+    flow.outstanding = 6
+    assert flow.apply_backpressure(service.consumer) is True
+    (paused,), _ = service.consumer.pause.call_args
+    assert [tp.partition for tp in paused] == [0, 2]
+    flow.outstanding = 5
+    assert flow.apply_backpressure(service.consumer) is True, "Should stay paused above low!"
+    flow.deferred[("topic", 2)] = (math.inf, 7)  # e.g., a lane held meanwhile
+    flow.outstanding = 4
+    assert flow.apply_backpressure(service.consumer) is False
+    (resumed,), _ = service.consumer.resume.call_args
+    assert [tp.partition for tp in resumed] == [0], "Deferred partitions should stay paused!"
+
+
+@pytest.mark.parametrize(
+    "latency_slo, waited, headers, shed",
+    [
+        (None, 60.0, [], False),
+        (1.0, 0.0, [], False),
+        (1.0, 2.0, [], True),
+        (None, 0.0, [("deadline", b"0")], True),
+        (None, 0.0, [("deadline", b"99999999999")], False),
+        (None, 0.0, [("deadline", b"invalid")], False),
+    ],
+)
+def test_process_in_flight_shedding(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+    latency_slo: float | None,
+    waited: float,
+    headers: list[tuple[str, bytes]],
+    shed: bool,
+) -> None:
+    """Test the concurrent consumer sheds the messages past their SLO or deadline."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.flow.latency_slo = latency_slo
+    msg = make_message(b'{"input_data": {"input": ["a"]}}')
+    msg.headers.return_value = headers
+
+    with patch(
+        "autogen_team.infrastructure.messaging.consumers.time.monotonic", return_value=100.0
+    ):
+        ConcurrentConsumer(service).process(msg, admitted=100.0 - waited)
+
+    _, kwargs = service.producer.produce.call_args
+    value = json.loads(kwargs["value"].decode("utf-8"))
+    assert (value["error"] == "Retry later") is shed
+    assert service.prediction_callback.called is not shed
+    assert service.flow.shed_count == int(shed)
+
+
+def test_process_message_codec(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test _process_message decodes and encodes with the codec of the content type."""
+    pa = pytest.importorskip("pyarrow")
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.prediction_callback.return_value = PredictionResponse(
+        result={"inference": [1.0], "quality": 1.0, "error": None}
+    )
+    codec = codecs.ArrowCodec()
+    table = pa.table({"input": ["a"]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    msg = make_message(sink.getvalue().to_pybytes())
+    msg.headers.return_value = [("content-type", codecs.ARROW_CONTENT_TYPE.encode("utf-8"))]
+
+    service._process_message(msg)
+
+    (request,), _ = service.prediction_callback.call_args
+    assert request.input_data == {"input": ["a"]}
+    _, kwargs = service.producer.produce.call_args
+    assert kwargs["headers"] == [("content-type", codecs.ARROW_CONTENT_TYPE.encode("utf-8"))]
+    assert codec.loads(kwargs["value"])["input_data"]["inference"] == [[1.0]]
+
+
+def test_process_message_invalid_request(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test unsupported content types and requests without inputs are permanent failures."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.router.retry_topics = [("retry_0", 10.0)]
+    service.router.dead_letter_topic = "dlq"
+    unsupported = make_message(b"input,a")
+    unsupported.headers.return_value = [("content-type", b"text/csv")]
+
+    service._process_message(unsupported)
+    service._process_message(make_message(b'{"inputs": {"input": ["a"]}}'))
+
+    service.prediction_callback.assert_not_called()
+    calls = service.producer.produce.call_args_list
+    assert [args for args, _ in calls[::2]] == [("dlq",), ("dlq",)], "No retries expected!"
+    assert [json.loads(kwargs["value"])["error"] for _, kwargs in calls[1::2]] == [
+        "Unsupported content type: text/csv",
+        "Invalid prediction request",
+    ]
+    _, result = calls[1]
+    assert result["headers"][0] == ("content-type", codecs.JSON_CONTENT_TYPE.encode("utf-8"))
+
+
+def test_process_message_idempotency(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test redelivered requests are keyed by their request ID and answered from the cache."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.idempotency_cache = IdempotencyCache()
+    service.prediction_callback.return_value = PredictionResponse(
+        result={"inference": [1.0], "quality": 1.0, "error": None}
+    )
+    first = make_message(b'{"input_data": {"input": ["a"]}}', offset=0)
+    first.headers.return_value = [("request-id", b"request-1")]
+    redelivered = make_message(b'{"input_data": {"input": ["a"]}}', offset=1)
+    redelivered.headers.return_value = [("request-id", b"request-1")]
+
+    service._process_message(first)
+    service._process_message(redelivered)
+
+    service.prediction_callback.assert_called_once()
+    for _, kwargs in service.producer.produce.call_args_list:
+        assert kwargs["key"] == b"request-1"
+        assert ("request-id", b"request-1") in kwargs["headers"]
+        assert json.loads(kwargs["value"])["inference"] == [1.0]
+
+
+def test_process_message_keys_are_not_deduplicated(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test messages sharing a key (e.g., a user ID) are keyed by it, and all predicted."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.idempotency_cache = IdempotencyCache()
+    service.prediction_callback.return_value = PredictionResponse(
+        result={"inference": [1.0], "quality": 1.0, "error": None}
+    )
+    msgs = [make_message(f'{{"input_data": {{"input": ["{text}"]}}}}'.encode()) for text in "ab"]
+    for msg in msgs:
+        msg.key.return_value = b"user-1"
+        service._process_message(msg)
+
+    assert service.prediction_callback.call_count == 2
+    assert len(service.idempotency_cache) == 0
+    keys = [kwargs["key"] for _, kwargs in service.producer.produce.call_args_list]
+    assert keys == [b"user-1", b"user-1"]
+
+
+def test_process_batch_duplicates(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the duplicate requests of a batch are predicted once."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.idempotency_cache = IdempotencyCache()
+    service.batch_prediction_callback = MagicMock(side_effect=echo_batch)
+    msgs = [
+        make_message(b'{"input_data": {"input": ["a"]}}', offset=0),
+        make_message(b'{"input_data": {"input": ["a"]}}', offset=1),
+        make_message(b'{"input_data": {"input": ["b"]}}', offset=2),
+    ]
+    for msg in msgs[:2]:
+        msg.headers.return_value = [("request-id", b"1")]
+
+    BatchConsumer(service).process(msgs)
+
+    (requests,), _ = service.batch_prediction_callback.call_args
+    assert len(requests) == 2, "The duplicate request should not be predicted!"
+    values = [json.loads(kwargs["value"]) for _, kwargs in service.producer.produce.call_args_list]
+    assert [value["inference"] for value in values] == [["a"], ["a"], ["b"]]
+    keys = [kwargs["key"] for _, kwargs in service.producer.produce.call_args_list]
+    assert keys == [b"1", b"1", b"prediction"]
+    assert service.idempotency_cache.get("1") == values[0]
+
+
+def test_process_message_retries(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test failed messages are rerouted to the retry topics, then to the dead letter topic."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.router.retry_topics = [("retry_0", 10.0)]
+    service.router.dead_letter_topic = "dlq"
+    service.prediction_callback.side_effect = Exception("LLM unavailable")
+    msg = make_message(b'{"input_data": {"input": ["a"]}}', offset=3)
+    msg.headers.return_value = [("request-id", b"1")]
+
+    service._process_message(msg)
+
+    args, kwargs = service.producer.produce.call_args
+    headers = dict(kwargs["headers"])
+    assert args == ("retry_0",)
+    assert kwargs["value"] == msg.value()
+    assert headers["retry-attempt"] == b"1"
+    assert headers["error"] == b"Internal processing error"
+    assert headers["source-topic"] == b"test_input_topic"
+    assert headers["source-offset"] == b"3"
+    assert headers["request-id"] == b"1"
+    assert float(headers["retry-after"]) > time.time()
+
+    retry = make_message(kwargs["value"], offset=0)
+    retry.topic.return_value = "retry_0"
+    retry.headers.return_value = kwargs["headers"]
+    service._process_message(retry)
+
+    (args, kwargs), (result_args, result_kwargs) = service.producer.produce.call_args_list[-2:]
+    headers = dict(kwargs["headers"])
+    assert args == ("dlq",)
+    assert headers["retry-attempt"] == b"2"
+    assert headers["source-topic"] == b"test_input_topic", "The source should be kept!"
+    assert "retry-after" not in headers
+    assert result_args == ("test_output_topic",), "The caller should get the error result!"
+    assert json.loads(result_kwargs["value"])["error"] == "Internal processing error"
+    assert result_kwargs["key"] == b"1"
+    service.consumer = MagicMock()
+    kwargs["callback"](None, MagicMock())
+    service._commit_completed()
+    service.consumer.commit.assert_not_called()  # the error result is not delivered yet
+    result_kwargs["callback"](None, MagicMock())
+    service._commit_completed()
+    service.consumer.commit.assert_called_once()
+
+
+def test_process_message_permanent_failures(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test invalid messages skip the retry topics, and go to the dead letter topic."""
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.router.retry_topics = [("retry_0", 10.0)]
+    service.router.dead_letter_topic = "dlq"
+    service.prediction_callback.side_effect = kafka_app.InvalidRequestError("Invalid input schema")
+    invalid = make_message(b'{"input_data": {"input": ["a"]}}')
+
+    service._process_message(make_message(b"not json"))
+    service._process_message(invalid)
+
+    errors = []
+    for args, kwargs in service.producer.produce.call_args_list[::2]:
+        assert args == ("dlq",), "Invalid messages should not be retried!"
+        errors.append(dict(kwargs["headers"])["error"])
+    assert errors == [b"Invalid JSON format", b"Invalid input schema"]
+
+
+def test_defer_retry(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test the retry partitions are paused until their next message is due."""
+    service, *_ = mock_kafka_service
+    service.consumer = MagicMock()
+    service.router.retry_topics = [("retry_0", 10.0)]
+    due = make_message(b"{}", offset=5)
+    due.headers.return_value = [("retry-after", str(time.time() + 10).encode("utf-8"))]
+    later = make_message(b"{}", offset=6)
+    later.headers.return_value = due.headers.return_value
+    due.topic.return_value = later.topic.return_value = "retry_0"
+    service.consumer.poll.side_effect = [due, later]
+
+    assert service._poll_message() is None
+    assert service._poll_message() is None, "Messages fetched before the pause should wait!"
+
+    service.consumer.pause.assert_called_once()
+    (position,), _ = service.consumer.seek.call_args
+    assert (position.partition, position.offset) == (0, 5)
+    service.consumer.resume.assert_not_called()
+    with patch(
+        "autogen_team.infrastructure.messaging.consumers.time.time", return_value=time.time() + 20
+    ):
+        service.flow.resume_due(service.consumer)
+        assert service.flow.defer_retry(service.consumer, due) is False
+    service.consumer.resume.assert_called_once()
+    assert service.flow.deferred == {}
+
+
+def test_hold_lane(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test a low priority lane is paused while a high priority lane has backlog."""
+    service, *_ = mock_kafka_service
+    service.consumer = MagicMock()
+    service.flow.lanes = PriorityLanes({"interactive": 10, "bulk": 1}, slots=4, idle=60.0)
+    high, low = make_message(b"{}", offset=1), make_message(b"{}", offset=7)
+    high.topic.return_value, low.topic.return_value = "interactive", "bulk"
+    service.consumer.poll.side_effect = [high, low]
+
+    assert service._poll_message() is high
+    assert service._poll_message() is None
+
+    (position,), _ = service.consumer.seek.call_args
+    assert (position.topic, position.offset) == ("bulk", 7)
+    service.flow.resume_due(service.consumer)
+    service.consumer.resume.assert_not_called()
+    service.flow.lanes.idle = 0.0
+    service.flow.resume_due(service.consumer)
+    service.consumer.resume.assert_called_once()
+    assert service.flow.deferred == {}
+
+
+def echo_batch(requests: list[PredictionRequest]) -> list[PredictionResponse]:
+    """Batch prediction callback echoing the inputs."""
+    return [
+        PredictionResponse(result={"inference": request.input_data["input"], "error": None})
+        for request in requests
+    ]
+
+
+def test_predict_endpoints() -> None:
+    """Test the /predict and /predict/batch endpoints use the prediction batcher."""
+    batcher = DynamicBatcher(batch_prediction_callback=echo_batch, max_wait=0.01)
+    client = TestClient(app)
+
+    with patch.object(kafka_app, "prediction_batcher", None):
+        unavailable = client.post("/predict", json={"input_data": {"input": ["a"]}})
+    with patch.object(kafka_app, "prediction_batcher", batcher):
+        single = client.post("/predict", json={"input_data": {"input": ["a"]}})
+        batch = client.post(
+            "/predict/batch",
+            json=[{"input_data": {"input": ["b"]}}, {"input_data": {"input": ["c"]}}],
+        )
+    with patch.object(
+        kafka_app, "prediction_batcher", DynamicBatcher(MagicMock(side_effect=OSError("/secret")))
+    ):
+        failed = client.post("/predict", json={"input_data": {"input": ["a"]}})
+
+    assert unavailable.status_code == 503
+    assert single.json()["result"]["inference"] == ["a"]
+    assert [response["result"]["inference"] for response in batch.json()] == [["b"], ["c"]]
+    assert failed.status_code == 500
+    assert "/secret" not in failed.text, "Internal errors should not leak!"
+
+
+def test_process_message_metrics(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test _process_message records its stage latencies and status, and /metrics exposes them."""
+    pytest.importorskip("prometheus_client")
+    service, *_ = mock_kafka_service
+    service.producer = MagicMock()
+    service.prediction_callback.return_value = PredictionResponse(
+        result={"inference": [1.0], "quality": 1.0, "error": None}
+    )
+    msg = make_message(b'{"input_data": {"input": ["a"]}}')
+    client = TestClient(app)
+
+    service._process_message(msg)
+    with patch.object(kafka_app, "service_metrics", None):
+        unavailable = client.get("/metrics")
+    with patch.object(kafka_app, "service_metrics", service.metrics):
+        exposed = client.get("/metrics")
+
+    sample = service.metrics.registry.get_sample_value
+    for stage in ("process", "decode", "predict", "serialize", "produce"):
+        labels = {"stage": stage}
+        assert sample("prediction_service_stage_latency_seconds_count", labels) == 1.0, stage
+    assert sample("prediction_service_messages_total", {"status": "ok"}) == 1.0
+    assert unavailable.status_code == 503
+    assert 'prediction_service_messages_total{status="ok"} 1.0' in exposed.text
+
+
+def test_record_lag(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test _record_lag records the lag of the assigned partitions every lag_interval."""
+    pytest.importorskip("prometheus_client")
+    service, *_ = mock_kafka_service
+    service.consumer = MagicMock()
+    service.consumer.position.return_value = [kafka_app.TopicPartition("input", 0, 90)]
+    service.consumer.get_watermark_offsets.return_value = (0, 100)
+    service.config = service.config.model_copy(update={"lag_interval": 0.0})
+
+    service._record_lag()
+
+    labels = {"topic": "input", "partition": "0"}
+    assert (
+        service.metrics.registry.get_sample_value("prediction_service_consumer_lag", labels) == 10
+    )
+
+
+def test_consume_async(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test consume_async awaits the predictions in the event loop and commits in order."""
+    service, *_ = mock_kafka_service
+    service.flow.max_in_flight = 4
+    msgs = [make_message(b'{"input_data": {"input": ["a"]}}', offset=i) for i in range(3)]
+    msgs.append(make_message(b"invalid json", offset=3))
+    polls = iter(msgs)
+
+    def poll(timeout: float) -> Any:
+        msg = next(polls, None)
+        if msg is None:
+            service.stop_event.set()
+        return msg
+
+    callbacks: list[Any] = []
+    running: list[int] = []
+
+    async def apredict(request: PredictionRequest) -> PredictionResponse:
+        running.append(len(running))
+        await asyncio.sleep(0.01)  # yield to the other predictions
+        return PredictionResponse(result={"inference": [1.0], "error": None})
+
+    def serve(*_: Any) -> int:
+        while callbacks:
+            callbacks.pop(0)(None, MagicMock())
+        return 0
+
+    service.async_prediction_callback = apredict
+    service.consumer = MagicMock()
+    service.consumer.poll.side_effect = poll
+    service.producer = MagicMock()
+    service.producer.produce.side_effect = lambda *_, callback, **__: callbacks.append(callback)
+    service.producer.poll.side_effect = serve
+    service.producer.flush.side_effect = serve
+
+    with patch("threading.Thread", Thread):  # real consumer thread
+        asyncio.run(service.consume_async())
+
+    assert len(running) == 3, "Valid messages should be predicted by the async callback!"
+    values = [
+        json.loads(kwargs["value"].decode("utf-8"))
+        for _, kwargs in service.producer.produce.call_args_list
+    ]
+    assert sorted(value["error"] or "" for value in values) == ["", "", "", "Invalid JSON format"]
+    _, kwargs = service.consumer.commit.call_args
+    assert [(tp.partition, tp.offset) for tp in kwargs["offsets"]] == [(0, 4)]
+    service.consumer.close.assert_called_once()
+    service.prediction_callback.assert_not_called()
+
+
+def test_consume_async_sheds(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test consume_async sheds the messages that waited past the latency SLO for a slot."""
+    service, *_ = mock_kafka_service
+    service.flow.max_in_flight, service.flow.latency_slo = 1, 0.01
+    polls = iter([make_message(b'{"input_data": {"input": ["a"]}}', offset=i) for i in range(2)])
+
+    def poll(timeout: float) -> Any:
+        if service.producer.produce.call_count == 2:
+            service.stop_event.set()
+        return next(polls, None)
+
+    async def apredict(request: PredictionRequest) -> PredictionResponse:
+        await asyncio.sleep(0.05)  # the second message waits for the slot
+        return PredictionResponse(result={"inference": [1.0], "error": None})
+
+    service.async_prediction_callback = AsyncMock(side_effect=apredict)
+    service.consumer = MagicMock()
+    service.consumer.poll.side_effect = poll
+    service.producer = MagicMock()
+    service.producer.flush.return_value = 0
+
+    with patch("threading.Thread", Thread):  # real consumer thread
+        asyncio.run(service.consume_async())
+
+    service.async_prediction_callback.assert_awaited_once()
+    values = [json.loads(kwargs["value"]) for _, kwargs in service.producer.produce.call_args_list]
+    assert [value["error"] for value in values] == [None, kafka_app.RETRY_LATER_ERROR]
+    assert service.flow.shed_count == 1
+    assert service.flow.outstanding == 0
+
+
+def test_lifespan_starts_async_consumer() -> None:
+    """Test the app lifespan runs the async consumer of the service."""
+    service = MagicMock()
+    service.stop_event = threading.Event()
+    service.consume_async = AsyncMock()
+
+    with patch.object(kafka_app, "fastapi_kafka_service", service):
+        with TestClient(app) as client:
+            assert client.get("/health").status_code == 200
+
+    service.consume_async.assert_awaited_once()
+    assert service.stop_event.is_set(), "The consumer should be stopped on shutdown!"
+
+
+def test_run_worker(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test run_worker consumes in the current thread, and stops on SIGTERM."""
+    service, MockProducer, MockConsumer, MockThread, *_ = mock_kafka_service
+
+    def consume() -> None:
+        handler = signal.getsignal(signal.SIGTERM)
+        assert callable(handler)
+        handler(signal.SIGTERM, None)  # stopped while consuming
+
+    service._consume_messages = MagicMock(side_effect=consume)
+    previous = signal.getsignal(signal.SIGTERM)
+    try:
+        service.run_worker()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+    MockProducer.assert_called_once()
+    MockConsumer.assert_called_once()
+    service._consume_messages.assert_called_once()
+    MockThread.assert_not_called()
+    assert service.stop_event.is_set(), "SIGTERM should stop the consumer!"
+
+
+def test_run_worker_consumer_error(
+    mock_kafka_service: tuple[FastAPIKafkaService, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> None:
+    """Test run_worker fails when the consumer stops on its own, so the worker is restarted."""
+    service, *_ = mock_kafka_service
+    service._consume_messages = MagicMock()  # e.g., a fatal Kafka error
+    previous = signal.getsignal(signal.SIGTERM)
+    try:
+        with pytest.raises(RuntimeError, match="stopped on an error"):
+            service.run_worker()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def test_main_prefork() -> None:
+    """Test main forks workers sharing the loaded model when several are configured."""
+    with (
+        patch("autogen_team.infrastructure.messaging.kafka_app.services.MlflowService"),
+        patch("autogen_team.infrastructure.messaging.kafka_app.CustomLoader") as MockCustomLoader,
+        patch("autogen_team.infrastructure.messaging.kafka_app.FastAPIKafkaService") as MockService,
+        patch(
+            "autogen_team.infrastructure.messaging.kafka_app.PreforkSupervisor"
+        ) as MockSupervisor,
+        patch("autogen_team.infrastructure.messaging.kafka_app.DEFAULT_WORKERS", 3),
+        patch("autogen_team.infrastructure.messaging.kafka_app.uvicorn.run") as mock_run,
+        patch("autogen_team.infrastructure.messaging.kafka_app.ModelWatcher") as MockWatcher,
+    ):
+        MockSupervisor.return_value.run.return_value = 0
+        from autogen_team.infrastructure.messaging.kafka_app import main
+
+        main()
+        _, kwargs = MockSupervisor.call_args
+        MockService.assert_not_called()  # the services are created in the workers
+        kwargs["target"](0)
+        MockService.assert_not_called()  # worker 0 serves the HTTP API
+        kwargs["target"](1)
+
+    MockCustomLoader.return_value.load.assert_called_once()
+    assert kwargs["workers"] == 3 + 1, "One more worker should serve the HTTP API!"
+    assert kwargs["on_exit"] == ServiceMetrics.mark_process_dead
+    mock_run.assert_called_once()
+    MockService.return_value.run_worker.assert_called_once()
+    MockService.return_value.start.assert_not_called()
+    watcher = MockWatcher.return_value
+    watcher.start.assert_called_once()  # in the supervisor only, not in each worker
+    watcher.on_swap(MagicMock())
+    MockSupervisor.return_value.reload.assert_called_once()
@@ -0,0 +1,18 @@
+from autogen_team.infrastructure.messaging.lanes import PriorityLanes
+
+
+def test_priority_lanes() -> None:
+    """Test PriorityLanes holds the low lanes behind a backlog and shares the slots."""
+    lanes = PriorityLanes({"interactive": 3, "bulk": 1}, slots=4, idle=60.0)
+    assert lanes.held("bulk") is False
+    lanes.seen("interactive")
+    lanes.seen("bulk")
+    assert lanes.held("bulk") is True, "Bulk should wait for the interactive backlog!"
+    for _ in range(3):
+        assert lanes.held("interactive") is False
+        lanes.start("interactive")
+    assert lanes.held("interactive") is True, "Interactive should use its 3/4 share!"
+    lanes.finish("interactive")
+    assert lanes.held("interactive") is False
+    lanes.idle = 0.0
+    assert lanes.held("bulk") is False
@@ -0,0 +1,71 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from autogen_team.infrastructure.messaging.model_watcher import ModelWatcher
+
+
+def make_watcher(versions: list[str]) -> tuple[ModelWatcher[str], MagicMock]:
+    """Create a watcher of an alias moving through versions, loading the model URIs."""
+    client = MagicMock()
+    client.get_model_version_by_alias.side_effect = [MagicMock(version=v) for v in versions]
+    warmup = MagicMock()
+    watcher = ModelWatcher(
+        client=client, name="model", alias="Champion", load=lambda uri: uri, warmup=warmup
+    )
+    return watcher, warmup
+
+
+def test_model_watcher_swaps_new_versions() -> None:
+    """Test the watcher loads, warms up, and swaps the new versions of the alias."""
+    watcher, warmup = make_watcher(["1", "1", "2"])
+    watcher.on_swap = swapped = MagicMock()
+
+    assert watcher.check() is True
+    assert watcher.check() is False, "The same version should not be reloaded!"
+    assert watcher.check() is True
+
+    assert watcher.model == "models:/model/2"
+    assert watcher.version == "2"
+    assert [args for args, _ in warmup.call_args_list] == [
+        ("models:/model/1",),
+        ("models:/model/2",),
+    ]
+    assert [args for args, _ in swapped.call_args_list] == [
+        ("models:/model/1",),
+        ("models:/model/2",),
+    ]
+
+
+def test_model_watcher_keeps_model_on_failure() -> None:
+    """Test the watcher keeps serving the previous model if the new one fails to warm up."""
+    watcher, warmup = make_watcher(["2", "2"])
+    watcher.model, watcher.version = "models:/model/1", "1"
+    warmup.side_effect = [RuntimeError("Warmup failed"), None]
+
+    with pytest.raises(RuntimeError):
+        watcher.check()
+    assert watcher.model == "models:/model/1"
+    assert watcher.check() is True, "The failed version should be retried!"
+    assert watcher.model == "models:/model/2"
+
+
+def test_model_watcher_thread() -> None:
+    """Test the watcher thread polls the alias, and backs off on errors."""
+    swapped = threading.Event()
+    watcher, warmup = make_watcher([])
+    watcher.client.get_model_version_by_alias.side_effect = [
+        ConnectionError("Registry unavailable"),
+        MagicMock(version="2"),
+    ]
+    warmup.side_effect = lambda model: swapped.set()
+    watcher.interval = 0.01
+
+    model = watcher.start(model="models:/model/1", version="1")
+    assert swapped.wait(5.0), "The new version should be swapped!"
+    watcher.stop()
+
+    assert model == "models:/model/1"
+    assert watcher.model == "models:/model/2"
+    assert watcher.thread is None
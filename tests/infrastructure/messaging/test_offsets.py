@@ -0,0 +1,21 @@
+from autogen_team.infrastructure.messaging.offsets import OffsetTracker
+
+
+def test_offset_tracker() -> None:
+    """Test OffsetTracker commits only the highest contiguous completed offsets."""
+    tracker = OffsetTracker()
+    for offset in (10, 11, 12):
+        tracker.track("topic", 0, offset)
+    tracker.track("topic", 1, 5)
+
+    tracker.complete("topic", 0, 11)  # 10 is still in flight
+    tracker.complete("topic", 1, 5)
+    first = tracker.committable()
+    tracker.complete("topic", 0, 10)
+    second = tracker.committable()
+    third = tracker.committable()
+
+    assert [(tp.partition, tp.offset) for tp in first] == [(1, 6)]
+    assert [(tp.partition, tp.offset) for tp in second] == [(0, 12)]
+    assert third == [], "Unchanged offsets should not be committed again!"
+    assert tracker.in_flight == 1, "Offset 12 should still be in flight!"
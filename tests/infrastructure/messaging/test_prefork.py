@@ -0,0 +1,117 @@
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+from autogen_team.infrastructure.messaging.prefork import PreforkSupervisor
+
+
+def test_prefork_supervisor_restarts_crashed_workers(tmp_path: Path) -> None:
+    """Test the supervisor restarts the crashed workers until they are done."""
+
+    def target(index: int) -> None:
+        marker = tmp_path / f"worker-{index}"
+        with open(marker, "a") as file:
+            file.write(f"{os.getpid()}\n")
+        if index == 0 and len(marker.read_text().splitlines()) == 1:
+            raise RuntimeError("First run crashes")
+
+    exited: list[int] = []
+    supervisor = PreforkSupervisor(
+        target=target, workers=2, restart_delay=0.0, on_exit=exited.append
+    )
+
+    code = supervisor.run()
+
+    assert code == 0, "Workers should be done!"
+    runs = {index: (tmp_path / f"worker-{index}").read_text().split() for index in range(2)}
+    assert len(runs[0]) == 2, "The crashed worker should be restarted once!"
+    assert len(runs[1]) == 1, "The done worker should not be restarted!"
+    assert str(os.getpid()) not in runs[0] + runs[1], "Workers should be forked processes!"
+    assert len(supervisor.restarts) == 1
+    assert sorted(map(str, exited)) == sorted(runs[0] + runs[1]), "Exits should be notified!"
+
+
+def test_prefork_supervisor_gives_up(tmp_path: Path) -> None:
+    """Test the supervisor gives up when the workers crash too often."""
+
+    def target(index: int) -> None:
+        raise RuntimeError("Always crashes")
+
+    supervisor = PreforkSupervisor(target=target, workers=1, restart_delay=0.0, max_restarts=2)
+
+    code = supervisor.run()
+
+    assert code == 1, "Supervisor should give up!"
+    assert len(supervisor.restarts) == 2
+
+
+def test_prefork_supervisor_stop(tmp_path: Path) -> None:
+    """Test the supervisor forwards the stop signals to the workers."""
+
+    def target(index: int) -> None:
+        stopped = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopped.append(signum))
+        (tmp_path / f"ready-{index}").touch()
+        while not stopped:
+            time.sleep(0.01)
+
+    supervisor = PreforkSupervisor(target=target, workers=2)
+    previous = signal.signal(
+        signal.SIGALRM, lambda signum, frame: os.kill(os.getpid(), signal.SIGTERM)
+    )
+    signal.setitimer(signal.ITIMER_REAL, 0.5)  # stop the parent once the workers run
+    try:
+        code = supervisor.run()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+    assert code == 0, "Stopped workers should exit cleanly!"
+    assert supervisor.stopping
+    assert supervisor.restarts == [], "Stopped workers should not be restarted!"
+    assert all((tmp_path / f"ready-{index}").exists() for index in range(2))
+
+
+def test_prefork_supervisor_reload(tmp_path: Path) -> None:
+    """Test the supervisor reloads the workers one at a time, without counting restarts."""
+
+    def target(index: int) -> None:
+        stopped = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopped.append(signum))
+        with open(tmp_path / f"worker-{index}", "a") as file:
+            file.write(f"{os.getpid()}\n")
+        while not stopped:
+            time.sleep(0.01)
+
+    def runs(index: int) -> list[str]:
+        marker = tmp_path / f"worker-{index}"
+        return marker.read_text().split() if marker.exists() else []
+
+    def started(index: int, count: int) -> bool:
+        pids = runs(index)
+        return len(pids) >= count and int(pids[-1]) in supervisor.pids
+
+    def wait_runs(count: int) -> None:
+        deadline = time.monotonic() + 10.0
+        while not all(started(index, count) for index in range(2)):
+            assert time.monotonic() < deadline, "Workers should run!"
+            time.sleep(0.01)
+
+    def reload() -> None:
+        wait_runs(1)
+        supervisor.reload()
+        wait_runs(2)
+        os.kill(os.getpid(), signal.SIGTERM)  # stop the parent once the workers reloaded
+
+    supervisor = PreforkSupervisor(target=target, workers=2)
+    thread = threading.Thread(target=reload)
+    thread.start()
+    code = supervisor.run()
+    thread.join()
+
+    assert code == 0
+    assert [len(runs(index)) for index in range(2)] == [2, 2], "Each worker reloads once!"
+    assert supervisor.restarts == [], "Reloads should not count as restarts!"
+    assert supervisor.replaced is None
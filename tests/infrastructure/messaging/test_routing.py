@@ -0,0 +1,74 @@
+import time
+from typing import Any
+from unittest.mock import MagicMock
+
+from autogen_team.infrastructure.messaging.routing import RetryRouter
+from confluent_kafka import KafkaError
+
+
+def test_retry_router_route() -> None:
+    """Test the failed messages go through the retry topics, then to the dead letter topic."""
+    router = RetryRouter(
+        retry_topics=[("retry_0", 10.0), ("retry_1", 60.0)], dead_letter_topic="dlq"
+    )
+    msg = MagicMock()
+    msg.headers.return_value = []
+
+    assert router.route(msg) == ("retry_0", 10.0)
+    assert router.route(msg, permanent=True) == ("dlq", None), "Should skip the retries!"
+    msg.headers.return_value = [("retry-attempt", b"1")]
+    assert router.route(msg) == ("retry_1", 60.0)
+    msg.headers.return_value = [("retry-attempt", b"2")]
+    assert router.route(msg) == ("dlq", None)
+    assert RetryRouter().route(msg) is None, "Retries and dead letters should be opt-in!"
+
+
+def test_retry_router_headers() -> None:
+    """Test the rerouted messages keep their first source and carry their due time."""
+    router = RetryRouter(retry_topics=[("retry_0", 10.0)])
+    msg = MagicMock()
+    msg.topic.return_value, msg.partition.return_value, msg.offset.return_value = "input", 1, 7
+    msg.headers.return_value = [("request-id", b"1"), ("error", b"previous")]
+
+    headers = router.headers(msg, "Internal processing error", delay=10.0)
+    retry = MagicMock()
+    retry.headers.return_value = headers
+    retried = dict(router.headers(retry, "Internal processing error", delay=None))
+
+    assert dict(headers)["source-offset"] == b"7"
+    assert [key for key, _ in headers].count("error") == 1, "The previous error is replaced!"
+    assert router.due(retry) > time.time()
+    assert retried["retry-attempt"] == b"2"
+    assert retried["source-topic"] == b"input", "The first source should be kept!"
+    assert "retry-after" not in retried
+
+
+def test_retry_router_redeliver_on_failure() -> None:
+    """Test a failed delivery is produced again, and reported once its attempts are spent."""
+    router = RetryRouter(delivery_attempts=2)
+    producer = MagicMock()
+    callback = MagicMock()
+    error = MagicMock(spec=KafkaError)
+
+    wrapper = router.redeliver_on_failure(producer, callback)
+    wrapper(error, MagicMock())
+    _, kwargs = producer.produce.call_args
+    kwargs["callback"](error, MagicMock())
+
+    producer.produce.assert_called_once()
+    (err, _), _ = callback.call_args
+    assert err is error
+
+
+def test_retry_router_on_all_delivered() -> None:
+    """Test the wrapped callback is called once, with the first delivery error."""
+    callback = MagicMock()
+    errors: list[Any] = [None, MagicMock(spec=KafkaError)]
+
+    wrapper = RetryRouter.on_all_delivered(callback, count=2)
+    for err in errors:
+        wrapper(err, MagicMock())
+
+    callback.assert_called_once()
+    (err, _), _ = callback.call_args
+    assert err is errors[1]
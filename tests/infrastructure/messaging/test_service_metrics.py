@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from autogen_team.infrastructure.messaging import metrics as metrics_module
+from autogen_team.infrastructure.messaging.metrics import ServiceMetrics
+
+
+def test_service_metrics() -> None:
+    """Test the service metrics are recorded in their own registry."""
+    pytest.importorskip("prometheus_client")
+    metrics = ServiceMetrics()
+
+    with metrics.time("predict"), metrics.predicting():
+        in_flight = metrics.registry.get_sample_value("prediction_service_predictions_in_flight")
+    metrics.observe_batch(8)
+    metrics.count("ok", 2)
+    metrics.count_tokens(120)
+    metrics.set_lag("input", 0, 42)
+    content, media_type = metrics.render()
+
+    sample = metrics.registry.get_sample_value
+    assert in_flight == 1.0
+    assert sample("prediction_service_predictions_in_flight") == 0.0
+    assert sample("prediction_service_stage_latency_seconds_count", {"stage": "predict"}) == 1.0
+    assert sample("prediction_service_batch_size_sum", {"source": "kafka"}) == 8.0
+    assert sample("prediction_service_messages_total", {"status": "ok"}) == 2.0
+    assert sample("prediction_service_llm_tokens_total") == 120.0
+    assert sample("prediction_service_consumer_lag", {"topic": "input", "partition": "0"}) == 42
+    assert media_type.startswith("text/plain")
+    assert b"prediction_service_stage_latency_seconds_bucket" in content
+
+
+def test_service_metrics_disabled() -> None:
+    """Test the service metrics are no-ops without prometheus_client."""
+    with patch.object(metrics_module, "PROMETHEUS_AVAILABLE", False):
+        metrics = ServiceMetrics()
+
+    with metrics.time("predict"), metrics.predicting():
+        pass
+    metrics.count("ok")
+
+    assert metrics.enabled is False
+    assert metrics.render() == (b"", "text/plain")
+
+
+def test_service_metrics_multiprocess(tmp_path: Path) -> None:
+    """Test the service metrics aggregate the processes sharing a multiprocess directory."""
+    pytest.importorskip("prometheus_client")
+    script = textwrap.dedent(
+        """
+        import os
+
+        from autogen_team.infrastructure.messaging.metrics import ServiceMetrics
+
+        ServiceMetrics.reset_processes()
+        metrics = ServiceMetrics()
+        pid = os.fork()
+        if pid == 0:  # worker
+            metrics.count("ok")
+            metrics.outstanding.inc(3)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        ServiceMetrics.mark_process_dead(pid)
+        metrics.count("ok")
+        metrics.outstanding.inc(1)
+        print(metrics.render()[0].decode())
+        """
+    )
+    env = {
+        **os.environ,
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+        "PYTHONPATH": os.pathsep.join(sys.path),
+    }
+    (tmp_path / "stale.db").touch()
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True
+    ).stdout
+
+    assert 'prediction_service_messages_total{status="ok"} 2.0' in output
+    assert "prediction_service_outstanding_messages 1.0" in output, "Dead workers are removed!"
+    assert not (tmp_path / "stale.db").exists(), "Previous runs should be reset!"
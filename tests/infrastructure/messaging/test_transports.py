@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from typing import Any, List
+from unittest.mock import MagicMock
+
+from autogen_team.infrastructure.messaging.kafka_app import (
+    FastAPIKafkaService,
+    PredictionRequest,
+    PredictionResponse,
+)
+from autogen_team.infrastructure.messaging.transports import InMemoryBroker
+from confluent_kafka import TopicPartition
+
+
+def test_in_memory_broker_consumer_group() -> None:
+    """Test the members of a group share the partitions, and resume from the commits."""
+    broker = InMemoryBroker(partitions=2)
+    for index in range(4):
+        broker.append("input", f"{index}".encode(), partition=index % 2)
+    revoked: List[TopicPartition] = []
+    first = broker.consumer({"group.id": "group", "auto.offset.reset": "earliest"})
+    first.subscribe(["input"], on_revoke=lambda _, partitions: revoked.extend(partitions))
+    second = broker.consumer({"group.id": "group", "auto.offset.reset": "earliest"})
+    assert second.consume(num_messages=10) == [], "Unsubscribed consumers should not block!"
+    second.subscribe(["input"])
+
+    msg = first.poll(0)
+    assert [(tp.topic, tp.partition) for tp in first.assignment()] == [("input", 0)]
+    assert [(tp.topic, tp.partition) for tp in second.assignment()] == []
+    assert (msg.partition(), msg.offset(), msg.value()) == (0, 0, b"0")
+    first.commit(message=msg, asynchronous=False)
+    assert [msg.value() for msg in second.consume(num_messages=10, timeout=0)] == [b"1", b"3"]
+
+    first.close()
+    assert [(tp.topic, tp.partition) for tp in revoked] == [("input", 0)]
+    msgs = second.consume(num_messages=10, timeout=0)
+    assert [msg.value() for msg in msgs] == [b"2"], "The committed offset should be skipped!"
+    assert second.get_watermark_offsets(TopicPartition("input", 0)) == (0, 2)
+
+
+def test_in_memory_producer_poll() -> None:
+    """Test the producer poll waits for the delivery callbacks, at most timeout seconds."""
+    broker = InMemoryBroker()
+    producer = broker.producer({})
+    delivered: List[bytes] = []
+
+    start = time.monotonic()
+    assert producer.poll(0.05) == 0
+    assert time.monotonic() - start >= 0.05, "The poll should wait for the timeout!"
+
+    def produce() -> None:
+        time.sleep(0.05)
+        producer.produce(
+            "output", b"value", on_delivery=lambda _, msg: delivered.append(msg.value())
+        )
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    assert producer.poll(10) == 1, "The poll should return on the first delivery!"
+    thread.join()
+    assert delivered == [b"value"]
+
+
+def test_in_memory_broker_service() -> None:
+    """Test the service predicts and commits the messages of an in-memory broker."""
+    broker = InMemoryBroker(partitions=2)
+    for index in range(5):
+        payload = {"input_data": {"input": [str(index)]}}
+        broker.append("input", json.dumps(payload).encode(), key=f"{index}".encode())
+
+    predicted: List[PredictionRequest] = []
+
+    def predict(request: PredictionRequest) -> PredictionResponse:
+        predicted.append(request)
+        if len(predicted) == 5:
+            service.stop_event.set()
+        result: dict[str, Any] = {"inference": request.input_data["input"], "error": None}
+        return PredictionResponse(result=result)
+
+    config = {"group.id": "group", "auto.offset.reset": "earliest"}
+    service = FastAPIKafkaService(
+        prediction_callback=MagicMock(side_effect=predict),
+        producer_config={},
+        consumer_config=config,
+        input_topic="input",
+        output_topic="output",
+        transport=broker,
+    )
+    service._initialize_kafka_producer()
+    service._initialize_kafka_consumer()
+    service._consume_messages()
+
+    values = [msg.value() for msg in broker.messages("output")]
+    assert all(value is not None for value in values), "All the results should have a value!"
+    outputs = sorted(json.loads(value)["inference"][0] for value in values if value is not None)
+    assert outputs == ["0", "1", "2", "3", "4"]
+    assert sum(broker.committed.values()) == 5, "All the offsets should be committed!"
@@ -1,10 +1,78 @@
 # %% IMPORTS
 
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
 from autogen_team.core import schemas
 from autogen_team.evaluation import metrics
 from autogen_team.infrastructure.utils import searchers, splitters
 from autogen_team.models import entities as models
 
+# %% OBJECTIVES
+
+
+@pytest.mark.parametrize(
+    "objective, best, front",
+    [
+        (searchers.Objective(), 0, [True, True, True, False]),
+        (searchers.Objective(latency_weight=0.1), 1, [True, True, True, False]),
+        (searchers.Objective(strategy="pareto", min_score=0.85), 1, [True, True, False, False]),
+        (searchers.Objective(strategy="pareto", min_score=0.99), 0, [True, False, False, False]),
+    ],
+)
+def test_objective(objective: searchers.Objective, best: int, front: list[bool]) -> None:
+    # given
+    results = pd.DataFrame(
+        {
+            "mean_test_score": [0.95, 0.9, 0.8, 0.8],
+            "latency_p95": [3.0, 1.0, 0.5, 0.6],
+            "mean_tokens": [100.0, 100.0, 100.0, 100.0],
+        }
+    )
+    # when
+    selected = objective.select(results=results, candidates=np.ones(len(results), dtype=bool))
+    # then
+    assert selected == best, "Objective should select the best trade-off!"
+    assert results["pareto"].tolist() == front, "Pareto front should skip dominated candidates!"
+    assert "objective" in results, "Objective values should be added to the results!"
+
+
+def test_objective_zero_min_score() -> None:
+    # given
+    objective = searchers.Objective(min_score=0.0, latency_weight=1.0)
+    results = pd.DataFrame(
+        {
+            "mean_test_score": [0.5, -0.2],
+            "latency_p95": [3.0, 0.1],
+            "mean_tokens": [100.0, 100.0],
+        }
+    )
+    # when
+    selected = objective.select(results=results, candidates=np.ones(len(results), dtype=bool))
+    # then
+    assert selected == 0, "Candidates below a zero threshold should be excluded!"
+    assert results["pareto"].tolist() == [True, False], "Pareto front should skip them too!"
+
+
+def test_objective_missing_usage() -> None:
+    # given
+    objective = searchers.Objective(latency_weight=0.1)
+    results = pd.DataFrame(
+        {
+            "mean_test_score": [0.9, 0.9],
+            "latency_p95": [1.0, np.nan],
+            "mean_tokens": [np.nan, np.nan],
+        }
+    )
+    # when
+    selected = objective.select(results=results, candidates=np.ones(len(results), dtype=bool))
+    # then
+    assert selected == 0, "Candidates without usage should not look free!"
+
+
 # %% SEARCHERS
 
 
@@ -28,3 +96,139 @@ def test_grid_cv_searcher(
     assert len(result) == sum(
         len(vs) for vs in param_grid.values()
     ), "Results should have one row per candidate!"
+
+
+@pytest.mark.parametrize("kind", [searchers.GridCVSearcher, searchers.HalvingSearcher])
+def test_searcher_objective_jobs(
+    kind: type[searchers.GridCVSearcher | searchers.HalvingSearcher],
+) -> None:
+    # when
+    with pytest.raises(ValueError, match="n_jobs"):
+        kind(param_grid={"temperature": [0.1]}, objective=searchers.Objective(), n_jobs=2)
+    # then
+    assert kind(param_grid={"temperature": [0.1]}, objective=searchers.Objective(), n_jobs=1)
+
+
+def test_halving_searcher() -> None:
+    # given
+    inputs = schemas.Inputs(pd.DataFrame({"input": [f"question {i}" for i in range(90)]}))
+    targets = schemas.Targets(
+        pd.DataFrame({"input_target": inputs["input"], "response": inputs["input"]})
+    )
+    param_grid: searchers.Grid = {"temperature": [0.1 * i for i in range(1, 10)]}
+    searcher = searchers.HalvingSearcher(param_grid=param_grid, verbose=0)
+    metric = metrics.AutogenMetric(name="exact", metric_type="exact_match", greater_is_better=True)
+    splitter = splitters.TimeSeriesSplitter(n_splits=2, test_size=20)
+
+    def predict(self: models.BaselineAutogenModel, inputs: schemas.Inputs) -> schemas.Outputs:
+        assert self.temperature is not None
+        responses = inputs["input"] if self.temperature > 0.5 else inputs["input"].str.upper()
+        return schemas.Outputs(
+            pd.DataFrame({"response": responses, "metadata": [{}] * len(inputs)})
+        )
+
+    # when
+    with patch.object(models.BaselineAutogenModel, "predict", predict):
+        result, best_score, best_params = searcher.search(
+            model=models.BaselineAutogenModel(),
+            metric=metric,
+            inputs=inputs,
+            targets=targets,
+            cv=splitter,
+        )
+    # then
+    assert best_score == 1.0, "Best score should be a perfect match!"
+    assert best_params["temperature"] > 0.5, "Best params should be a matching candidate!"
+    assert result["iter"].nunique() == result.attrs["iterations"] > 1, "Should run iterations!"
+    assert result.attrs["calls_grid"] == 9 * 2 * 20, "Grid calls should be candidates x rows!"
+    assert result.attrs["calls_saved"] == result.attrs["calls_grid"] - result.attrs["calls"] > 0
+
+
+def test_async_grid_searcher() -> None:
+    # given
+    inputs = schemas.Inputs(pd.DataFrame({"input": [f"question {i}" for i in range(30)]}))
+    targets = schemas.Targets(
+        pd.DataFrame({"input_target": inputs["input"], "response": inputs["input"]})
+    )
+    param_grid: searchers.Grid = {"temperature": [0.1, 0.9], "max_tokens": [100, 200]}
+    searcher = searchers.AsyncGridSearcher(param_grid=param_grid, concurrency=4)
+    metric = metrics.AutogenMetric(name="exact", metric_type="exact_match", greater_is_better=True)
+    splitter = splitters.TimeSeriesSplitter(n_splits=2, test_size=10)
+    running = {"now": 0, "max": 0}
+
+    async def rungroupchat(self: models.BaselineAutogenModel, content: str) -> MagicMock:
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.001)
+        running["now"] -= 1
+        assert self.temperature is not None
+        text = content if self.temperature > 0.5 else content.upper()
+        return MagicMock(
+            messages=[MagicMock(text=text)],
+            text=text,
+            finish_reason="stop",
+            additional_properties={"latency": 0.001},
+        )
+
+    # when
+    with patch.object(models.BaselineAutogenModel, "_rungroupchat", rungroupchat):
+        result, best_score, best_params = searcher.search(
+            model=models.BaselineAutogenModel(),
+            metric=metric,
+            inputs=inputs,
+            targets=targets,
+            cv=splitter,
+        )
+    # then
+    assert best_score == 1.0, "Best score should be a perfect match!"
+    assert best_params["temperature"] == 0.9, "Best params should be a matching candidate!"
+    assert len(result) == 4, "Results should have one row per candidate!"
+    assert result["rank_test_score"].tolist() == [3, 1, 3, 1], "Ranks should follow the scores!"
+    assert {"split0_test_score", "split1_test_score", "param_temperature"} <= set(result)
+    assert running["max"] == 4, "Model calls should be bounded by the concurrency!"
+    assert result["latency_p95"].notna().all(), "Latency percentiles should be collected!"
+    assert result.attrs["calls"] == result.attrs["calls_grid"] == 4 * 2 * 10
+
+
+def test_tpe_searcher() -> None:
+    # given
+    inputs = schemas.Inputs(pd.DataFrame({"input": [f"question {i}" for i in range(20)]}))
+    targets = schemas.Targets(
+        pd.DataFrame({"input_target": inputs["input"], "response": inputs["input"]})
+    )
+    param_grid: searchers.Grid = {"temperature": [0.0, 2.0], "max_tokens": [100, 200, 300]}
+    metric = metrics.AutogenMetric(name="ratio", metric_type="length_ratio", greater_is_better=True)
+    splitter = splitters.TimeSeriesSplitter(n_splits=2, test_size=5)
+
+    async def rungroupchat(self: models.BaselineAutogenModel, content: str) -> MagicMock:
+        # the length ratio peaks at 1.0 for temperature = 0.7
+        assert self.temperature is not None
+        text = content[: max(1, round(len(content) * (1 - abs(self.temperature - 0.7))))]
+        usage = {"total_token_count": 10}
+        return MagicMock(messages=[MagicMock(text=text)], text=text, usage_details=usage)
+
+    def search(searcher: searchers.Searcher) -> searchers.Results:
+        return searcher.search(
+            model=models.BaselineAutogenModel(),
+            metric=metric,
+            inputs=inputs,
+            targets=targets,
+            cv=splitter,
+        )
+
+    # when
+    with patch.object(models.BaselineAutogenModel, "_rungroupchat", rungroupchat):
+        result, best_score, best_params = search(
+            searchers.TPESearcher(param_grid=param_grid, max_trials=24, n_concurrent=4)
+        )
+        budget, _, _ = search(
+            searchers.TPESearcher(param_grid=param_grid, max_tokens=250, n_concurrent=2)
+        )
+    # then
+    assert len(result) == 24, "Results should have one row per trial!"
+    assert best_score > 0.95, "Best score should be close to the optimum!"
+    assert abs(best_params["temperature"] - 0.7) < 0.05, "Best params should be near the peak!"
+    assert isinstance(best_params["max_tokens"], int), "Int ranges should sample ints!"
+    assert 100 <= best_params["max_tokens"] <= 300, "Ranges should span the grid values!"
+    assert result.attrs["tokens"] == result.attrs["calls"] * 10, "Cache hits should be free!"
+    assert len(budget) == 4, "Search should stop when the token budget is exhausted!"
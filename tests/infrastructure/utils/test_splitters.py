@@ -1,5 +1,11 @@
 # %% IMPORTS
 
+import typing as T
+
+import numpy as np
+import pandas as pd
+import pydantic as pdt
+import pytest
 from autogen_team.core import schemas
 from autogen_team.infrastructure.utils import splitters
 
@@ -49,3 +55,84 @@ def test_time_series_splitter(inputs: schemas.Inputs, targets: schemas.Targets)
         ), "Train index should always be lower than test index!"
         assert not inputs.iloc[train_index].empty, "Train index should be a subset of the inputs!"
         assert not inputs.iloc[test_index].empty, "Test index should be a subset of the inputs!"
+
+
+def test_stratified_subsample_splitter() -> None:
+    # given
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, 200, size=2000)
+    inputs = schemas.Inputs(
+        pd.DataFrame({"input": [f"{i}" + "x" * n for i, n in enumerate(lengths)]})
+    )
+    targets = schemas.Targets(
+        pd.DataFrame({"input_target": inputs["input"], "response": inputs["input"]})
+    )
+    scores = (lengths > 100).astype(np.float64)  # scores depend on the input length
+    splitter = splitters.StratifiedSubsampleSplitter(test_size=0.05, n_buckets=4)
+    # when
+    n_splits = splitter.get_n_splits(inputs=inputs, targets=targets)
+    splits = list(splitter.split(inputs=inputs, targets=targets))
+    train_index, test_index = splits[0]
+    shuffled = inputs.sample(frac=1.0, random_state=1)
+    _, shuffled_index = next(splitter.split(inputs=shuffled, targets=targets))
+    mean, variance = splitter.estimate(
+        inputs=inputs, targets=targets, test_index=test_index, scores=scores[test_index]
+    )
+    # then
+    assert n_splits == len(splits) == 1, "Splitter should return 1 split!"
+    assert len(test_index) == 100, "Test index should have the given ratio!"
+    assert len(train_index) + len(test_index) == len(inputs), "Splits should cover the inputs!"
+    strata = np.bincount(splitter.strata(inputs=inputs, targets=targets)[test_index])
+    assert strata.tolist() == [25] * 4, "Test rows should be spread over the strata!"
+    assert set(shuffled.index[shuffled_index]) == set(
+        test_index
+    ), "Rows should not depend on order!"
+    assert abs(mean - scores.mean()) < 3 * np.sqrt(variance) + 1e-9, "Mean should track full set!"
+    assert (
+        0.0 <= variance < scores.var() / len(test_index)
+    ), "Stratification should reduce variance!"
+
+
+def test_stratified_subsample_splitter_column() -> None:
+    # given
+    questions = [f"question {i}" for i in range(100)]
+    inputs = T.cast(schemas.Inputs, pd.DataFrame({"input": questions}))
+    targets = T.cast(
+        schemas.Targets,
+        pd.DataFrame(
+            {"input_target": questions, "response": questions, "category": ["a"] * 90 + ["b"] * 10}
+        ),
+    )
+    splitter = splitters.StratifiedSubsampleSplitter(test_size=10, n_buckets=1, column="category")
+    # when
+    _, test_index = next(splitter.split(inputs=inputs, targets=targets))
+    # then
+    assert targets.iloc[test_index]["category"].tolist().count("b") == 1, "Strata should be kept!"
+
+
+def test_stratified_subsample_splitter_test_size() -> None:
+    # given
+    ratio, size = 0.5, 2
+    # when
+    splitters.StratifiedSubsampleSplitter(test_size=ratio)
+    splitters.StratifiedSubsampleSplitter(test_size=size)
+    # then
+    with pytest.raises(pdt.ValidationError, match="ratio must be lower than 1"):
+        splitters.StratifiedSubsampleSplitter(test_size=1.5)
+
+
+def test_take() -> None:
+    # given
+    questions = [f"question {i}" for i in range(10)]
+    inputs = schemas.Inputs(pd.DataFrame({"input": questions}))
+    # when
+    contiguous = splitters.take(inputs, np.arange(2, 6))
+    scattered = splitters.take(inputs, np.array([1, 3, 5]))
+    empty = splitters.take(inputs, np.array([], dtype=np.int64))
+    # then
+    assert contiguous["input"].tolist() == questions[2:6], "Contiguous rows should be selected!"
+    assert np.shares_memory(
+        contiguous["input"].to_numpy(), inputs["input"].to_numpy()
+    ), "Contiguous rows should be a view of the data!"
+    assert scattered["input"].tolist() == questions[1:6:2], "Scattered rows should be selected!"
+    assert empty.empty, "Empty index should select no rows!"
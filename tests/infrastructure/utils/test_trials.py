@@ -0,0 +1,99 @@
+# %% IMPORTS
+
+import os
+import pickle
+from unittest.mock import MagicMock, patch
+
+import mlflow
+import pandas as pd
+from autogen_team.core import schemas
+from autogen_team.evaluation import metrics
+from autogen_team.infrastructure import services
+from autogen_team.infrastructure.utils import searchers, splitters, trials
+from autogen_team.models import entities as models
+
+# %% STORES
+
+
+def test_sqlite_trial_store(tmp_path: str, mlflow_service: services.MlflowService) -> None:
+    # given
+    path = os.path.join(tmp_path, "trials.db")
+    store = trials.SQLiteTrialStore(path=path)
+    trial = trials.Trial(
+        params_key="p" * 64,
+        fold_key="f" * 64,
+        metric="exact",
+        params={"temperature": 0.5},
+        score=0.75,
+        latency=1.5,
+        tokens=42,
+        row_latencies=[0.5, 1.0],
+        row_tokens=[20, 22],
+    )
+    # when
+    missing = store.get(trial.key)
+    store.put(trial)
+    found = trials.SQLiteTrialStore(path=path).get(trial.key)  # reopen the database
+    copied = pickle.loads(pickle.dumps(store)).get(trial.key)  # e.g., for the parallel jobs
+    run_config = mlflow_service.RunConfig(name="Trials-Run")
+    with mlflow_service.run_context(run_config=run_config) as run:
+        exported = store.stream()
+        exported_again = store.stream()
+    # then
+    assert missing is None, "Unknown trials should not be found!"
+    assert found == trial, "Stored trials should be found!"
+    assert copied == trial, "Pickled stores should reopen the database!"
+    assert (exported, exported_again) == (1, 0), "Trials should be exported once!"
+    assert store.read()["exported"].tolist() == [True], "Trials should be marked as exported!"
+    children = mlflow.search_runs(filter_string=f"tags.mlflow.parentRunId = '{run.info.run_id}'")
+    assert children["metrics.exact"].tolist() == [0.75], "Trials should be nested runs!"
+    assert children["params.temperature"].tolist() == ["0.5"], "Trial params should be logged!"
+
+
+def test_searcher_resumes_trials(tmp_path: str) -> None:
+    # given
+    inputs = schemas.Inputs(pd.DataFrame({"input": [f"question {i}" for i in range(12)]}))
+    targets = schemas.Targets(
+        pd.DataFrame({"input_target": inputs["input"], "response": inputs["input"]})
+    )
+    store = trials.SQLiteTrialStore(path=os.path.join(tmp_path, "trials.db"))
+    searcher = searchers.AsyncGridSearcher(param_grid={"temperature": [0.1, 0.9]}, store=store)
+    metric = metrics.AutogenMetric(name="exact", metric_type="exact_match", greater_is_better=True)
+    splitter = splitters.TimeSeriesSplitter(n_splits=2, test_size=3)
+    calls = MagicMock()
+
+    async def rungroupchat(self: models.BaselineAutogenModel, content: str) -> MagicMock:
+        calls(content)
+        assert self.temperature is not None
+        text = content if self.temperature > 0.5 else content.upper()
+        return MagicMock(
+            messages=[MagicMock(text=text)],
+            text=text,
+            finish_reason="stop",
+            usage_details={"total_token_count": 10},
+        )
+
+    def search() -> searchers.Results:
+        return searcher.search(
+            model=models.BaselineAutogenModel(),
+            metric=metric,
+            inputs=inputs,
+            targets=targets,
+            cv=splitter,
+        )
+
+    # when
+    with patch.object(models.BaselineAutogenModel, "_rungroupchat", rungroupchat):
+        first, _, _ = search()
+        calls_first = calls.call_count
+        second, best_score, best_params = search()
+    # then
+    assert calls_first == 2 * 2 * 3, "The first search should predict every trial!"
+    assert calls.call_count == calls_first, "The second search should skip finished trials!"
+    assert first["mean_test_score"].tolist() == second["mean_test_score"].tolist()
+    assert second["mean_tokens"].tolist() == [10.0, 10.0], "Resumed trials should keep usage!"
+    assert second.attrs["tokens"] == 0, "Resumed trials should not spend tokens again!"
+    assert (best_score, best_params) == (1.0, {"temperature": 0.9})
+    records = store.read()
+    assert len(records) == 2 * 2, "One trial should be recorded per candidate and fold!"
+    assert records["tokens"].tolist() == [30] * 4, "Trial tokens should sum the rows tokens!"
@@ -1,11 +1,12 @@
 # %% IMPORTS
+import asyncio
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import pytest
 from agent_framework.openai import OpenAIChatClient
 from autogen_team.core import schemas
-from autogen_team.models.entities import BaselineAutogenModel
+from autogen_team.models.entities import BaselineAutogenModel, PredictionCache
 
 
 @pytest.fixture
@@ -100,3 +101,62 @@ def test_load_context(baseline_model: BaselineAutogenModel) -> None:
         baseline_model.load_context(model_config)
         # Verify
         MockOpenAIChatClient.assert_called_once()  # Verify OpenAIChatCompletionClient was called
+
+
+def test_prediction_cache(baseline_model: BaselineAutogenModel) -> None:
+    """Test the prediction cache only predicts the unseen rows."""
+    # Setup
+    cache = PredictionCache()
+    inputs = schemas.Inputs(pd.DataFrame({"input": ["a", "b", "a"]}))
+
+    def predict(inputs: schemas.Inputs) -> schemas.Outputs:
+        return schemas.Outputs(
+            pd.DataFrame(
+                {
+                    "response": inputs["input"].str.upper(),
+                    "metadata": [{"tokens": 10}] * len(inputs),
+                }
+            )
+        )
+
+    with patch.object(BaselineAutogenModel, "predict", side_effect=predict) as mock_predict:
+        # Execute
+        first = cache.predict(model=baseline_model, inputs=inputs)
+        second = cache.predict(model=baseline_model, inputs=inputs.iloc[::-1])
+        baseline_model.set_params(temperature=0.1)
+        cache.predict(model=baseline_model, inputs=inputs)
+
+    # Verify
+    assert first["response"].tolist() == ["A", "B", "A"]
+    assert second["response"].tolist() == ["A", "B", "A"]
+    assert mock_predict.call_count == 2, "Cached rows should not be predicted again"
+    assert mock_predict.call_args_list[0].kwargs["inputs"]["input"].tolist() == ["a", "b"]
+    assert (cache.hits, cache.misses) == (5, 4)
+    assert cache.tokens == 4 * 10, "Only the predicted rows should spend tokens"
+
+
+def test_prediction_cache_apredict(baseline_model: BaselineAutogenModel) -> None:
+    """Test the prediction cache awaits the rows predicted by other tasks."""
+    # Setup
+    cache = PredictionCache()
+    inputs = schemas.Inputs(pd.DataFrame({"input": ["a", "b"]}))
+
+    async def apredict(inputs: schemas.Inputs) -> schemas.Outputs:
+        await asyncio.sleep(0.001)
+        return schemas.Outputs(
+            pd.DataFrame({"response": inputs["input"].str.upper(), "metadata": [{}] * len(inputs)})
+        )
+
+    async def run() -> list[schemas.Outputs]:
+        semaphore = asyncio.Semaphore(1)
+        tasks = [cache.apredict(baseline_model, inputs, semaphore=semaphore) for _ in range(3)]
+        return await asyncio.gather(*tasks)
+
+    with patch.object(BaselineAutogenModel, "apredict", side_effect=apredict) as mock_apredict:
+        # Execute
+        outputs = asyncio.run(run())
+
+    # Verify
+    assert [output["response"].tolist() for output in outputs] == [["A", "B"]] * 3
+    assert mock_apredict.call_count == 1, "Rows in flight should not be predicted again"
+    assert (cache.hits, cache.misses) == (4, 2)
@@ -1,5 +1,10 @@
 # %% IMPORTS
 
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import mlflow.exceptions
+import pandas as pd
 from autogen_team.core import schemas
 from autogen_team.infrastructure import services
 from autogen_team.infrastructure.utils import signers
@@ -95,3 +100,21 @@ def test_custom_pipeline(
     ), "The adapter model should have a python_function flavor!"
     # - output
     assert schemas.OutputsSchema.check(outputs) is not None, "Outputs should be valid!"
+
+
+def test_custom_loader_apredict() -> None:
+    # given
+    inputs = schemas.Inputs(pd.DataFrame({"input": ["question"]}))
+    project = MagicMock(apredict=AsyncMock(return_value="answer"))
+    pyfunc = MagicMock()
+    pyfunc.unwrap_python_model.return_value = registries.CustomSaver.Adapter(model=project)
+    other = MagicMock(predict=MagicMock(return_value="fallback"))
+    other.unwrap_python_model.side_effect = mlflow.exceptions.MlflowException("not python")
+    # when
+    outputs = asyncio.run(registries.CustomLoader.Adapter(model=pyfunc).apredict(inputs=inputs))
+    fallback = asyncio.run(registries.CustomLoader.Adapter(model=other).apredict(inputs=inputs))
+    # then
+    project.apredict.assert_awaited_once_with(inputs=inputs)
+    pyfunc.predict.assert_not_called()
+    assert outputs["response"].tolist() == ["answer"], "Project model should be awaited!"
+    assert fallback["response"].tolist() == ["fallback"], "Other models should run in a thread!"